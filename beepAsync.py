@@ -0,0 +1,264 @@
+#! /usr/bin/python
+
+# Filename: beepAsync.py by Geoffrey Sessums
+# Purpose:
+#     Provides the Scheduler class, which runs many BEEP programs at once in
+#     one asyncio event loop. Each program runs as a coroutine which executes
+#     a slice of sliceLines lines (see executeSteps in beepExec.py), drains
+#     its output and then lets the other programs run, so a long loop cannot
+#     starve the programs which share the loop with it:
+#         - the programs take turns in the order they became ready, so each
+#           one gets the same number of lines per turn
+#         - each program may be given a quota, the most lines it may execute,
+#           which replaces the line limit of the Interpreter
+#         - a program is cancelled by cancelling its task; it stops at the
+#           end of its slice without printing anything more
+#         - a program's output may go to an asynchronous writer (see
+#           AsyncSink in beepOutput.py), otherwise it is kept in its result
+# Usage:
+#     scheduler = Scheduler(Interpreter(maxLines=None), sliceLines=1000)
+#     task = scheduler.submit(program, quota=100000)
+#     result = await task
+#   or from the command line, which runs the programs in one event loop and
+#   writes a summary as beepBatch.py does:
+#     python3 beepAsync.py programs [-k sliceLines] [-j maxRunning]
+#                          [-q quota] [-o outputDir] [execution flags]
+#         -k sliceLines - lines a program executes per turn (1000 by default)
+#         -j maxRunning - most programs running at once (no limit by default)
+#         -q quota - most lines each program may execute
+#         -o outputDir - directory to write the output of each program to
+#     The programs and the execution flags are those of beepBatch.py.
+
+import asyncio
+import copy
+import sys
+import time
+
+from beepBatch import BatchResult, expandPrograms, writeOutputs
+from beepDriver import parseFlag
+from beepInterp import Program, Interpreter
+from beepOutput import AsyncSink
+
+# Lines a program executes per turn by default
+defaultSliceLines = 1000
+
+# Class: Scheduler
+# Purpose:
+#    Runs BEEP programs as coroutines which take turns.
+# Attributes:
+#    interpreter - Interpreter whose settings every program runs with
+#    sliceLines - lines a program executes before the others get a turn
+#    semaphore - asyncio.Semaphore which limits the programs running at once,
+#                or None
+#    taskS - set of the asyncio.Task of each submitted program which has not
+#            finished
+#    running - number of programs running
+#    finished - number of programs which ran to their end
+#    cancelled - number of programs which were cancelled
+#    lines - number of lines executed by the programs which finished
+class Scheduler:
+    # Function: __init__
+    # Parameters:
+    #    interpreter - Interpreter, or None for one with the default settings
+    #    sliceLines - lines a program executes per turn
+    #    maxRunning - most programs running at once, or None for no limit
+    def __init__(self, interpreter=None, sliceLines=defaultSliceLines, maxRunning=None):
+        if interpreter is None:
+            interpreter = Interpreter()
+        self.interpreter = interpreter
+        self.sliceLines = sliceLines
+        self.semaphore = None
+        if maxRunning is not None:
+            self.semaphore = asyncio.Semaphore(maxRunning)
+        self.taskS = set()
+        self.running = 0
+        self.finished = 0
+        self.cancelled = 0
+        self.lines = 0
+
+    # Function: run
+    # Purpose:
+    #    Run a program, taking turns with the other programs of the event loop
+    # Parameters:
+    #    program - Program, or the source code of a program
+    #    writer - coroutine function or stream writer the output is drained
+    #             to (see AsyncSink), or None to keep it in the result
+    #    quota - most lines the program may execute, or None for the line
+    #            limit of the Interpreter
+    #    valueD - initial values of the variables (see Interpreter.run), or
+    #             None
+    # Returns:
+    #    RunResult
+    # Raises:
+    #    asyncio.CancelledError if the program is cancelled
+    async def run(self, program, writer=None, quota=None, valueD=None):
+        interpreter = self.interpreter
+        out = None
+        if writer is not None or quota is not None:
+            interpreter = copy.copy(interpreter)
+            if writer is not None:
+                out = AsyncSink(writer)
+                interpreter.out = out
+            if quota is not None:
+                interpreter.optionD = dict(interpreter.optionD, maxLines=quota)
+        if self.semaphore is not None:
+            await self.semaphore.acquire()
+        steps = interpreter.runSteps(program, valueD, self.sliceLines)
+        self.running = self.running + 1
+        try:
+            while True:
+                try:
+                    next(steps)
+                except StopIteration as e:
+                    result = e.value
+                    break
+                if out is not None:
+                    await out.drain()
+                # Let the other programs have their turn
+                await asyncio.sleep(0)
+            if out is not None:
+                await out.drain()
+        except asyncio.CancelledError:
+            self.cancelled = self.cancelled + 1
+            raise
+        finally:
+            steps.close()
+            self.running = self.running - 1
+            if self.semaphore is not None:
+                self.semaphore.release()
+        self.finished = self.finished + 1
+        self.lines = self.lines + result.lines
+        return result
+
+    # Function: submit
+    # Purpose:
+    #    Start running a program in the running event loop
+    # Parameters:
+    #    program, writer, quota, valueD - see run
+    # Returns:
+    #    asyncio.Task whose result is the RunResult; cancel it to stop the
+    #    program
+    def submit(self, program, writer=None, quota=None, valueD=None):
+        task = asyncio.get_running_loop().create_task(self.run(program, writer, quota, valueD))
+        self.taskS.add(task)
+        task.add_done_callback(self.taskS.discard)
+        return task
+
+    # Function: cancelAll
+    # Purpose:
+    #    Cancel every program which has not finished
+    # Returns:
+    #    N/A
+    def cancelAll(self):
+        for task in list(self.taskS):
+            task.cancel()
+
+# Function: runPrograms
+# Purpose:
+#    Run program files together in one event loop
+# Parameters:
+#    fileNameM - list of program file names
+#    scheduler - Scheduler
+#    quota - most lines each program may execute, or None
+# Returns:
+#    List of BatchResult in the order of fileNameM; seconds is the time from
+#    the start of the batch until the program finished
+async def runPrograms(fileNameM, scheduler, quota=None):
+    start = time.perf_counter()
+
+    # Function: runOne
+    # Purpose:
+    #    Load and run one program
+    async def runOne(fileName):
+        try:
+            result = await scheduler.submit(Program.fromFile(fileName), quota=quota)
+        except Exception as e:
+            return BatchResult(fileName, False, 0, "%s: %s" % (type(e).__name__, e),
+                               time.perf_counter() - start, "")
+        return BatchResult(fileName, result.error is None, result.lines, result.error,
+                           time.perf_counter() - start, result.output)
+
+    return await asyncio.gather(*[runOne(fileName) for fileName in fileNameM])
+
+# Function: writeSummary
+# Purpose:
+#    Write the result of each program and the totals
+# Parameters:
+#    resultM - list of BatchResult
+#    wallTime - seconds taken by all the programs
+#    sliceLines - lines a program executed per turn
+#    out - file object the summary is written to
+# Returns:
+#    N/A
+def writeSummary(resultM, wallTime, sliceLines, out):
+    print("%-40s %-6s %10s %9s  %s" % ("Program", "Status", "Lines", "Finished", "Error"),
+          file=out)
+    for result in resultM:
+        print("%-40s %-6s %10d %8.3fs  %s" % (result.fileName,
+                                               "PASS" if result.passed else "FAIL",
+                                               result.lines, result.seconds,
+                                               result.error or ""), file=out)
+    passed = sum(1 for result in resultM if result.passed)
+    print("programs: %d  passed: %d  failed: %d  lines: %d  wall time: %.3f seconds"
+          " (%d lines per turn)" % (len(resultM), passed, len(resultM) - passed,
+                                    sum(result.lines for result in resultM), wallTime,
+                                    sliceLines), file=out)
+
+# Function: main
+# Purpose:
+#    Parse the command arguments and run the programs
+# Parameters:
+#    argM - command arguments, starting with the name of this program
+# Returns:
+#    Exit status: 0 if every program passed, 1 otherwise
+def main(argM):
+    if len(argM) < 2:
+        print("Usage: python3 beepAsync.py programs [-k sliceLines] [-j maxRunning]"
+              " [-q quota] [-o outputDir] [execution flags]")
+        return 1
+    sliceLines = defaultSliceLines
+    maxRunning = None
+    quota = None
+    outputDir = None
+    optionD = {}
+    flagM = argM[2:]
+    while flagM != []:
+        flag = flagM.pop(0)
+        if flag == "-k" and flagM != [] and flagM[0].isdecimal() and int(flagM[0]) > 0:
+            sliceLines = int(flagM.pop(0))
+        elif flag == "-j" and flagM != [] and flagM[0].isdecimal() and int(flagM[0]) > 0:
+            maxRunning = int(flagM.pop(0))
+        elif flag == "-q" and flagM != [] and flagM[0].isdecimal() and int(flagM[0]) > 0:
+            quota = int(flagM.pop(0))
+        elif flag == "-o" and flagM != []:
+            outputDir = flagM.pop(0)
+        elif parseFlag(flag, flagM, optionD):
+            pass
+        else:
+            print("Unkown Flag: %s" % (flag))
+            return 1
+
+    try:
+        fileNameM = expandPrograms(argM[1])
+    except OSError as e:
+        print("FILE EXISTENCE ERROR: %s" % (e))
+        return 1
+
+    # Function: runAll
+    # Purpose:
+    #    Run every program with a Scheduler made inside the event loop
+    async def runAll():
+        scheduler = Scheduler(Interpreter(**optionD), sliceLines, maxRunning)
+        return await runPrograms(fileNameM, scheduler, quota)
+
+    start = time.perf_counter()
+    resultM = asyncio.run(runAll())
+    wallTime = time.perf_counter() - start
+
+    if outputDir is not None:
+        writeOutputs(resultM, outputDir)
+    writeSummary(resultM, wallTime, sliceLines, sys.stdout)
+    return 0 if all(result.passed for result in resultM) else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,426 @@
+#! /usr/bin/python
+
+# Filename: beepBatch.py by Geoffrey Sessums
+# Purpose:
+#     Runs many BEEP programs in parallel with a pool of worker processes and
+#     writes a summary of the results. The programs are split into chunks so
+#     that each task sent to a worker runs several programs, and every worker
+#     runs its programs through one Interpreter (see beepInterp.py) without
+#     starting a new Python process for each. The output of each program is
+#     kept separately, and the results are collected in the order the
+#     programs were given. With -o each worker writes the output of a program
+#     to its file as soon as the program finishes, so the outputs are not
+#     kept in memory until the batch ends.
+# Usage:
+#     python3 beepBatch.py programs [-j workers] [-c chunkSize] [-o outputDir]
+#                          [-s summaryFile] [-q] [-n] [-C resultDir] [execution flags]
+#     programs is a directory (every file in it is run), a glob pattern such
+#     as "tests/*.txt", or a manifest file which lists one program per line
+#     (relative names are relative to the manifest's directory).
+#         -j workers - number of worker processes (the number of CPUs by
+#                      default); 1 with -t 0 runs the programs in this
+#                      process
+#         -c chunkSize - number of programs sent to a worker at a time
+#         -o outputDir - directory to write the output of each program to, as
+#                        the program's file name followed by .out
+#         -s summaryFile - file to write the summary to instead of stdout
+#         -q - leave the source listing and the tables out of the output
+#         -n - do not cache the loaded programs (see beepCache.py)
+#         -C resultDir - keep the results of the programs in resultDir, so that
+#                        a program run before is not run again (see
+#                        beepMemo.py)
+#     The execution flags are those of beepDriver.py (-O0, -b, -m, -l, -t and
+#     -d). -t gives the time limit of each program, defaultTimeLimit seconds
+#     unless it is given (0 for no limit). The interpreter only checks the
+#     limit between lines, so a worker whose program is still running
+#     killGrace seconds after its limit is killed, which also stops a single
+#     long operation such as a huge multiplication.
+#         Example: python3 beepBatch.py nightly/ -j 8 -t 10 -o results/
+# Output:
+#     A line for each program with its status (PASS if it ran to its end,
+#     FAIL otherwise), the number of lines it executed, its run time and its
+#     error, followed by the totals and the wall time of the batch, and with
+#     -C the number of results found in the cache. A program whose worker
+#     process dies (e.g. killed for using too much memory) fails with the
+#     message "worker stopped", or "worker killed after N seconds" if it
+#     passed its time limit; the other programs of its chunk are run again,
+#     each in a process of its own.
+
+import concurrent.futures
+import concurrent.futures.process
+import glob
+import os
+import signal
+import sys
+import time
+
+from beepDriver import parseFlag
+from beepInterp import Program, Interpreter
+from beepCache import loadProgram
+from beepMemo import sharedCache
+
+# Most seconds each program may run unless -t is given
+defaultTimeLimit = 60.0
+
+# Seconds past its time limit after which a program's worker is killed
+killGrace = 5.0
+
+# Class: BatchResult
+# Purpose:
+#    The result of running one program of a batch.
+# Attributes:
+#    fileName - name of the program's file
+#    passed - True if the program ran to its end without an error
+#    lines - number of lines executed
+#    error - message of the error which stopped the program, or None
+#    seconds - time taken to load and run the program
+#    output - everything the program printed, or None once it has been
+#             written to the program's output file
+#    cached - True if the result was found in the result cache, False if it
+#             was not, None if there is no result cache
+class BatchResult:
+    __slots__ = ("fileName", "passed", "lines", "error", "seconds", "output", "cached")
+
+    def __init__(self, fileName, passed, lines, error, seconds, output, cached=None):
+        self.fileName = fileName
+        self.passed = passed
+        self.lines = lines
+        self.error = error
+        self.seconds = seconds
+        self.output = output
+        self.cached = cached
+
+# Function: expandPrograms
+# Purpose:
+#    Find the programs named by a directory, glob pattern or manifest
+# Parameters:
+#    spec - directory, glob pattern, or manifest file name
+# Returns:
+#    List of program file names in the order they are run
+def expandPrograms(spec):
+    if os.path.isdir(spec):
+        return sorted(os.path.join(spec, name) for name in os.listdir(spec)
+                      if os.path.isfile(os.path.join(spec, name)))
+    if glob.has_magic(spec):
+        return sorted(name for name in glob.glob(spec) if os.path.isfile(name))
+    fileNameM = []
+    baseDir = os.path.dirname(spec)
+    with open(spec, "r", encoding="utf-8") as manifest:
+        for line in manifest:
+            line = line.strip()
+            # Skip blank lines and comments
+            if line == "" or line[0] == "#":
+                continue
+            fileNameM.append(os.path.join(baseDir, line))
+    return fileNameM
+
+# Function: runChunk
+# Purpose:
+#    Run a chunk of programs. This runs in a worker process.
+# Parameters:
+#    fileNameM - list of program file names
+#    full - True to include the source listing and the tables in the output
+#    optionD - dictionary of Interpreter keyword arguments (keys) and values
+#              (values)
+#    useCache - True to load the programs through the cache
+#    resultCacheDir - directory of the result cache, or None
+#    outputFileM - list of the files the outputs of the programs are written
+#                  to, in the order of fileNameM, or None to keep the outputs
+#                  in the results
+#    killSeconds - seconds after which the process is killed if a program is
+#                  still running, or None; only for worker processes
+# Returns:
+#    List of BatchResult in the order of fileNameM
+def runChunk(fileNameM, full, optionD, useCache=True, resultCacheDir=None, outputFileM=None,
+             killSeconds=None):
+    # A worker keeps the results of the programs it ran for its later chunks
+    cache = None
+    if resultCacheDir is not None:
+        cache = sharedCache(resultCacheDir)
+    interpreter = Interpreter(listing=full, tables=full, cache=cache, **optionD)
+    if killSeconds is not None:
+        # SIGALRM ends the process unless it is handled, even in the middle
+        # of an operation which never returns to the interpreter
+        signal.signal(signal.SIGALRM, signal.SIG_DFL)
+    resultM = []
+    for index, fileName in enumerate(fileNameM):
+        start = time.perf_counter()
+        if killSeconds is not None:
+            signal.setitimer(signal.ITIMER_REAL, killSeconds)
+        try:
+            if useCache:
+                program = loadProgram(fileName)
+            else:
+                program = Program.fromFile(fileName)
+            result = interpreter.run(program)
+        except Exception as e:
+            batchResult = BatchResult(fileName, False, 0, "%s: %s" % (type(e).__name__, e),
+                                      time.perf_counter() - start, "")
+        else:
+            batchResult = BatchResult(fileName, result.error is None, result.lines, result.error,
+                                      time.perf_counter() - start, result.output,
+                                      result.cached if cache is not None else None)
+        finally:
+            if killSeconds is not None:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+        if outputFileM is not None:
+            writeOutput(batchResult, outputFileM[index])
+        resultM.append(batchResult)
+    return resultM
+
+# Function: writeOutput
+# Purpose:
+#    Write the output of a program to its file and drop it from its result
+# Parameters:
+#    result - BatchResult
+#    outputFile - name of the file
+# Returns:
+#    N/A
+def writeOutput(result, outputFile):
+    # Written in the encoding the programs are read in
+    with open(outputFile, "w", encoding="latin-1") as file:
+        file.write(result.output)
+    result.output = None
+
+# Function: runBatch
+# Purpose:
+#    Run programs across a pool of worker processes
+# Parameters:
+#    fileNameM - list of program file names
+#    workers - number of worker processes, or None for the number of CPUs
+#    chunkSize - programs sent to a worker at a time, or None to choose it
+#    full - True to include the source listing and the tables in the output
+#    optionD - dictionary of Interpreter keyword arguments (keys) and values
+#              (values)
+#    useCache - True to load the programs through the cache
+#    resultCacheDir - directory of the result cache, or None
+#    outputDir - directory each program's output is written to as soon as it
+#                finishes (see outputNames), or None to keep the outputs in
+#                the results
+# Returns:
+#    List of BatchResult in the order of fileNameM
+def runBatch(fileNameM, workers=None, chunkSize=None, full=True, optionD=None,
+             useCache=True, resultCacheDir=None, outputDir=None):
+    if optionD is None:
+        optionD = {}
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunkSize is None:
+        # Several chunks per worker keep the workers busy until the end
+        chunkSize = max(1, min(64, len(fileNameM) // (workers * 4)))
+    outputFileM = None
+    if outputDir is not None:
+        os.makedirs(outputDir, exist_ok=True)
+        outputFileM = [os.path.join(outputDir, name) for name in outputNames(fileNameM)]
+    killSeconds = None
+    if optionD.get("maxSeconds") is not None and hasattr(signal, "setitimer"):
+        killSeconds = optionD["maxSeconds"] + killGrace
+    chunkM = [range(i, min(i + chunkSize, len(fileNameM)))
+              for i in range(0, len(fileNameM), chunkSize)]
+
+    # Function: chunkArgs
+    # Purpose:
+    #    Get the arguments of runChunk for the programs at some indexes
+    def chunkArgs(indexM):
+        return ([fileNameM[index] for index in indexM], full, optionD, useCache,
+                resultCacheDir,
+                None if outputFileM is None else [outputFileM[index] for index in indexM])
+
+    if workers == 1 and killSeconds is None:
+        return [result for chunk in chunkM for result in runChunk(*chunkArgs(chunk))]
+    resultM = []
+    retryM = []
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        futureM = [executor.submit(runChunk, *chunkArgs(chunk), killSeconds)
+                   for chunk in chunkM]
+        for chunk, future in zip(chunkM, futureM):
+            try:
+                resultM.extend(future.result())
+            except concurrent.futures.process.BrokenProcessPool:
+                # A worker died, which fails every chunk not yet finished; a
+                # place is kept for each of their programs
+                retryM.extend(chunk)
+                resultM.extend(chunk)
+    if retryM != []:
+        isolatedM = runIsolated([chunkArgs([index]) for index in retryM], workers, killSeconds)
+        for index, result in zip(retryM, isolatedM):
+            resultM[index] = result
+    return resultM
+
+# Function: runIsolated
+# Purpose:
+#    Run programs each in a worker process of its own pool, so that a
+#    program which kills its worker only fails itself. A pool is only
+#    replaced once its worker dies.
+# Parameters:
+#    argsM - list of the arguments of runChunk for each program, without
+#            killSeconds
+#    workers - number of pools run at once
+#    killSeconds - seconds after which a worker is killed, or None
+# Returns:
+#    List of BatchResult in the order of argsM
+def runIsolated(argsM, workers, killSeconds):
+    resultM = [None] * len(argsM)
+
+    # Function: runShare
+    # Purpose:
+    #    Run the programs at some indexes of argsM one at a time
+    def runShare(indexM):
+        executor = None
+        try:
+            for index in indexM:
+                if executor is None:
+                    executor = concurrent.futures.ProcessPoolExecutor(1)
+                start = time.perf_counter()
+                future = executor.submit(runChunk, *argsM[index], killSeconds)
+                try:
+                    resultM[index] = future.result()[0]
+                except concurrent.futures.process.BrokenProcessPool:
+                    seconds = time.perf_counter() - start
+                    error = "worker stopped"
+                    if killSeconds is not None and seconds >= killSeconds:
+                        error = "worker killed after %g seconds" % (killSeconds)
+                    fileNameM, outputFileM = argsM[index][0], argsM[index][5]
+                    resultM[index] = BatchResult(fileNameM[0], False, 0, error, seconds, "")
+                    if outputFileM is not None:
+                        writeOutput(resultM[index], outputFileM[0])
+                    executor.shutdown()
+                    executor = None
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    shareM = [range(first, len(argsM), workers) for first in range(workers)]
+    with concurrent.futures.ThreadPoolExecutor(workers) as threads:
+        list(threads.map(runShare, shareM))
+    return resultM
+
+# Function: outputNames
+# Purpose:
+#    Name the output file of each program
+# Parameters:
+#    fileNameM - list of program file names
+# Returns:
+#    List of output file names in the order of fileNameM: the program's file
+#    name followed by .out
+def outputNames(fileNameM):
+    nameM = []
+    usedS = set()
+    for fileName in fileNameM:
+        name = os.path.basename(fileName) + ".out"
+        # Programs with the same name in different directories get a number
+        count = 1
+        while name in usedS:
+            count = count + 1
+            name = "%s-%d.out" % (os.path.basename(fileName), count)
+        usedS.add(name)
+        nameM.append(name)
+    return nameM
+
+# Function: writeOutputs
+# Purpose:
+#    Write the output of each program to its own file
+# Parameters:
+#    resultM - list of BatchResult
+#    outputDir - directory the files are written to
+# Returns:
+#    N/A
+def writeOutputs(resultM, outputDir):
+    os.makedirs(outputDir, exist_ok=True)
+    nameM = outputNames([result.fileName for result in resultM])
+    for result, name in zip(resultM, nameM):
+        writeOutput(result, os.path.join(outputDir, name))
+
+# Function: writeSummary
+# Purpose:
+#    Write the result of each program and the totals of the batch
+# Parameters:
+#    resultM - list of BatchResult
+#    wallTime - seconds taken by the whole batch
+#    workers - number of worker processes
+#    out - file object the summary is written to
+# Returns:
+#    N/A
+def writeSummary(resultM, wallTime, workers, out):
+    print("%-40s %-6s %10s %9s  %s" % ("Program", "Status", "Lines", "Seconds", "Error"),
+          file=out)
+    for result in resultM:
+        print("%-40s %-6s %10d %9.3f  %s" % (result.fileName,
+                                              "PASS" if result.passed else "FAIL",
+                                              result.lines, result.seconds,
+                                              result.error or ""), file=out)
+    passed = sum(1 for result in resultM if result.passed)
+    print("programs: %d  passed: %d  failed: %d  lines: %d  wall time: %.3f seconds"
+          " (%d workers)" % (len(resultM), passed, len(resultM) - passed,
+                             sum(result.lines for result in resultM), wallTime, workers),
+          file=out)
+    cachedM = [result.cached for result in resultM if result.cached is not None]
+    if cachedM != []:
+        print("result cache: %d hits  %d misses" % (cachedM.count(True), cachedM.count(False)),
+              file=out)
+
+# Function: main
+# Purpose:
+#    Parse the command arguments and run the batch
+# Parameters:
+#    argM - command arguments, starting with the name of this program
+# Returns:
+#    Exit status: 0 if every program passed, 1 otherwise
+def main(argM):
+    if len(argM) < 2:
+        print("Usage: python3 beepBatch.py programs [-j workers] [-c chunkSize]"
+              " [-o outputDir] [-s summaryFile] [-q] [-n] [-C resultDir] [execution flags]")
+        return 1
+    workers = None
+    chunkSize = None
+    outputDir = None
+    summaryFile = None
+    full = True
+    useCache = True
+    resultCacheDir = None
+    optionD = {}
+    flagM = argM[2:]
+    while flagM != []:
+        flag = flagM.pop(0)
+        if flag == "-j" and flagM != [] and flagM[0].isdecimal() and int(flagM[0]) > 0:
+            workers = int(flagM.pop(0))
+        elif flag == "-c" and flagM != [] and flagM[0].isdecimal() and int(flagM[0]) > 0:
+            chunkSize = int(flagM.pop(0))
+        elif flag == "-o" and flagM != []:
+            outputDir = flagM.pop(0)
+        elif flag == "-s" and flagM != []:
+            summaryFile = flagM.pop(0)
+        elif flag == "-q":
+            full = False
+        elif flag == "-n":
+            useCache = False
+        elif flag == "-C" and flagM != []:
+            resultCacheDir = flagM.pop(0)
+        elif parseFlag(flag, flagM, optionD):
+            pass
+        else:
+            print("Unkown Flag: %s" % (flag))
+            return 1
+
+    try:
+        fileNameM = expandPrograms(argM[1])
+    except OSError as e:
+        print("FILE EXISTENCE ERROR: %s" % (e))
+        return 1
+    if workers is None:
+        workers = os.cpu_count() or 1
+    optionD.setdefault("maxSeconds", defaultTimeLimit)
+    start = time.perf_counter()
+    resultM = runBatch(fileNameM, workers, chunkSize, full, optionD, useCache, resultCacheDir,
+                       outputDir)
+    wallTime = time.perf_counter() - start
+
+    if summaryFile is None:
+        writeSummary(resultM, wallTime, workers, sys.stdout)
+    else:
+        with open(summaryFile, "w", encoding="utf-8") as out:
+            writeSummary(resultM, wallTime, workers, out)
+    return 0 if all(result.passed for result in resultM) else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,325 @@
+#! /usr/bin/python
+
+# Filename: beepBench.py by Geoffrey Sessums
+# Purpose:
+#     Runs the benchmark workloads of beepGen.py and reports for each one:
+#         - the lines executed per second, from the fastest of several runs
+#         - the startup time: the time to load and decode the program before
+#           its first line executes
+#         - the peak memory: how far the resident size of the process grew
+#           while the program was generated, loaded and run
+#     Each workload runs in a fresh worker process so that one workload's
+#     memory does not count toward the next one's. The results can be saved
+#     as a baseline and later runs compared with it; a workload which became
+#     slower or larger by more than the threshold is flagged as a regression.
+# Usage:
+#     python3 beepBench.py [-w workloads] [-x scale] [-r repeats] [-s baseline]
+#                          [-c baseline] [-f threshold] [execution flags]
+#         -w workloads - comma separated names of the workloads to run (all of
+#                        them by default; see beepGen.py)
+#         -x scale - factor the size of every workload is multiplied by
+#         -r repeats - number of times each program is run (3 by default)
+#         -s baseline - save the results to the baseline file
+#         -c baseline - compare the results with the baseline file
+#         -f threshold - percentage a result may get worse by before it is
+#                        flagged (10 by default)
+#     The execution flags are those of beepDriver.py (-O0, -b, -m, -l, -t and
+#     -d); there is no line limit unless -l is given.
+#         Example: python3 beepBench.py -s base.json
+#                  python3 beepBench.py -b jit -c base.json
+# Output:
+#     A table of the results, with the change from the baseline if one is
+#     compared. The exit status is 1 if a regression was flagged.
+
+import concurrent.futures
+import json
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    # Peak memory is not measured where there is no resource module
+    resource = None
+
+from beepDriver import parseFlag
+from beepGen import workloadD, generate, defaultSeed
+from beepInterp import Program, Interpreter
+from beepOutput import OutputSink
+
+# Changed whenever the layout of a baseline file changes
+baselineFormat = 1
+
+# Number of runs of each program by default
+defaultRepeats = 3
+
+# Percentage a result may get worse by before it is flagged by default
+defaultThreshold = 10.0
+
+# Smallest changes which are flagged: timer and page noise is below these
+minStartupChange = 0.002
+minMemoryChange = 1.0
+
+# Function: peakMemory
+# Purpose:
+#    Get the peak resident size of this process
+# Returns:
+#    Megabytes, or None if it cannot be measured
+def peakMemory():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+# Function: runWorkload
+# Purpose:
+#    Generate, load and run a workload. This runs in a worker process.
+# Parameters:
+#    name - name of the workload
+#    size - size of the workload
+#    seed - seed of the workload
+#    repeats - number of times the program is run
+#    optionD - dictionary of Interpreter keyword arguments (keys) and values
+#              (values)
+# Returns:
+#    Dictionary of the results of the workload
+def runWorkload(name, size, seed, repeats, optionD):
+    startMemory = peakMemory()
+    source = generate(name, size, seed)
+    start = time.perf_counter()
+    program = Program.fromString(source, name).decode()
+    startup = time.perf_counter() - start
+
+    best = None
+    with open(os.devnull, "w") as devnull:
+        out = OutputSink(devnull)
+        interpreter = Interpreter(out, **optionD)
+        for i in range(repeats):
+            start = time.perf_counter()
+            result = interpreter.run(program)
+            out.flush()
+            seconds = time.perf_counter() - start
+            if best is None or seconds < best:
+                best = seconds
+
+    endMemory = peakMemory()
+    return {
+        "size": size,
+        "lines": result.lines,
+        "error": result.error,
+        "seconds": best,
+        "linesPerSecond": result.lines / best if best > 0 else 0.0,
+        "startup": startup,
+        "peakMemory": None if endMemory is None else endMemory - startMemory,
+    }
+
+# Function: runBench
+# Purpose:
+#    Run workloads one at a time, each in a fresh worker process
+# Parameters:
+#    nameM - list of workload names
+#    scale - factor the size of every workload is multiplied by
+#    repeats - number of times each program is run
+#    optionD - dictionary of Interpreter keyword arguments (keys) and values
+#              (values)
+#    seed - seed of the workloads
+# Returns:
+#    Dictionary of workload names (keys) and their results (values)
+def runBench(nameM, scale=1.0, repeats=defaultRepeats, optionD=None, seed=defaultSeed):
+    if optionD is None:
+        optionD = {}
+    resultD = {}
+    for name in nameM:
+        size = max(1, int(workloadD[name][1] * scale))
+        with concurrent.futures.ProcessPoolExecutor(1) as executor:
+            resultD[name] = executor.submit(runWorkload, name, size, seed, repeats,
+                                            optionD).result()
+    return resultD
+
+# Function: saveBaseline
+# Purpose:
+#    Write results to a baseline file
+# Parameters:
+#    fileName - name of the baseline file
+#    resultD - dictionary of workload names (keys) and results (values)
+#    optionD - dictionary of the Interpreter options the results were run with
+# Returns:
+#    N/A
+def saveBaseline(fileName, resultD, optionD):
+    baseline = {
+        "format": baselineFormat,
+        "python": "%d.%d.%d" % sys.version_info[:3],
+        "options": optionD,
+        "workloads": resultD,
+    }
+    with open(fileName, "w", encoding="utf-8") as file:
+        json.dump(baseline, file, indent=2, sort_keys=True)
+        file.write("\n")
+
+# Function: loadBaseline
+# Purpose:
+#    Read a baseline file
+# Parameters:
+#    fileName - name of the baseline file
+# Returns:
+#    Dictionary of the baseline
+# Raises:
+#    ValueError if the file is not a baseline this version can read
+def loadBaseline(fileName):
+    with open(fileName, "r", encoding="utf-8") as file:
+        baseline = json.load(file)
+    if not isinstance(baseline, dict) or baseline.get("format") != baselineFormat:
+        raise ValueError("%s is not a baseline file of format %d" % (fileName, baselineFormat))
+    return baseline
+
+# Function: compareResult
+# Purpose:
+#    Compare the result of a workload with its baseline
+# Parameters:
+#    result - dictionary of the result
+#    base - dictionary of the baseline result
+#    threshold - percentage a result may get worse by before it is flagged
+# Returns:
+#    List of the flags of the workload, empty if nothing got worse
+def compareResult(result, base, threshold):
+    flagM = []
+    limit = threshold / 100.0
+    if result["size"] != base["size"] or result["lines"] != base["lines"]:
+        # A different amount of work cannot be compared
+        flagM.append("CHANGED")
+        return flagM
+    if result["linesPerSecond"] < base["linesPerSecond"] * (1 - limit):
+        flagM.append("SPEED")
+    if (result["startup"] > base["startup"] * (1 + limit) and
+            result["startup"] - base["startup"] > minStartupChange):
+        flagM.append("STARTUP")
+    if (result["peakMemory"] is not None and base["peakMemory"] is not None and
+            result["peakMemory"] > base["peakMemory"] * (1 + limit) and
+            result["peakMemory"] - base["peakMemory"] > minMemoryChange):
+        flagM.append("MEMORY")
+    return flagM
+
+# Function: change
+# Purpose:
+#    Format the change of a result from its baseline
+# Parameters:
+#    value - result
+#    baseValue - baseline result, or None
+# Returns:
+#    Percentage change as text, or "" if there is nothing to compare
+def change(value, baseValue):
+    if value is None or not baseValue:
+        return ""
+    return "%+.1f%%" % (100.0 * (value - baseValue) / baseValue)
+
+# Function: printResults
+# Purpose:
+#    Print the results, compared with a baseline if one is given
+# Parameters:
+#    resultD - dictionary of workload names (keys) and results (values)
+#    baseline - dictionary of the baseline, or None
+#    threshold - percentage a result may get worse by before it is flagged
+#    out - file object the results are written to
+# Returns:
+#    Number of workloads flagged
+def printResults(resultD, baseline, threshold, out):
+    baseD = baseline["workloads"] if baseline is not None else {}
+    print("%-8s %10s %12s %8s %10s %8s %9s %8s  %s" %
+          ("Workload", "Lines", "Lines/sec", "Change", "Startup", "Change", "Peak MB",
+           "Change", "Flags"), file=out)
+    flagged = 0
+    for name, result in resultD.items():
+        base = baseD.get(name)
+        flagM = compareResult(result, base, threshold) if base is not None else []
+        if result["error"] is not None:
+            flagM.insert(0, "ERROR")
+        if flagM != []:
+            flagged = flagged + 1
+        peak = result["peakMemory"]
+        print("%-8s %10d %12.0f %8s %9.4fs %8s %9s %8s  %s" %
+              (name, result["lines"], result["linesPerSecond"],
+               change(result["linesPerSecond"], base and base["linesPerSecond"]),
+               result["startup"], change(result["startup"], base and base["startup"]),
+               "-" if peak is None else "%.1f" % (peak),
+               change(peak, base and base["peakMemory"]), " ".join(flagM)), file=out)
+        if result["error"] is not None:
+            print("    error: %s" % (result["error"]), file=out)
+    if baseline is not None:
+        print("compared with a baseline of Python %s; %d of %d workloads flagged"
+              " (threshold %g%%)" % (baseline.get("python", "?"), flagged, len(resultD),
+                                     threshold), file=out)
+    return flagged
+
+# Function: isNumber
+# Purpose:
+#    Check that a command argument is a non-negative decimal number
+# Parameters:
+#    text - the argument
+# Returns:
+#    True if it is a number
+def isNumber(text):
+    try:
+        return float(text) >= 0
+    except ValueError:
+        return False
+
+# Function: main
+# Purpose:
+#    Parse the command arguments and run the benchmark
+# Parameters:
+#    argM - command arguments, starting with the name of this program
+# Returns:
+#    Exit status: 1 if a regression was flagged, otherwise 0
+def main(argM):
+    nameM = list(workloadD)
+    scale = 1.0
+    repeats = defaultRepeats
+    saveFile = None
+    compareFile = None
+    threshold = defaultThreshold
+    optionD = {"maxLines": None}
+    flagM = argM[1:]
+    while flagM != []:
+        flag = flagM.pop(0)
+        if flag == "-w" and flagM != [] and all(name in workloadD
+                                                for name in flagM[0].split(",")):
+            nameM = flagM.pop(0).split(",")
+        elif flag == "-x" and flagM != [] and isNumber(flagM[0]):
+            scale = float(flagM.pop(0))
+        elif flag == "-r" and flagM != [] and flagM[0].isdecimal() and int(flagM[0]) > 0:
+            repeats = int(flagM.pop(0))
+        elif flag == "-s" and flagM != []:
+            saveFile = flagM.pop(0)
+        elif flag == "-c" and flagM != []:
+            compareFile = flagM.pop(0)
+        elif flag == "-f" and flagM != [] and isNumber(flagM[0]):
+            threshold = float(flagM.pop(0))
+        elif parseFlag(flag, flagM, optionD):
+            pass
+        else:
+            print("Unkown Flag: %s" % (flag))
+            return 1
+
+    baseline = None
+    if compareFile is not None:
+        try:
+            baseline = loadBaseline(compareFile)
+        except (OSError, ValueError) as e:
+            print("BASELINE ERROR: %s" % (e))
+            return 1
+        if baseline["options"] != optionD:
+            print("warning: the baseline was run with the options %s, not %s" %
+                  (baseline["options"], optionD))
+
+    resultD = runBench(nameM, scale, repeats, optionD)
+    flagged = printResults(resultD, baseline, threshold, sys.stdout)
+    if saveFile is not None:
+        saveBaseline(saveFile, resultD, optionD)
+    return 1 if flagged else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
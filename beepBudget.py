@@ -0,0 +1,202 @@
+#! /usr/bin/python
+
+# Filename: beepBudget.py by Geoffrey Sessums
+# Purpose:
+#     Provides the limits placed on an executing BEEP program:
+#         - the most lines it may execute
+#         - the most seconds it may run
+#         - optional detection of infinite loops
+#     and hands its stopping points to a Checkpointer, if it has one, which
+#     saves snapshots of the program (see beepCheckpoint.py).
+#     A BEEP program has no input, so if it is ever in exactly the same state
+#     (the instruction about to execute and the values of all its variables)
+#     twice, it will repeat the lines between forever. The LoopDetector
+#     compares the states seen at backward jumps and at checkpoints using
+#     Brent's algorithm, which only keeps one saved state and finds a repeat
+#     within a small multiple of the length of the loop. Ropes (see
+#     beepRope.py) are compared by identity, since comparing their text would
+#     build them on every backward jump; a loop which makes a new Rope equal
+#     to the old one on every trip is left to the line limit.
+#     execute only looks at the Budget when the line count reaches the next
+#     stopping point, so the limits cost nothing per line.
+
+import sys
+import time
+
+from beepRope import Rope
+
+# Lines executed between checks of the clock
+checkInterval = 10000
+
+# Lines executed between checks when loops are detected, so that loops run by
+# the python backend or a JIT trace are found soon as well
+loopCheckInterval = 1000
+
+# Message of the error which stops a program at its time limit
+timeLimitMessage = "time limit of %g seconds exceeded"
+
+# Class: BudgetExceeded
+# Purpose:
+#    Raised when a program reaches one of its limits.
+# Attributes:
+#    args[0] - message describing the limit
+#    args[1] - number of lines executed
+class BudgetExceeded(Exception):
+    pass
+
+# Class: LoopDetector
+# Purpose:
+#    Finds a repeated program state with Brent's cycle finding algorithm.
+# Attributes:
+#    savedPc - pc of the saved state, or None
+#    savedValues - tuple of the variable values of the saved state
+#    power - number of states compared against saved before it is replaced
+#    steps - number of states compared against saved so far
+class LoopDetector:
+    __slots__ = ("savedPc", "savedValues", "power", "steps")
+
+    def __init__(self):
+        self.savedPc = None
+        self.savedValues = None
+        self.power = 1
+        self.steps = 0
+
+    # Function: seen
+    # Purpose:
+    #    Compare a state against the saved state
+    # Parameters:
+    #    pc - index of the instruction about to execute
+    #    values - list of variable values indexed by slot
+    # Returns:
+    #    True if the state repeats the saved state
+    def seen(self, pc, values):
+        if pc == self.savedPc and sameValues(values, self.savedValues):
+            return True
+        self.steps = self.steps + 1
+        if self.steps >= self.power:
+            # The saved tuple keeps its Ropes alive, so no other Rope can be
+            # given the same identity
+            self.savedPc = pc
+            self.savedValues = tuple(values)
+            self.power = self.power * 2
+            self.steps = 0
+        return False
+
+# Function: sameValues
+# Purpose:
+#    Compare the values of two states
+# Parameters:
+#    values - list of variable values indexed by slot
+#    savedValues - tuple of the values of the saved state
+# Returns:
+#    True if every value is the same
+def sameValues(values, savedValues):
+    for value, saved in zip(values, savedValues):
+        if value is saved:
+            continue
+        # Equal values of different types (1, True and a Numeral 1) behave
+        # differently, so the types must match as well
+        if type(value) is not type(saved) or type(value) is Rope or value != saved:
+            return False
+    return True
+
+# Class: Budget
+# Purpose:
+#    The limits of one execution of a program.
+# Attributes:
+#    maxLines - most lines which may be executed
+#    maxSeconds - most seconds execution may take, or None
+#    detector - LoopDetector, or None if loops are not detected
+#    interval - lines executed between checks
+#    sliceLines - most lines executed between pauses, or None (see
+#                 executeSteps in beepExec.py)
+#    checkpointer - Checkpointer which saves snapshots, or None
+#    start - time execution began
+class Budget:
+    # Function: __init__
+    # Parameters:
+    #    maxLines - most lines which may be executed, or None for no limit
+    #    maxSeconds - most seconds execution may take, or None for no limit
+    #    detectLoops - True to stop as soon as an infinite loop is detected
+    #    sliceLines - most lines executed between pauses, or None for no
+    #                 pauses
+    #    checkpointer - Checkpointer (see beepCheckpoint.py), or None
+    def __init__(self, maxLines=5000, maxSeconds=None, detectLoops=False, sliceLines=None,
+                 checkpointer=None):
+        if maxLines is None:
+            maxLines = sys.maxsize
+        self.maxLines = maxLines
+        self.maxSeconds = maxSeconds
+        self.detector = None
+        self.interval = checkInterval
+        if detectLoops:
+            self.detector = LoopDetector()
+            self.interval = loopCheckInterval
+        self.sliceLines = sliceLines
+        self.checkpointer = checkpointer
+        if checkpointer is not None and checkpointer.everyLines is not None:
+            # A stop every everyLines lines (see nextStop)
+            self.interval = min(self.interval, checkpointer.everyLines + 1)
+        self.start = time.monotonic()
+
+    # Function: nextStop
+    # Purpose:
+    #    Find the line count at which execute must next call check
+    # Parameters:
+    #    counter - number of lines executed
+    # Returns:
+    #    Line count of the next check
+    def nextStop(self, counter):
+        stop = self.maxLines
+        if self.maxSeconds is not None or self.detector is not None or \
+                self.checkpointer is not None:
+            stop = min(stop, counter + self.interval)
+        if self.sliceLines is not None:
+            # execute stops before the line which would reach the stop, so a
+            # slice of one line still executes that line
+            stop = min(stop, counter + self.sliceLines + 1)
+        return stop
+
+    # Function: loopCheck
+    # Purpose:
+    #    Stop the program if it is in a state it has been in before
+    # Parameters:
+    #    codeM - array of Instr being executed
+    #    pc - index of the instruction about to execute
+    #    values - list of variable values indexed by slot
+    #    counter - number of lines executed
+    # Raises:
+    #    BudgetExceeded if an infinite loop is detected
+    def loopCheck(self, codeM, pc, values, counter):
+        if self.detector.seen(pc, values):
+            raise BudgetExceeded("an infinite loop was detected at line %d"
+                                 % (codeM[pc].line), counter)
+
+    # Function: check
+    # Purpose:
+    #    Check the limits once the line count reaches the value returned by
+    #    nextStop
+    # Parameters:
+    #    codeM - array of Instr being executed
+    #    pc - index of the instruction about to execute
+    #    values - list of variable values indexed by slot
+    #    counter - number of lines executed
+    # Raises:
+    #    BudgetExceeded if a limit is reached
+    def check(self, codeM, pc, values, counter):
+        exceeded = None
+        # Lines which were folded away may have gone past the limit
+        if counter + 1 >= self.maxLines:
+            exceeded = BudgetExceeded("an infinite loop was most likely encountered",
+                                      self.maxLines)
+        elif self.maxSeconds is not None and \
+                time.monotonic() - self.start > self.maxSeconds:
+            exceeded = BudgetExceeded(timeLimitMessage % (self.maxSeconds), counter)
+        # The state is saved before a limit stops the program, so that it
+        # can be resumed with a larger limit
+        if self.checkpointer is not None:
+            self.checkpointer.reached(codeM, pc, counter, exceeded is not None)
+        if exceeded is not None:
+            raise exceeded
+        if self.detector is not None:
+            self.loopCheck(codeM, pc, values, counter)
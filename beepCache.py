@@ -0,0 +1,390 @@
+#! /usr/bin/python
+
+# Filename: beepCache.py by Geoffrey Sessums
+# Purpose:
+#     Keeps loaded and decoded BEEP programs (see Program in beepInterp.py) in
+#     a cache directory, much like Python keeps compiled modules in
+#     __pycache__, so that a program which is run again is not read line by
+#     line, declared, labelled and decoded again.
+#         - An entry is named by a hash of the program's source code and of
+#           the interpreter version, so a changed program or a changed
+#           interpreter never finds a stale entry.
+#         - An entry is written to a temporary file which is then renamed over
+#           the entry, so a reader never sees a partly written entry and
+#           processes writing the same entry at once do no harm.
+#         - An entry which cannot be read is ignored and written again.
+#         - An entry holds only data: the magic bytes followed by a marshal
+#           of the attributes of the Program and of its instructions, in
+#           which a Numeral is written as ["N", int] and the exception class
+#           of an OP_RAISE as ["E", name] (decoded programs hold no lists).
+#           Only the arguments of the instructions which hold one of these
+#           are converted, so that most instructions are read as marshal
+#           left them.
+#           Reading an entry never runs code, so a cache directory others can
+#           write to cannot make the interpreter run theirs; an entry naming
+#           anything but an exception class is refused.
+#         - The directory is pruned when a process first writes to it and
+#           again after every maxCacheBytes // 4 bytes it writes: entries of
+#           another interpreter version and entries not used for maxCacheAge
+#           seconds are removed, and then the least recently used entries
+#           until the rest take three quarters of maxCacheBytes.
+#     The cache directory is the one named by the BEEPCACHE environment
+#     variable, or beep in the user's cache directory ($XDG_CACHE_HOME or
+#     ~/.cache) if it is not set; programs are never cached when it is set to
+#     an empty string. If the directory cannot be written, programs are
+#     simply not cached.
+
+import builtins
+import hashlib
+import io
+import marshal
+import os
+import sys
+import tempfile
+import time
+
+import beepErrors
+from beepInterp import Program
+from beepCompile import Instr
+from beepDict import Numeral
+
+# Environment variable naming the cache directory
+cacheEnvName = "BEEPCACHE"
+
+# Name of the cache directory in the user's cache directory
+cacheDirName = "beep"
+
+# Suffix of cache entries
+cacheSuffix = ".beepc"
+
+# Changed whenever the layout of an entry or of its name changes
+cacheFormat = 3
+
+# Start of every cache entry
+cacheMagic = b"BEEPCACHE3\n"
+
+# Most bytes the entries of a cache directory may take
+maxCacheBytes = 64 * 1024 * 1024
+
+# Most seconds an entry is kept without being used
+maxCacheAge = 30 * 24 * 60 * 60
+
+# Bytes written to each cache directory by this process since it was last
+# pruned, by directory (keys)
+writtenD = {}
+
+# Modules whose source determines what is stored in an entry
+versionModuleM = ["beepCache", "beepCheck", "beepCompile", "beepDict", "beepErrors",
+                  "beepEval", "beepInterp", "beepRegs", "beepRope"]
+
+# Function: interpreterVersion
+# Purpose:
+#    Get the version of the interpreter which the cache entries depend on: the
+#    cache format, the Python version, and a hash of the modules which load
+#    and decode programs
+# Parameters:
+#    entryFormat - format of the entries
+#    moduleM - names of the modules whose source determines the entries
+# Returns:
+#    Version as bytes
+def interpreterVersion(entryFormat=cacheFormat, moduleM=versionModuleM):
+    digest = hashlib.sha256()
+    digest.update(("%d %d.%d" % (entryFormat, sys.version_info[0],
+                                 sys.version_info[1])).encode())
+    for name in moduleM:
+        with open(sys.modules[name].__file__, "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest().encode()
+
+version = interpreterVersion()
+
+# Start of the names of the entries of this interpreter version
+versionPrefix = version[:16].decode() + "-"
+
+# Function: defaultCacheDir
+# Purpose:
+#    Get the cache directory set by the environment
+# Returns:
+#    Name of the directory, or None if programs are not to be cached
+def defaultCacheDir():
+    cacheDir = os.environ.get(cacheEnvName)
+    if cacheDir is not None:
+        return cacheDir or None
+    userDir = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(userDir, cacheDirName)
+
+# Function: cacheKey
+# Purpose:
+#    Get the name of the cache entry of a program
+# Parameters:
+#    source - source code of the program as bytes
+# Returns:
+#    The interpreter version's prefix followed by a hexadecimal hash of the
+#    source code and the interpreter version
+def cacheKey(source):
+    digest = hashlib.sha256(version)
+    digest.update(source)
+    return versionPrefix + digest.hexdigest()
+
+# Function: encodeValue
+# Purpose:
+#    Convert a value held by a decoded program into a value marshal can write
+# Parameters:
+#    value - value, or tuple of values
+# Returns:
+#    The value, ["N", int] for a Numeral, or ["E", name] for an exception class
+# Raises:
+#    ValueError if the value cannot be written
+def encodeValue(value):
+    kind = type(value)
+    if kind is tuple:
+        return tuple([encodeValue(item) for item in value])
+    if kind is Numeral:
+        return ["N", int(value)]
+    if kind is int or kind is str or kind is bool or value is None:
+        return value
+    if isinstance(value, type) and issubclass(value, Exception):
+        return ["E", value.__name__]
+    raise ValueError("cannot cache a value of type %s" % (kind.__name__))
+
+# Function: isPlain
+# Purpose:
+#    Check whether a value is written by marshal as it is
+# Parameters:
+#    value - value, or tuple of values
+# Returns:
+#    True if neither the value nor any item of it needs encodeValue
+def isPlain(value):
+    kind = type(value)
+    if kind is tuple:
+        for item in value:
+            if not isPlain(item):
+                return False
+        return True
+    return kind is int or kind is str or kind is bool or value is None
+
+# Function: decodeValue
+# Purpose:
+#    Convert a value written by encodeValue back
+# Parameters:
+#    value - encoded value
+# Returns:
+#    The value
+# Raises:
+#    ValueError if the value is not one encodeValue writes
+def decodeValue(value):
+    kind = type(value)
+    if kind is tuple:
+        return tuple([decodeValue(item) for item in value])
+    if kind is list:
+        tag, item = value
+        if tag == "N" and type(item) is int:
+            return Numeral(item)
+        if tag == "E" and type(item) is str:
+            # Only the exceptions raised while decoding a line are named
+            cls = getattr(beepErrors, item, None) or getattr(builtins, item, None)
+            if isinstance(cls, type) and issubclass(cls, Exception):
+                return cls
+    elif kind is int or kind is str or kind is bool or value is None:
+        return value
+    raise ValueError("bad cached value")
+
+# Function: entryBytes
+# Purpose:
+#    Convert a decoded program into the bytes of a cache entry
+# Parameters:
+#    program - decoded Program
+# Returns:
+#    Bytes of the entry
+# Raises:
+#    ValueError if the program cannot be written
+def entryBytes(program):
+    codeM, nameM = program.decoded
+    stateD = {
+        "name": program.name, "lines": program.lineM, "labels": program.labelD,
+        "types": program.varTypeD,
+        "values": {name: encodeValue(value) for name, value in program.varValueD.items()},
+        "messages": program.messageM, "names": nameM, "problems": program.problemM,
+        "verified": program.verified,
+        # One list per attribute of the instructions, which marshal reads
+        # faster than one tuple per instruction
+        "code": ([instr.op for instr in codeM],
+                 [instr.args if isPlain(instr.args) else [encodeValue(instr.args)]
+                  for instr in codeM],
+                 [instr.line for instr in codeM], [instr.target for instr in codeM],
+                 [instr.next for instr in codeM], [instr.skip for instr in codeM],
+                 [instr.jumpSkip for instr in codeM])}
+    return cacheMagic + marshal.dumps(stateD)
+
+# Function: entryProgram
+# Purpose:
+#    Rebuild a program from the bytes of a cache entry
+# Parameters:
+#    data - bytes of the entry
+# Returns:
+#    Decoded Program
+# Raises:
+#    ValueError (or another exception) if the entry is damaged
+def entryProgram(data):
+    if not data.startswith(cacheMagic):
+        raise ValueError("not a cache entry")
+    stateD = marshal.loads(data[len(cacheMagic):])
+    program = Program(stateD["name"])
+    program.lineM = stateD["lines"]
+    program.labelD = stateD["labels"]
+    program.varTypeD = stateD["types"]
+    program.varValueD = {name: decodeValue(value)
+                         for name, value in stateD["values"].items()}
+    program.messageM = stateD["messages"]
+    program.problemM = stateD["problems"]
+    program.verified = stateD["verified"]
+    codeM = []
+    for op, args, line, target, next, skip, jumpSkip in zip(*stateD["code"]):
+        # The arguments which needed encodeValue are in a list
+        if type(args) is not tuple:
+            args = decodeValue(args[0])
+        instr = Instr(op, args, line, target)
+        instr.next = next
+        instr.skip = skip
+        instr.jumpSkip = jumpSkip
+        codeM.append(instr)
+    if len(codeM) != len(program.lineM):
+        raise ValueError("damaged cache entry")
+    program.decoded = (codeM, stateD["names"])
+    return program
+
+# Function: readEntry
+# Purpose:
+#    Read a cache entry
+# Parameters:
+#    entryName - file name of the entry
+# Returns:
+#    Program, or None if the entry does not exist or cannot be read
+def readEntry(entryName):
+    try:
+        with open(entryName, "rb") as file:
+            program = entryProgram(file.read())
+    except Exception:
+        return None
+    # The time the entry was last used decides which entries are pruned
+    try:
+        os.utime(entryName)
+    except OSError:
+        pass
+    return program
+
+# Function: writeEntry
+# Purpose:
+#    Write a cache entry atomically
+# Parameters:
+#    entryName - file name of the entry
+#    program - decoded Program
+# Returns:
+#    True if the entry was written
+def writeEntry(entryName, program):
+    cacheDir = os.path.dirname(entryName)
+    try:
+        os.makedirs(cacheDir, exist_ok=True)
+        fd, tempName = tempfile.mkstemp(suffix=".tmp", dir=cacheDir)
+    except OSError:
+        return False
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(entryBytes(program))
+            size = file.tell()
+        os.replace(tempName, entryName)
+    except Exception:
+        try:
+            os.remove(tempName)
+        except OSError:
+            pass
+        return False
+    written = writtenD.get(cacheDir)
+    if written is None or written + size > maxCacheBytes // 4:
+        pruneCache(cacheDir)
+        writtenD[cacheDir] = 0
+    else:
+        writtenD[cacheDir] = written + size
+    return True
+
+# Function: pruneCache
+# Purpose:
+#    Remove the entries of other interpreter versions, the entries not used
+#    for maxCacheAge seconds and temporary files left by writers which
+#    stopped, and then the least recently used entries until the rest take
+#    three quarters of maxCacheBytes
+# Parameters:
+#    cacheDir - cache directory
+#    now - current time, or None for the time now
+# Returns:
+#    Number of files removed
+def pruneCache(cacheDir, now=None):
+    if now is None:
+        now = time.time()
+    entryM = []
+    staleM = []
+    try:
+        with os.scandir(cacheDir) as dirIter:
+            for dirEntry in dirIter:
+                name = dirEntry.name
+                if not name.endswith(cacheSuffix) and not name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = dirEntry.stat()
+                except OSError:
+                    continue
+                if name.endswith(".tmp"):
+                    # Another process may still be writing a recent one
+                    if stat.st_mtime < now - 24 * 60 * 60:
+                        staleM.append(dirEntry.path)
+                elif not name.startswith(versionPrefix) or stat.st_mtime < now - maxCacheAge:
+                    staleM.append(dirEntry.path)
+                else:
+                    entryM.append((stat.st_mtime, stat.st_size, dirEntry.path))
+    except OSError:
+        return 0
+
+    entryM.sort()
+    total = sum(size for mtime, size, path in entryM)
+    for mtime, size, path in entryM:
+        if total <= maxCacheBytes * 3 // 4:
+            break
+        staleM.append(path)
+        total = total - size
+
+    removed = 0
+    for path in staleM:
+        try:
+            os.remove(path)
+            removed = removed + 1
+        except OSError:
+            pass
+    return removed
+
+# Function: loadProgram
+# Purpose:
+#    Load and decode a program from a file, using the cache
+# Parameters:
+#    fileName - name of the file
+#    cacheDir - cache directory, or None for the one set by the environment
+#               (see defaultCacheDir)
+# Returns:
+#    Decoded Program
+def loadProgram(fileName, cacheDir=None):
+    if cacheDir is None:
+        cacheDir = defaultCacheDir()
+        if cacheDir is None:
+            return Program.fromFile(fileName)
+    with open(fileName, "rb") as file:
+        source = file.read()
+    entryName = os.path.join(cacheDir, cacheKey(source) + cacheSuffix)
+
+    program = readEntry(entryName)
+    if program is None:
+        # Read the text exactly as Program.fromFile does
+        text = io.TextIOWrapper(io.BytesIO(source), encoding='latin-1')
+        program = Program.fromStream(text, fileName).decode()
+        writeEntry(entryName, program)
+    # Programs with the same source code share an entry
+    program.name = fileName
+    return program
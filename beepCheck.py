@@ -0,0 +1,296 @@
+#! /usr/bin/python
+
+# Filename: beepCheck.py by Geoffrey Sessums
+# Purpose:
+#     Checks a decoded BEEP program (see beepCompile.py) before it executes
+#     and reports every problem which could stop it with an error:
+#         - lines which could not be decoded (e.g. too few operands, or an
+#           ASSIGN to a variable which is not declared)
+#         - GOTO and IF statements whose label is not defined
+#         - unknown operators
+#         - variables which are used but never declared with VAR
+#         - variables which may be used before they have a value, found by
+#           following every path through the program from its first line
+#         - operands of +, -, >, >= and the count of * which may not be
+#           numeric, found from the values each variable is declared with
+#           and the values every ASSIGN can store in it
+#     A program with no problems cannot raise any of these errors, so execute
+#     runs it on a fast path which leaves out the checks that every operation
+#     otherwise makes (see fastExpr in beepEval.py). A program which uses
+#     strings of digits as numbers (e.g. VAR INT z 007) has no problems but
+#     is not checked this closely, so it runs with the checks.
+
+from beepCompile import OP_ASSIGN, OP_IF, OP_GOTO, OP_PRINT, OP_RAISE, OP_INC
+from beepEval import binaryOpD
+from beepRope import Rope
+
+# Kinds of value a variable may hold, as bit flags
+KIND_INT = 1        # ints, Numerals and the booleans stored by > and >=
+KIND_DIGITS = 2     # strings which toInt can convert, e.g. "007"
+KIND_TEXT = 4       # other strings
+
+# Operators whose operands must be numeric
+numericOpS = {'+', '-', '>', '>='}
+
+# Function: valueKind
+# Purpose:
+#    Find the kind of a value
+# Parameters:
+#    value - value of a literal or of a declared variable
+# Returns:
+#    KIND_INT, KIND_DIGITS or KIND_TEXT
+def valueKind(value):
+    if isinstance(value, int):
+        return KIND_INT
+    # A Rope (e.g. a value resumed from a snapshot) may be far too long to
+    # build; taking it for text only keeps the program off the fast path
+    if type(value) is Rope:
+        return KIND_TEXT
+    try:
+        int(value)
+    except (TypeError, ValueError):
+        return KIND_TEXT
+    return KIND_DIGITS
+
+# Function: successors
+# Purpose:
+#    Find the instructions which may execute after an instruction
+# Parameters:
+#    codeM - array of Instr returned by decodeProgram
+#    index - index of the instruction
+# Returns:
+#    List of indexes; len(codeM) stands for the end of the program
+def successors(codeM, index):
+    instr = codeM[index]
+    if instr.op == OP_RAISE:
+        return []
+    if instr.op == OP_GOTO:
+        return [] if instr.target is None else [instr.target]
+    if instr.op == OP_IF and instr.target is not None:
+        return [index + 1, instr.target]
+    return [index + 1]
+
+# Function: operands
+# Purpose:
+#    Find the operands an instruction reads
+# Parameters:
+#    instr - decoded instruction
+# Returns:
+#    List of (operand, numeric) where operand is (None, value) or
+#    (slot, name) and numeric is True if it must be numeric
+def operands(instr):
+    if instr.op == OP_ASSIGN or instr.op == OP_IF:
+        expr = instr.args[1] if instr.op == OP_ASSIGN else instr.args[0]
+        operator, operand1, operand2 = expr
+        if operator is None:
+            return [(operand1, False)]
+        return [(operand1, operator in numericOpS),
+                (operand2, operator in numericOpS or operator == '*')]
+    if instr.op == OP_PRINT:
+        return [(operand, False) for operand in instr.args]
+    if instr.op == OP_INC:
+        return [((instr.args[0], instr.args[1]), True)]
+    return []
+
+# Function: exprKind
+# Purpose:
+#    Find the kinds of value an expression may have
+# Parameters:
+#    expr - decoded expression
+#    kindM - kinds of value each variable may hold, indexed by slot
+# Returns:
+#    Kind bit flags
+def exprKind(expr, kindM):
+    operator, operand1, operand2 = expr
+    if operator is None:
+        slot, value = operand1
+        return valueKind(value) if slot is None else kindM[slot]
+    if operator in numericOpS:
+        return KIND_INT
+    # & and * build strings
+    return KIND_TEXT
+
+# Function: reachable
+# Purpose:
+#    Find the instructions which can be reached from the first line
+# Parameters:
+#    codeM - array of Instr returned by decodeProgram
+# Returns:
+#    List of the indexes of the reachable instructions in source order
+def reachable(codeM):
+    # The end of the program counts as seen so that nothing passes it
+    seen = bytearray(len(codeM) + 1)
+    seen[len(codeM)] = 1
+    pendingM = [0]
+    while pendingM:
+        index = pendingM.pop()
+        # Follow the lines which fall through to the next one
+        while not seen[index]:
+            seen[index] = 1
+            op = codeM[index].op
+            if op == OP_GOTO or op == OP_IF or op == OP_RAISE:
+                pendingM.extend(successors(codeM, index))
+                break
+            index = index + 1
+    return [index for index in range(len(codeM)) if seen[index]]
+
+# Function: variableKinds
+# Purpose:
+#    Find the kinds of value each variable may hold, from the values the
+#    variables start with and the values every reachable ASSIGN can store.
+#    Only an ASSIGN which copies one variable into another can add to a kind
+#    once every ASSIGN has been seen, so the copies are followed until
+#    nothing changes.
+# Parameters:
+#    codeM - array of Instr returned by decodeProgram
+#    regs - RegisterFile of the program, holding the values the variables
+#           start with
+#    indexM - list of the indexes of the reachable instructions, or None to
+#             find them
+# Returns:
+#    List of kind bit flags indexed by slot; 0 for a variable which never
+#    has a value
+def variableKinds(codeM, regs, indexM=None):
+    if indexM is None:
+        indexM = reachable(codeM)
+    kindM = [0 if value is None else valueKind(value) for value in regs.values]
+    copyM = []
+    for index in indexM:
+        instr = codeM[index]
+        if instr.op == OP_ASSIGN:
+            slot, expr = instr.args
+            kindM[slot] = kindM[slot] | exprKind(expr, kindM)
+            if expr[0] is None and expr[1][0] is not None:
+                copyM.append((slot, expr[1][0]))
+        elif instr.op == OP_INC:
+            kindM[instr.args[0]] = kindM[instr.args[0]] | KIND_INT
+    changed = copyM != []
+    while changed:
+        changed = False
+        for slot, source in copyM:
+            kind = kindM[slot] | kindM[source]
+            if kind != kindM[slot]:
+                kindM[slot] = kind
+                changed = True
+    return kindM
+
+# Function: assignedBefore
+# Purpose:
+#    Find, for every reachable instruction, which of some variables have
+#    certainly been assigned a value on every path which reaches it
+# Parameters:
+#    codeM - array of Instr returned by decodeProgram
+#    bitD - dictionary of the slots of the variables (keys) and their bit in
+#           the result (values)
+# Returns:
+#    Dictionary of instruction indexes (keys) and the bits of the variables
+#    assigned before the instruction executes (values)
+def assignedBefore(codeM, bitD):
+    inD = {0: 0}
+    pendingM = [0]
+    while pendingM:
+        index = pendingM.pop()
+        instr = codeM[index]
+        assigned = inD[index]
+        if instr.op == OP_ASSIGN or instr.op == OP_INC:
+            assigned = assigned | bitD.get(instr.args[0], 0)
+        for succ in successors(codeM, index):
+            if succ >= len(codeM):
+                continue
+            old = inD.get(succ)
+            new = assigned if old is None else old & assigned
+            if new != old:
+                inD[succ] = new
+                pendingM.append(succ)
+    return inD
+
+# Function: checkProgram
+# Purpose:
+#    Find the problems of a decoded program
+# Parameters:
+#    codeM - array of Instr returned by decodeProgram, before it is optimized
+#            or folded
+#    regs - RegisterFile of the program, holding the declared values
+# Returns:
+#    (problemM, verified) where problemM is a list of (line number, message)
+#    in line order, and verified is True if the program has no problems and
+#    every numeric operand is certain to be an int, so that it may run on
+#    the fast path
+def checkProgram(codeM, regs):
+    problemM = []
+    verified = True
+    typeM = regs.typeM
+    valueM = regs.values
+    # Declared variables without a value which are read somewhere (keys) and
+    # their bit in the results of assignedBefore (values)
+    bitD = {}
+
+    # Problems which do not depend on the path taken to a line
+    for instr in codeM:
+        op = instr.op
+        if op == OP_RAISE:
+            problemM.append((instr.line, str(instr.args[1])))
+            continue
+        if (op == OP_IF or op == OP_GOTO) and instr.target is None:
+            problemM.append((instr.line, "label %s is not defined" % (instr.args[-1])))
+        if op == OP_ASSIGN or op == OP_IF:
+            operator = (instr.args[1] if op == OP_ASSIGN else instr.args[0])[0]
+            if operator is not None and operator not in binaryOpD:
+                problemM.append((instr.line, "unknown operator: %s" % (operator)))
+        for (slot, value), numeric in operands(instr):
+            if slot is None or valueM[slot] is not None:
+                continue
+            if typeM[slot] is None:
+                problemM.append((instr.line, "variable %s is not declared" % (value)))
+            elif slot not in bitD:
+                bitD[slot] = 1 << len(bitD)
+
+    indexM = reachable(codeM)
+    kindM = variableKinds(codeM, regs, indexM)
+    inD = assignedBefore(codeM, bitD) if bitD else {}
+
+    for index in indexM:
+        for (slot, value), numeric in operands(codeM[index]):
+            if slot is None:
+                kind = valueKind(value)
+            elif typeM[slot] is None:
+                continue
+            else:
+                kind = kindM[slot]
+                if slot in bitD and not inD[index] & bitD[slot]:
+                    line = codeM[index].line
+                    if kind == 0:
+                        problemM.append((line, "variable %s never has a value" % (value)))
+                        continue
+                    problemM.append((line, "variable %s may not have a value" % (value)))
+            if not numeric:
+                continue
+            if kind & KIND_TEXT:
+                if slot is None:
+                    problemM.append((codeM[index].line, "'%s' is not numeric" % (value)))
+                else:
+                    problemM.append((codeM[index].line,
+                                     "variable %s may not be numeric" % (value)))
+            elif kind & KIND_DIGITS:
+                verified = False
+
+    # A line which uses a variable twice reports its problem once
+    problemM = list(dict.fromkeys(problemM))
+    problemM.sort(key=lambda problem: problem[0])
+    return problemM, verified and problemM == []
+
+# Function: printProblems
+# Purpose:
+#    Print the problems found by checkProgram
+# Parameters:
+#    problemM - list of (line number, message)
+#    out - output sink (see beepOutput.py) or file object
+# Returns:
+#    N/A
+def printProblems(problemM, out=None):
+    for line, message in problemM:
+        print("*** line %d: %s ***" % (line, message), file=out)
+    if problemM == []:
+        print("no problems found", file=out)
+    else:
+        print("%d problem%s found" % (len(problemM), "" if len(problemM) == 1 else "s"), file=out)
@@ -0,0 +1,385 @@
+#! /usr/bin/python
+
+# Filename: beepCheckpoint.py by Geoffrey Sessums
+# Purpose:
+#     Saves the state of a running BEEP program to a snapshot file and lets a
+#     later run resume from it, so that a long program which is stopped (by
+#     its line or time limit, or by a signal before its process is killed)
+#     does not have to execute its lines again. A BEEP program has no input,
+#     so its state is only:
+#         - the instruction about to execute, recorded by its index in the
+#           decoded program (the line number - 1), which does not depend on
+#           how the program was optimized or folded
+#         - the number of lines executed
+#         - the values of the variables
+#     together with a hash of the source code, so a snapshot is never resumed
+#     by a different program. The Budget (see beepBudget.py) hands every
+#     stopping point to a Checkpointer, which writes a snapshot when one is
+#     due: every everyLines lines or everySeconds seconds, when a signal
+#     asked for one, and when a limit stops the program.
+# File format:
+#     The magic bytes followed by a zlib compressed marshal of a dictionary
+#     holding the format, the hash, the instruction index, the line count,
+#     the names and values of the variables and the nodes of their Ropes.
+#     marshal only holds the built in types, so a Numeral is written as
+#     ("N", int) and a Rope as ("R", node index); the nodes are written once
+#     each, children first, so Ropes which share pieces (e.g. after
+#     "ASSIGN s & s s") stay shared and are never built.
+
+import hashlib
+import marshal
+import os
+import signal
+import tempfile
+import time
+import zlib
+
+from beepBudget import BudgetExceeded
+from beepCompile import OP_DECODE
+from beepDict import Numeral
+from beepRope import Rope
+
+# First bytes of a snapshot file
+snapshotMagic = b"BEEPSNAP"
+
+# Changed whenever the layout of a snapshot changes
+snapshotFormat = 1
+
+# Function: programHash
+# Purpose:
+#    Hash the source code of a program
+# Parameters:
+#    lineM - array of lines of BEEP source code
+# Returns:
+#    Hexadecimal hash
+def programHash(lineM):
+    digest = hashlib.sha256()
+    for line in lineM:
+        digest.update(line.encode("utf-8", "surrogatepass"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+# Function: instrIndex
+# Purpose:
+#    Find the index in the decoded program of an instruction being executed
+# Parameters:
+#    codeM - array of Instr being executed, which may be folded
+#    pc - index of the instruction in codeM
+# Returns:
+#    Index of the instruction's line
+def instrIndex(codeM, pc):
+    instr = codeM[pc]
+    # A line which has not been decoded yet is at its own index
+    if instr.op == OP_DECODE:
+        return pc
+    return instr.line - 1
+
+# Function: encodeValue
+# Purpose:
+#    Convert the value of a variable into a value marshal can write
+# Parameters:
+#    value - value of a variable
+#    nodeM - list of the Rope nodes written so far, which the nodes of value
+#            are added to
+#    nodeD - dictionary of the ids of the Ropes in nodeM (keys) and their
+#            index (values)
+# Returns:
+#    The value, ("N", int) for a Numeral, or ("R", node index) for a Rope
+# Raises:
+#    TypeError if the value is of no type a variable holds
+def encodeValue(value, nodeM, nodeD):
+    if value is None or type(value) is int or type(value) is bool or type(value) is str:
+        return value
+    if type(value) is Numeral:
+        return ("N", int(value))
+    if type(value) is not Rope:
+        raise TypeError("cannot save a value of type %s" % (type(value).__name__))
+    # Every piece is written before the node which holds it; a stack is used
+    # since a string built in a loop is a very deep Rope
+    stackM = [value]
+    while stackM:
+        node = stackM[-1]
+        if id(node) in nodeD:
+            stackM.pop()
+            continue
+        if node.flat is not None:
+            entry = (node.flat, None, 1, node.length)
+        else:
+            pendingM = [piece for piece in (node.left, node.right)
+                        if type(piece) is Rope and id(piece) not in nodeD]
+            if pendingM:
+                stackM.extend(pendingM)
+                continue
+            entry = tuple(nodeD[id(piece)] if type(piece) is Rope else piece
+                          for piece in (node.left, node.right)) + (node.count, node.length)
+        stackM.pop()
+        nodeD[id(node)] = len(nodeM)
+        nodeM.append(entry)
+    return ("R", nodeD[id(value)])
+
+# Function: decodeValue
+# Purpose:
+#    Convert a value written by encodeValue back into the value of a variable
+# Parameters:
+#    value - value read from a snapshot
+#    ropeM - list of the Ropes of the snapshot, indexed like its nodes
+# Returns:
+#    Value of the variable
+def decodeValue(value, ropeM):
+    if type(value) is not tuple:
+        return value
+    if value[0] == "N":
+        return Numeral(value[1])
+    return ropeM[value[1]]
+
+# Function: encodeValues
+# Purpose:
+#    Convert the values of variables into values marshal can write
+# Parameters:
+#    valueD - dictionary containing variable names (keys) and values (values)
+# Returns:
+#    Dictionary of the names, their encoded values and the Rope nodes, which
+#    decodeValues converts back
+def encodeValues(valueD):
+    nodeM = []
+    nodeD = {}
+    nameM = list(valueD)
+    valueM = [encodeValue(valueD[name], nodeM, nodeD) for name in nameM]
+    return {"names": nameM, "values": valueM, "nodes": nodeM}
+
+# Function: decodeValues
+# Purpose:
+#    Convert values written by encodeValues back into the values of variables
+# Parameters:
+#    stateD - dictionary holding the names, values and nodes written by
+#             encodeValues
+# Returns:
+#    Dictionary containing variable names (keys) and values (values)
+def decodeValues(stateD):
+    ropeM = []
+    for left, right, count, length in stateD["nodes"]:
+        if type(left) is int:
+            left = ropeM[left]
+        if type(right) is int:
+            right = ropeM[right]
+        ropeM.append(Rope(left, right, count, length))
+    return {name: decodeValue(value, ropeM)
+            for name, value in zip(stateD["names"], stateD["values"])}
+
+# Class: Snapshot
+# Purpose:
+#    The saved state of a running program.
+# Attributes:
+#    programHash - hash of the program's source code (see programHash)
+#    index - index in the decoded program of the instruction about to execute
+#    counter - number of lines executed
+#    valueD - dictionary containing variable names (keys) and values (values)
+class Snapshot:
+    __slots__ = ("programHash", "index", "counter", "valueD")
+
+    def __init__(self, programHash, index, counter, valueD):
+        self.programHash = programHash
+        self.index = index
+        self.counter = counter
+        self.valueD = valueD
+
+    # Function: check
+    # Purpose:
+    #    Make sure the snapshot was saved by a program
+    # Parameters:
+    #    lineM - array of lines of the program's source code
+    # Raises:
+    #    ValueError if the snapshot was saved by a different program
+    def check(self, lineM):
+        if self.programHash != programHash(lineM) or self.index >= len(lineM):
+            raise ValueError("the snapshot was saved by a different program")
+
+    # Function: toBytes
+    # Purpose:
+    #    Encode the snapshot
+    # Returns:
+    #    Contents of a snapshot file
+    def toBytes(self):
+        stateD = {"format": snapshotFormat, "hash": self.programHash,
+                  "index": self.index, "counter": self.counter}
+        stateD.update(encodeValues(self.valueD))
+        return snapshotMagic + zlib.compress(marshal.dumps(stateD))
+
+    # Function: fromBytes
+    # Purpose:
+    #    Decode a snapshot
+    # Parameters:
+    #    data - contents of a snapshot file
+    # Returns:
+    #    Snapshot
+    # Raises:
+    #    ValueError if data is not a snapshot this version can read
+    @classmethod
+    def fromBytes(cls, data):
+        if not data.startswith(snapshotMagic):
+            raise ValueError("not a BEEP snapshot")
+        try:
+            stateD = marshal.loads(zlib.decompress(data[len(snapshotMagic):]))
+        except (zlib.error, EOFError, TypeError) as e:
+            raise ValueError("damaged snapshot: %s" % (e))
+        if not isinstance(stateD, dict) or stateD.get("format") != snapshotFormat:
+            raise ValueError("snapshot format is not supported")
+        return cls(stateD["hash"], stateD["index"], stateD["counter"], decodeValues(stateD))
+
+# Function: writeAtomically
+# Purpose:
+#    Write a file through a temporary file which is renamed over it, so a
+#    process killed while writing leaves the previous file in place and a
+#    reader never sees a partly written file
+# Parameters:
+#    fileName - name of the file
+#    data - contents of the file
+# Returns:
+#    N/A
+# Raises:
+#    OSError if the file cannot be written
+def writeAtomically(fileName, data):
+    fd, tempName = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(fileName) or ".")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.replace(tempName, fileName)
+    except BaseException:
+        try:
+            os.remove(tempName)
+        except OSError:
+            pass
+        raise
+
+# Function: writeSnapshot
+# Purpose:
+#    Write a snapshot file atomically
+# Parameters:
+#    fileName - name of the snapshot file
+#    snapshot - Snapshot
+# Returns:
+#    N/A
+# Raises:
+#    OSError if the file cannot be written
+def writeSnapshot(fileName, snapshot):
+    writeAtomically(fileName, snapshot.toBytes())
+
+# Function: readSnapshot
+# Purpose:
+#    Read a snapshot file
+# Parameters:
+#    fileName - name of the snapshot file
+# Returns:
+#    Snapshot
+# Raises:
+#    OSError if the file cannot be read
+#    ValueError if it is not a snapshot this version can read
+def readSnapshot(fileName):
+    with open(fileName, "rb") as file:
+        return Snapshot.fromBytes(file.read())
+
+# Class: Checkpointer
+# Purpose:
+#    Writes snapshots of a running program when they are due (see
+#    Budget.check in beepBudget.py).
+# Attributes:
+#    fileName - name of the snapshot file
+#    everyLines - lines executed between snapshots, or None
+#    everySeconds - seconds between snapshots, or None
+#    requested - True if a snapshot was asked for (see request)
+#    stopRequested - True if the program must stop once it is saved
+#    programHash - hash of the program being run
+#    regs - RegisterFile of the program being run
+#    lastCounter - line count of the last snapshot, or of the start
+#    lastTime - time of the last snapshot, or of the start
+#    saved - number of snapshots written
+class Checkpointer:
+    # Function: __init__
+    # Parameters:
+    #    fileName - name of the snapshot file
+    #    everyLines - lines executed between snapshots, or None
+    #    everySeconds - seconds between snapshots, or None
+    def __init__(self, fileName, everyLines=None, everySeconds=None):
+        self.fileName = fileName
+        self.everyLines = everyLines
+        self.everySeconds = everySeconds
+        self.requested = False
+        self.stopRequested = False
+        self.programHash = None
+        self.regs = None
+        self.lastCounter = 0
+        self.lastTime = time.monotonic()
+        self.saved = 0
+
+    # Function: attach
+    # Purpose:
+    #    Start watching a program as execution begins
+    # Parameters:
+    #    lineM - array of lines of the program's source code
+    #    regs - RegisterFile of the program
+    #    counter - number of lines executed before execution begins
+    # Returns:
+    #    N/A
+    def attach(self, lineM, regs, counter):
+        self.programHash = programHash(lineM)
+        self.regs = regs
+        self.lastCounter = counter
+        self.lastTime = time.monotonic()
+
+    # Function: request
+    # Purpose:
+    #    Ask for a snapshot at the next stopping point. This is safe to call
+    #    from a signal handler.
+    # Parameters:
+    #    stop - True to stop the program once the snapshot is saved
+    # Returns:
+    #    N/A
+    def request(self, stop=False):
+        self.requested = True
+        self.stopRequested = self.stopRequested or stop
+
+    # Function: reached
+    # Purpose:
+    #    Save a snapshot at a stopping point if one is due
+    # Parameters:
+    #    codeM - array of Instr being executed
+    #    pc - index of the instruction about to execute
+    #    counter - number of lines executed
+    #    stopping - True if a limit is about to stop the program
+    # Returns:
+    #    N/A
+    # Raises:
+    #    BudgetExceeded if a signal asked for the program to stop
+    def reached(self, codeM, pc, counter, stopping):
+        due = stopping or self.requested
+        if self.everyLines is not None and counter - self.lastCounter >= self.everyLines:
+            due = True
+        if self.everySeconds is not None and \
+                time.monotonic() - self.lastTime >= self.everySeconds:
+            due = True
+        if not due:
+            return
+        # A variable never loses its value, so one without a value has had
+        # none since the program started
+        writeSnapshot(self.fileName, Snapshot(self.programHash, instrIndex(codeM, pc),
+                                              counter, self.regs.toDict()))
+        self.saved = self.saved + 1
+        self.requested = False
+        self.lastCounter = counter
+        self.lastTime = time.monotonic()
+        if self.stopRequested and not stopping:
+            raise BudgetExceeded("stopped after saving a snapshot to %s" % (self.fileName),
+                                 counter)
+
+# Function: handleSignals
+# Purpose:
+#    Make signals ask a Checkpointer for snapshots: SIGUSR1 saves one and
+#    goes on, SIGTERM saves one and stops the program
+# Parameters:
+#    checkpointer - Checkpointer
+# Returns:
+#    N/A
+def handleSignals(checkpointer):
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda signalNum, frame: checkpointer.request())
+    signal.signal(signal.SIGTERM, lambda signalNum, frame: checkpointer.request(True))
@@ -0,0 +1,205 @@
+#! /usr/bin/python
+
+# Filename: beepClient.py by Geoffrey Sessums
+# Purpose:
+#     Runs a BEEP program on a running beepServer.py instead of in a new
+#     interpreter. The client only reads its command arguments, sends them to
+#     the server and copies the output the server streams back, so it imports
+#     none of the interpreter and starts much faster than beepDriver.py; the
+#     server's worker processes have already imported, loaded and warmed up
+#     everything needed to run the program.
+# Usage:
+#     python3 beepClient.py inputFile [flags]
+#     The flags are those of beepDriver.py (e.g. -v, -l 100000, -c), with the
+#     same meaning and the same output. inputFile may be - to send the source
+#     code read from stdin instead of a file name. The server is found at the
+#     address in the BEEP_SERVER environment variable, or at defaultAddress:
+#     a port number is a TCP port on this host, anything else is the path of
+#     a Unix socket. A server on a TCP port only runs requests which carry
+#     its token, which is read from the BEEP_TOKEN environment variable or
+#     from the file the server writes it to (see tokenFileName). File names
+#     are sent as they are given, with the directory they are relative to.
+#         Example: BEEP_SERVER=7777 python3 beepClient.py inputFile.txt -v
+# Protocol:
+#     The client and the server exchange JSON objects, one per line. The
+#     client sends a request for each program:
+#         {"id": any value, "path": program file name, or "source": source
+#          code and "name": its name, "flags": list of beepDriver.py flags,
+#          "cwd": directory the file names in path and flags are relative to,
+#          "token": token of a server on a TCP port,
+#          "profileJson": true to return the profile as JSON,
+#          "variables": true to return the final values of the variables}
+#     or {"id": any value, "stats": true} for the state of the server. The
+#     server answers with any number of {"id": ..., "output": text} followed
+#     by {"id": ..., "result": {"status": exit status, "lines": lines
+#     executed, "error": message or null, "errorLine": line or null,
+#     "seconds": run time, "cached": true if the result was found in the
+#     result cache given by -C, ...}}, or with {"id": ..., "failure":
+#     message} if the request could not be run (e.g. the server is busy).
+
+import json
+import os
+import socket
+import sys
+
+# Environment variable holding the address of the server
+addressEnvName = "BEEP_SERVER"
+
+# Environment variable holding the token of a server on a TCP port
+tokenEnvName = "BEEP_TOKEN"
+
+# Function: defaultAddress
+# Purpose:
+#    Find the address of the server when none is given
+# Returns:
+#    The address in the BEEP_SERVER environment variable, otherwise the path
+#    of a Unix socket in the temporary directory which belongs to this user
+#    (tempfile is not imported for this, as it takes longer than the rest)
+def defaultAddress():
+    address = os.environ.get(addressEnvName)
+    if address:
+        return address
+    return os.path.join(os.environ.get("TMPDIR") or "/tmp",
+                        "beepServer-%d.sock" % (os.getuid()))
+
+# Function: tokenFileName
+# Purpose:
+#    Find the file which a server on a TCP port writes its token to, which
+#    only the user can read
+# Parameters:
+#    address - port number
+# Returns:
+#    Name of the file in the user's home directory
+def tokenFileName(address):
+    return os.path.join(os.path.expanduser("~"), ".beepServer-%s.token" % (address))
+
+# Function: readToken
+# Purpose:
+#    Find the token of a server on a TCP port
+# Parameters:
+#    address - port number
+# Returns:
+#    The token in the BEEP_TOKEN environment variable, otherwise the one in
+#    the server's token file, or None if there is none
+def readToken(address):
+    token = os.environ.get(tokenEnvName)
+    if token:
+        return token
+    try:
+        with open(tokenFileName(address), encoding="ascii") as file:
+            return file.read().strip()
+    except OSError:
+        return None
+
+# Function: connect
+# Purpose:
+#    Connect to the server
+# Parameters:
+#    address - port number on this host, or path of a Unix socket
+# Returns:
+#    Connected socket
+# Raises:
+#    OSError if the server cannot be reached
+def connect(address):
+    if address.isdecimal():
+        return socket.create_connection(("127.0.0.1", int(address)))
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(address)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+# Function: request
+# Purpose:
+#    Send a request to the server and read its answers
+# Parameters:
+#    address - address of the server (see connect)
+#    requestD - request (see Protocol above)
+#    out - file object the output of the program is written to
+# Returns:
+#    Dictionary of the result, or {"failure": message} if the server could
+#    not run the request
+# Raises:
+#    OSError if the server cannot be reached or the connection is lost
+def request(address, requestD, out):
+    if address.isdecimal():
+        requestD = dict(requestD, token=readToken(address))
+    with connect(address) as sock, sock.makefile("rwb") as stream:
+        stream.write(json.dumps(requestD).encode("utf-8") + b"\n")
+        stream.flush()
+        for line in stream:
+            answerD = json.loads(line)
+            if "output" in answerD:
+                out.write(answerD["output"])
+            elif "result" in answerD:
+                return answerD["result"]
+            elif "failure" in answerD:
+                return answerD
+            elif "stats" in answerD:
+                return answerD["stats"]
+    raise ConnectionError("the server closed the connection")
+
+# Function: main
+# Purpose:
+#    Parse the command arguments and run the program on the server
+# Parameters:
+#    argM - command arguments, starting with the name of this program
+# Returns:
+#    Exit status, that of beepDriver.py for the same arguments
+def main(argM):
+    if len(argM) < 2:
+        print("Usage: python3 beepClient.py inputFile")
+        return 1
+
+    # The output file and the profile file are written here; every other
+    # flag is checked and used by the server, which is told the directory
+    # the file names are relative to since it runs in another
+    outputFile = None
+    profileFile = None
+    flagM = []
+    restM = argM[2:]
+    while restM != []:
+        flag = restM.pop(0)
+        if flag == "-o" and restM != []:
+            outputFile = restM.pop(0)
+        elif flag == "-P" and restM != []:
+            profileFile = restM.pop(0)
+        else:
+            flagM.append(flag)
+
+    requestD = {"id": os.getpid(), "flags": flagM, "cwd": os.getcwd(),
+                "profileJson": profileFile is not None}
+    if argM[1] == "-":
+        requestD["source"] = sys.stdin.read()
+        requestD["name"] = "<stdin>"
+    elif os.path.isfile(argM[1]) == False:
+        print("FILE EXISTENCE ERROR: " + argM[1])
+        return 1
+    else:
+        requestD["path"] = argM[1]
+
+    if outputFile is None:
+        out = sys.stdout
+    else:
+        out = open(outputFile, "w", encoding="latin-1")
+    address = defaultAddress()
+    try:
+        resultD = request(address, requestD, out)
+    except OSError as e:
+        print("SERVER ERROR: %s: %s" % (address, e), file=sys.stderr)
+        return 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if "failure" in resultD:
+        print(resultD["failure"])
+        return 1
+    if profileFile is not None and resultD.get("profile") is not None:
+        with open(profileFile, "w", encoding="utf-8") as file:
+            file.write(resultD["profile"])
+    return resultD["status"]
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
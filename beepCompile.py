@@ -0,0 +1,271 @@
+#! /usr/bin/python
+
+# Filename: beepCompile.py by Geoffrey Sessums
+# Purpose:
+#     Translates the lines of BEEP source code into a list of decoded
+#     instructions. Each line is tokenized, stripped of its label, and
+#     classified exactly once so that execute never has to re-tokenize or
+#     re-dispatch the text of a line it has already seen.
+# Input:
+#     lineM - array of lines read from BEEP source code.
+#     labelD - dictionary containing label names (keys) and line numbers (values)
+#     regs - RegisterFile which gives every variable a slot
+# Output:
+#     decodeProgram returns an array of Instr objects in which instruction i
+#     holds the decoded form of lineM[i], so a line number and an instruction
+#     index differ by one. foldProgram then removes the lines which do
+#     nothing, collapses GOTO chains, drops unreachable lines, and points
+#     every jump at the first instruction which really executes. The number of
+#     lines which were folded away is kept in skip and jumpSkip so execute
+#     still counts every line the original program would have executed.
+
+from beepErrors import TooFewOperands, VarNotDefined
+from beepDict import toNative
+
+# Opcodes
+OP_NOP = 0       # blank lines, VAR declarations, and unknown statements
+OP_ASSIGN = 1    # args: (slot, expr)
+OP_IF = 2        # args: (expr, label), target: index of the label's instruction
+OP_GOTO = 3      # args: (label,), target: index of the label's instruction
+OP_PRINT = 4     # args: tuple of operands
+OP_RAISE = 5     # args: (exception class, message)
+OP_INC = 6       # args: (slot, name, amount) (see beepOptimize.py)
+OP_DECODE = 7    # a line which has not been decoded yet (see decodeStub)
+
+opNameM = ["NOP", "ASSIGN", "IF", "GOTO", "PRINT", "RAISE", "INC", "DECODE"]
+
+# Class: Instr
+# Purpose:
+#    A single decoded BEEP statement.
+# Attributes:
+#    op - one of the OP_ opcodes
+#    args - tuple of decoded operands; its layout depends on op
+#    target - index of the instruction a GOTO or IF jumps to, or None if the
+#             label is not defined
+#    line - line number of the statement in the BEEP source code
+#    next - index of the instruction executed after this one when it does not
+#           jump
+#    skip - number of folded lines executed between this instruction and next
+#    jumpSkip - number of folded lines executed between this instruction and
+#               target when it jumps
+class Instr:
+    __slots__ = ("op", "args", "target", "line", "next", "skip", "jumpSkip")
+
+    def __init__(self, op, args, line, target=None):
+        self.op = op
+        self.args = args
+        self.target = target
+        self.line = line
+        self.next = line    # the index of the following line
+        self.skip = 0
+        self.jumpSkip = 0
+
+    def __repr__(self):
+        return "Instr(%s, %r, line=%d, target=%r, next=%d)" % (
+            opNameM[self.op], self.args, self.line, self.target, self.next)
+
+# The instruction held by every line of a lazily decoded program until the
+# line is first executed, when execute decodes it and replaces the stub
+decodeStub = Instr(OP_DECODE, (), 0)
+
+# Function: decodeOperand
+# Purpose:
+#    Decode a single varLiteral token
+# Parameters:
+#    token - a string literal, numeric constant, or variable name
+#    regs - RegisterFile which gives every variable a slot
+#    plain - True if the operand is used by an operator, in which case a
+#            numeric constant is stored as a plain int rather than a Numeral
+# Returns:
+#    (None, value) for string literals and numeric constants
+#    (slot, name) for variables
+def decodeOperand(token, regs, plain=False):
+    # Strip the quotes from a string literal
+    if token[0] == '"':
+        return (None, token[1:-1])
+    if token.isdecimal():
+        value = toNative(token)
+        if plain and type(value) is not str:
+            value = int(value)
+        return (None, value)
+    return (regs.slot(token), token)
+
+# Function: decodeExpr
+# Purpose:
+#    Decode the tokens of an expression
+# Parameters:
+#    exprM - list of expression tokens (see evalExpr in beepExec.py)
+#    regs - RegisterFile which gives every variable a slot
+# Returns:
+#    (None, operand, None) for a single item expression
+#    (operator, operand1, operand2) for a three item expression
+# Raises:
+#    TooFewOperands if the expression has neither one nor three items
+def decodeExpr(exprM, regs):
+    if len(exprM) == 1:
+        return (None, decodeOperand(exprM[0], regs), None)
+    elif len(exprM) != 3:
+        raise TooFewOperands("expression '%s' has too few operands" % (exprM))
+    return (exprM[0], decodeOperand(exprM[1], regs, True),
+            decodeOperand(exprM[2], regs, True))
+
+# Function: resolveLabel
+# Purpose:
+#    Find the instruction index of a label
+# Parameters:
+#    label - label name
+#    labelD - dictionary containing label names (keys) and line numbers (values)
+# Returns:
+#    Index of the label's line, or None if the label is not defined
+def resolveLabel(label, labelD):
+    lineNum = labelD.get(label)
+    if lineNum is None:
+        return None
+    return lineNum - 1
+
+# Function: decodeLine
+# Purpose:
+#    Decode one line of BEEP source code into an instruction. Errors which the
+#    line would raise when executed become OP_RAISE instructions so that they
+#    are still reported only if, and when, the line runs.
+# Parameters:
+#    line - text of the line
+#    lineNum - line number of the line in the BEEP source code
+#    labelD - dictionary containing label names (keys) and line numbers (values)
+#    regs - RegisterFile which gives every variable a slot
+# Returns:
+#    Instr
+def decodeLine(line, lineNum, labelD, regs):
+    tokenM = line.split()
+    try:
+        # Blank lines do nothing
+        if tokenM == []:
+            return Instr(OP_NOP, (), lineNum)
+        # If the first token is a label, then decode the following statement
+        if tokenM[0][-1] == ':':
+            tokenM = tokenM[1:]
+        token = tokenM[0]
+
+        if token == "ASSIGN":
+            varNm = tokenM[1]
+            slot = regs.slot(varNm)
+            # Is varNm defined?
+            if not regs.isDeclared(slot):
+                raise VarNotDefined("variable %s is not defined" % (varNm))
+            return Instr(OP_ASSIGN, (slot, decodeExpr(tokenM[2:], regs)), lineNum)
+
+        if token.upper() == "IF":
+            # The label is always the last token
+            label = tokenM[-1]
+            return Instr(OP_IF, (decodeExpr(tokenM[1:-1], regs), label), lineNum,
+                         resolveLabel(label, labelD))
+
+        if token == "GOTO":
+            label = tokenM[1]
+            return Instr(OP_GOTO, (label,), lineNum, resolveLabel(label, labelD))
+
+        if token == "PRINT":
+            return Instr(OP_PRINT, tuple(decodeOperand(tok, regs) for tok in tokenM[1:]),
+                         lineNum)
+    except Exception as e:
+        return Instr(OP_RAISE, (type(e), e.args[-1]), lineNum)
+    return Instr(OP_NOP, (), lineNum)
+
+# Function: decodeProgram
+# Purpose:
+#    Decode every line of BEEP source code
+# Parameters:
+#    lineM - array of lines read from BEEP source code.
+#    labelD - dictionary containing label names (keys) and line numbers (values)
+#    regs - RegisterFile which gives every variable a slot
+# Returns:
+#    Array of Instr, one per line of lineM
+def decodeProgram(lineM, labelD, regs):
+    return [decodeLine(line, i + 1, labelD, regs) for i, line in enumerate(lineM)]
+
+# Function: undefinedLabels
+# Purpose:
+#    Find the GOTO and IF statements which refer to a label that is not defined
+# Parameters:
+#    codeM - array of Instr returned by decodeProgram
+# Returns:
+#    List of (label, line number) tuples
+def undefinedLabels(codeM):
+    return [(instr.args[-1], instr.line) for instr in codeM
+            if (instr.op == OP_IF or instr.op == OP_GOTO) and instr.target is None]
+
+# Function: landing
+# Purpose:
+#    Follow the lines executed from a given line until one is reached which
+#    does something: blank lines, declarations and unknown statements are
+#    passed over, and so is every GOTO whose label is defined. A GOTO which is
+#    reached a second time stops the walk, so a GOTO loop is still executed.
+# Parameters:
+#    codeM - array of Instr returned by decodeProgram
+#    index - index of the first line executed
+# Returns:
+#    (index, count) where index is the instruction reached (len(codeM) if
+#    execution falls off the end) and count is the number of lines passed over
+def landing(codeM, index):
+    count = 0
+    seenS = set()
+    while index < len(codeM):
+        instr = codeM[index]
+        if instr.op == OP_NOP:
+            index = index + 1
+        elif instr.op == OP_GOTO and instr.target is not None and index not in seenS:
+            seenS.add(index)
+            index = instr.target
+        else:
+            break
+        count = count + 1
+    return index, count
+
+# Function: foldProgram
+# Purpose:
+#    Resolve every jump and fall through to the instruction which really
+#    executes next, and drop the instructions which can never be reached
+# Parameters:
+#    codeM - array of Instr returned by decodeProgram
+#    start - index of the line execution starts at (e.g. where a snapshot
+#            was saved, see beepCheckpoint.py)
+# Returns:
+#    (foldM, entry, entrySkip) where foldM is the folded array of Instr, entry
+#    is the index of the first instruction executed, and entrySkip is the
+#    number of lines passed over before it
+def foldProgram(codeM, start=0):
+    end = len(codeM)
+    entry, entrySkip = landing(codeM, start)
+
+    # Find the reachable instructions and where each one continues
+    nextD = {}
+    targetD = {}
+    pendingM = [entry]
+    while pendingM:
+        index = pendingM.pop()
+        if index == end or index in nextD:
+            continue
+        instr = codeM[index]
+        nextD[index] = landing(codeM, index + 1)
+        if instr.op != OP_GOTO:
+            pendingM.append(nextD[index][0])
+        if instr.target is not None:
+            targetD[index] = landing(codeM, instr.target)
+            pendingM.append(targetD[index][0])
+
+    # Keep the reachable instructions in source order and renumber them
+    keptM = sorted(nextD)
+    newIndexD = {index: i for i, index in enumerate(keptM)}
+    newIndexD[end] = len(keptM)
+    foldM = []
+    for index in keptM:
+        old = codeM[index]
+        instr = Instr(old.op, old.args, old.line)
+        # A GOTO never falls through, so its next instruction may be gone
+        instr.next = newIndexD.get(nextD[index][0], len(keptM))
+        instr.skip = nextD[index][1]
+        if index in targetD:
+            instr.target = newIndexD[targetD[index][0]]
+            instr.jumpSkip = targetD[index][1]
+        foldM.append(instr)
+    return foldM, newIndexD[entry], entrySkip
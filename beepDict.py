@@ -2,12 +2,52 @@
 
 # Filename: beepDict.py by Geoffrey Sessums
 # Purpose:
-#     Provides the functions declareVar, printVariables, printLabels, & addLabel
+#     Provides the class Numeral and the functions toNative, declareVar,
+#     printVariables, printLabels, & addLabel
+
+# Class: Numeral
+# Purpose:
+#    An int which was written in the BEEP source code. It behaves exactly like
+#    the int, except that it is never equal to True, just as the text it was
+#    read from is not. This keeps "IF x label" from jumping when x holds a 1
+#    which was declared or assigned from a constant rather than computed.
+class Numeral(int):
+    __slots__ = ()
+
+    def __eq__(self, other):
+        if other is True:
+            return False
+        return int.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = int.__hash__
+
+# Function: toNative
+# Purpose:
+#    Convert the text of a numeric value into a Numeral. The text is only
+#    converted if the int prints back as exactly the same text (e.g. "007" and
+#    "+5" stay strings) so that the value behaves identically whether it is
+#    used as a number or as a string.
+# Parameters:
+#    text - text of the value
+# Returns:
+#    Numeral value of text, or text itself if it is not a canonical integer
+def toNative(text):
+    try:
+        value = int(text)
+    except ValueError:
+        return text
+    if str(value) != text:
+        return text
+    return Numeral(value)
 
 # Function: declareVar
 # Purpose:
 #    Saves variable names, types, and optional values in the dictionaries:
 #        varTypeD, varValueD, typeD, valueD
+#    The values of INT variables are saved as Python ints.
 # Parameters:
 #    tokenM - array containing variable name, type, and optional value
 #    varTypeD - dictionary containing variable names (keys) and types (values)
@@ -19,37 +59,44 @@ def declareVar(tokenM, varTypeD, varValueD):
     # If tokenM contains optional value, then save it in value dictionary
     if len(tokenM) == 3 :
         if tokenM[2][0] == '"':
-            varValueD[tokenM[1]] = tokenM[2].strip('"')
+            value = tokenM[2].strip('"')
         else:
-            varValueD[tokenM[1]] = tokenM[2]
+            value = tokenM[2]
+        if tokenM[0] == "INT":
+            value = toNative(value)
+        varValueD[tokenM[1]] = value
 
 # Function: printVariables
 # Purpose:
 #    Print a list of variable names, types, and possibly values 
 # Parameters:
-#    None 
+#    varTypeD - dictionary containing variable names (keys) and types (values)
+#    varValueD - dictionary containing variable names (keys) and values (values)
+#    out - output sink (see beepOutput.py), or None for sys.stdout
 # Returns:
 #    N/A
-def printVariables(varTypeD, varValueD):
+def printVariables(varTypeD, varValueD, out=None):
     for name in sorted(varTypeD):
         # If value for variable (i.e. key) is not found, then print the variable
         # name and type
         if varValueD.get(name, "NF") == "NF":
-            print("    %-12s %-9s" % (name.upper(), varTypeD[name]))
+            print("    %-12s %-9s" % (name.upper(), varTypeD[name]), file=out)
         else:
             # Otherwise print variable name, type, and value
-            print("    %-12s %-9s %s" % (name.upper(), varTypeD[name], varValueD[name]))
+            print("    %-12s %-9s %s" % (name.upper(), varTypeD[name], varValueD[name]),
+                  file=out)
 
 # Function: printLabels
 # Purpose:
 #   Print a list of labels along with their line number
 # Parameters:
-#    None 
+#    labelD - dictionary containing label names (keys) and line numbers (values)
+#    out - output sink (see beepOutput.py), or None for sys.stdout
 # Returns:
 #    N/A
-def printLabels(labelD):
+def printLabels(labelD, out=None):
     for label in sorted(labelD):
-        print("    %-12s %s" % (label.upper(), labelD[label]))
+        print("    %-12s %s" % (label.upper(), labelD[label]), file=out)
 
 # Function: addLabel
 # Purpose:
@@ -57,11 +104,13 @@ def printLabels(labelD):
 # Parameters:
 #    label - label name
 #    count - line number of label
+#    out - output sink (see beepOutput.py), or None for sys.stdout
 # Returns:
 #    N/A
-def addLabel(labelD, token, count):
+def addLabel(labelD, token, count, out=None):
     # If label is not found in label dictionary, then add it; otherwise print error
     if labelD.get(token, "NF") == "NF": 
         labelD[token] = count
     else:
-        print("***Error: label %s appears on multiple lines: %s and %s" % (token, labelD[token], count))
+        print("***Error: label %s appears on multiple lines: %s and %s" % (token, labelD[token], count),
+              file=out)
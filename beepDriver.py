@@ -10,6 +10,64 @@
 #    Optionally the program my be passed a -v switch which causes the execution
 #    to be verbose:
 #        Example: python3 beepDriver.py inputFile.txt -v
+#    Optionally the program may be passed a -O0 switch which executes the
+#    program without optimizing it (see beepOptimize.py):
+#        Example: python3 beepDriver.py inputFile.txt -O0
+#    Optionally the program may be passed a -b switch followed by the name of
+#    the backend which executes the program: interp (the default) interprets
+#    it, python translates it into Python code first (see beepTranspile.py),
+#    and jit interprets it but compiles its hot loops (see beepJit.py):
+#        Example: python3 beepDriver.py inputFile.txt -b python
+#    Optionally the program may be passed a -m switch followed by the most
+#    characters the strings held by its variables may have in total (0 for no
+#    limit, the default):
+#        Example: python3 beepDriver.py inputFile.txt -m 1000000
+#    Optionally the program may be passed a -l switch followed by the most
+#    lines it may execute (5000 by default, 0 for no limit), a -t switch
+#    followed by the most seconds it may run (0 for no limit, the default),
+#    and a -d switch which stops it
+#    as soon as it is caught in an infinite loop (see beepBudget.py):
+#        Example: python3 beepDriver.py inputFile.txt -l 1000000 -t 2.5 -d
+#    Optionally the program may be passed a -o switch followed by the name of
+#    a file which everything is written to instead of stdout:
+#        Example: python3 beepDriver.py inputFile.txt -o output.txt
+#    The loaded program is cached in the directory named by the BEEPCACHE
+#    environment variable, beep in the user's cache directory by default (see
+#    beepCache.py). Optionally the program may be passed a -n switch which
+#    neither reads nor writes the cache:
+#        Example: python3 beepDriver.py inputFile.txt -n
+#    Optionally the program may be passed a -M switch which memory maps the
+#    input file and decodes each line when it is first executed (see
+#    beepLoader.py), and a -q switch which leaves out the source listing and
+#    the tables of variables and labels:
+#        Example: python3 beepDriver.py hugeFile.txt -M -q
+#    Optionally the program may be passed a -p switch which profiles the
+#    program and prints its hottest lines and loops when it ends, and a -P
+#    switch followed by the name of a file to write the profile to as JSON
+#    (see beepProfile.py):
+#        Example: python3 beepDriver.py inputFile.txt -p -P profile.json
+#    Optionally the program may be passed a -T switch followed by a number of
+#    lines; the last lines executed are kept and printed if the program stops
+#    with an error or reaches a limit (see beepTrace.py):
+#        Example: python3 beepDriver.py inputFile.txt -T 64
+#    Optionally the program may be passed a -c switch which checks the program
+#    and prints the problems which could stop it with an error instead of
+#    running it (see beepCheck.py); the exit status is 1 if there are any:
+#        Example: python3 beepDriver.py inputFile.txt -c
+#    Optionally the program may be passed a -S switch followed by the name of
+#    a snapshot file, which the state of the program is saved to when it
+#    reaches a limit, when the process receives SIGUSR1, and when it receives
+#    SIGTERM, which then stops it; a -E switch followed by a number of lines,
+#    or of seconds followed by s, saves it periodically as well. A -R switch
+#    followed by the name of a snapshot file resumes the program from it (see
+#    beepCheckpoint.py):
+#        Example: python3 beepDriver.py long.txt -l 0 -S long.snap -E 600s
+#        Example: python3 beepDriver.py long.txt -l 0 -S long.snap -R long.snap
+#    Optionally the program may be passed a -C switch followed by the name of
+#    a directory which the results of runs are kept in; a run which was made
+#    before prints the same output without executing the program again (see
+#    beepMemo.py):
+#        Example: python3 beepDriver.py inputFile.txt -C results
 # Output:
 #    Prints the BEEP source code within the input file along with a line number
 #    Prints a sorted list of variables found with the BEEP source code
@@ -18,6 +76,11 @@
 #    Prints a statement indicating where execution begins
 #    Optionally prints the line number followed by the executing BEEP statement
 #     when in verbose mode
+#    The output is buffered (see beepOutput.py) and written when the buffer
+#     fills and when the program ends
+# Notes:
+#    The program is loaded and run through the Program and Interpreter classes
+#    (see beepInterp.py), which other Python programs may use directly.
 
 
 # Import sys to obtain command arguments
@@ -30,83 +93,187 @@ import re
 import os.path
 import os
 
-# Import driver functions
-from beepDict import addLabel, printLabels, printVariables, declareVar
-from beepExec import execute
+# Import driver classes
+from beepInterp import Program, Interpreter
+from beepOutput import OutputSink, FileSink
+from beepCache import loadProgram
+from beepLoader import loadMapped
+from beepCheck import printProblems
+from beepCheckpoint import Checkpointer, readSnapshot, handleSignals
+from beepMemo import ResultCache
 
-# Variables 
-labelD = {}
-varTypeD = {}
-varValueD = {}
-lineM = [] 
-count = 0
-switch = ""
-
-# Print usage message and exit program, if less than 2 command arguments
-if len(sys.argv) < 2:
-    print("Usage: python3 beepDriver.py inputFile")
-    sys.exit(1)
-
-# Check for optional -v flag
-if len(sys.argv) == 3:
-    switch = sys.argv[2]
-    if (switch != "-v"):
-        print("Unkown Flag: %s" % (switch))
-        sys.exit(1)
-
-# Verify that file exists
-if os.path.isfile(sys.argv[1]) == False:
-    print("FILE EXISTENCE ERROR: " + sys.argv[1])
-    sys.exit(1)
-
-# Open input file for reading
-file = open(sys.argv[1], "r", encoding='latin-1')
-
-# Print header
-print("BEEP source code in " + sys.argv[1] + ":")
-
-# Read lines of text from the input file
-while True:
-    inputLine = file.readline()
-
-    # check for no input (i.e. EOF)
-    if inputLine == "":
-        break
-    count = count + 1
-    inputLine = inputLine.rstrip('\n')  # remove the newline
-
-    # Tokenize input line
-    tokenM = inputLine.split()
-    # If token array is empty (blank line), then skip it
-    if tokenM != []:
-        token = tokenM[0]
+# Function: parseFlag
+# Purpose:
+#    Parse a flag which sets an option of execute (-O0, -b, -m, -l, -t, -d)
+# Parameters:
+#    flag - the flag
+#    flagM - list of the command arguments after the flag; the value of the
+#            flag is removed from it
+#    optionD - dictionary of Interpreter keyword arguments (keys) and values
+#              (values) which the option is added to
+# Returns:
+#    True if the flag was one of these flags
+def parseFlag(flag, flagM, optionD):
+    if flag == "-O0":
+        optionD["optimize"] = False
+    elif flag == "-b" and flagM != [] and flagM[0] in ("interp", "python", "jit"):
+        optionD["backend"] = flagM.pop(0)
+    elif flag == "-m" and flagM != [] and flagM[0].isdecimal():
+        optionD["memoryLimit"] = int(flagM.pop(0)) or None
+    elif flag == "-l" and flagM != [] and flagM[0].isdecimal():
+        optionD["maxLines"] = int(flagM.pop(0)) or None
+    elif flag == "-t" and flagM != [] and re.fullmatch(r"\d+(\.\d*)?", flagM[0]):
+        optionD["maxSeconds"] = float(flagM.pop(0)) or None
+    elif flag == "-d":
+        optionD["detectLoops"] = True
+    else:
+        return False
+    return True
 
-    # If the first token is a label, then add label and count to dictionary
-    if token[-1] == ':':
-        # Strip the colon and make uppercase
-        token = token.rstrip(':')
-        addLabel(labelD, token, count)
+# Function: parseFlags
+# Purpose:
+#    Parse the flags which follow the input file (see Usage above)
+# Parameters:
+#    flagM - list of the flags
+#    localFiles - False to refuse -o and -P, whose files are written by the
+#                 caller (e.g. beepClient.py for beepServer.py)
+# Returns:
+#    Dictionary of the settings (keys) and their values (values); optionD
+#    holds the Interpreter keyword arguments (see parseFlag)
+# Raises:
+#    ValueError if a flag is not known
+def parseFlags(flagM, localFiles=True):
+    settingD = {"verbose": False, "optionD": {}, "outputFile": None, "useCache": True,
+                "mapped": False, "full": True, "report": False, "profileFile": None,
+                "traceSize": 0, "checkOnly": False, "snapshotFile": None, "everyLines": None,
+                "everySeconds": None, "resumeFile": None, "resultCacheDir": None}
+    flagM = list(flagM)
+    while flagM != []:
+        flag = flagM.pop(0)
+        if flag == "-v":
+            settingD["verbose"] = True
+        elif parseFlag(flag, flagM, settingD["optionD"]):
+            pass
+        elif flag == "-o" and flagM != [] and localFiles:
+            settingD["outputFile"] = flagM.pop(0)
+        elif flag == "-n":
+            settingD["useCache"] = False
+        elif flag == "-M":
+            settingD["mapped"] = True
+        elif flag == "-q":
+            settingD["full"] = False
+        elif flag == "-p":
+            settingD["report"] = True
+        elif flag == "-P" and flagM != [] and localFiles:
+            settingD["profileFile"] = flagM.pop(0)
+        elif flag == "-T" and flagM != [] and flagM[0].isdecimal():
+            settingD["traceSize"] = int(flagM.pop(0))
+        elif flag == "-c":
+            settingD["checkOnly"] = True
+        elif flag == "-S" and flagM != []:
+            settingD["snapshotFile"] = flagM.pop(0)
+        elif flag == "-E" and flagM != [] and flagM[0].isdecimal() and int(flagM[0]) > 0:
+            settingD["everyLines"] = int(flagM.pop(0))
+        elif flag == "-E" and flagM != [] and re.fullmatch(r"\d+(\.\d*)?s", flagM[0]):
+            settingD["everySeconds"] = float(flagM.pop(0)[:-1])
+        elif flag == "-R" and flagM != []:
+            settingD["resumeFile"] = flagM.pop(0)
+        elif flag == "-C" and flagM != []:
+            settingD["resultCacheDir"] = flagM.pop(0)
+        else:
+            raise ValueError("Unkown Flag: %s" % (flag))
+    return settingD
 
-    # If the first token is "VAR", then declare a variable
-    if token == "VAR":
-        declareVar(tokenM[1:], varTypeD, varValueD)
+# Function: main
+# Purpose:
+#    Parse the command arguments, then load and run the BEEP program
+# Parameters:
+#    argM - command arguments, starting with the name of this program
+# Returns:
+#    Exit status
+def main(argM):
+    # Print usage message and exit program, if less than 2 command arguments
+    if len(argM) < 2:
+        print("Usage: python3 beepDriver.py inputFile")
+        return 1
 
-    # Print Beep source code with line numbers
-    print(str(count).rjust(3) + ". " + inputLine)
+    # Check for optional -v, -O0, -b, -m, -l, -t, -d, -o, -n, -M, -q, -p, -P,
+    # -T, -c, -S, -E, -R and -C flags
+    try:
+        settingD = parseFlags(argM[2:])
+    except ValueError as e:
+        print(e)
+        return 1
 
-    lineM.append(inputLine)
+    # Verify that file exists
+    if os.path.isfile(argM[1]) == False:
+        print("FILE EXISTENCE ERROR: " + argM[1])
+        return 1
 
-# Close file
-file.close()
+    resumeFile = settingD["resumeFile"]
+    checkOnly = settingD["checkOnly"]
+    snapshot = None
+    if resumeFile is not None and not checkOnly:
+        try:
+            snapshot = readSnapshot(resumeFile)
+        except (OSError, ValueError) as e:
+            print("SNAPSHOT ERROR: %s: %s" % (resumeFile, e))
+            return 1
+    checkpointer = None
+    if settingD["snapshotFile"] is not None and not checkOnly:
+        checkpointer = Checkpointer(settingD["snapshotFile"], settingD["everyLines"],
+                                    settingD["everySeconds"])
+        handleSignals(checkpointer)
 
-# Print list of variables
-print("Variables:")
-print("    %-12s %-9s %s" % ("Variable", "Type", "Value"))
-printVariables(varTypeD, varValueD)
+    # A mapped program is only decoded as it runs, so it cannot be checked
+    mapped = settingD["mapped"] and not checkOnly
+    if mapped:
+        program = loadMapped(argM[1])
+    elif settingD["useCache"]:
+        program = loadProgram(argM[1])
+    else:
+        program = Program.fromFile(argM[1])
+    if snapshot is not None:
+        try:
+            snapshot.check(program.lineM)
+        except ValueError as e:
+            print("SNAPSHOT ERROR: %s: %s" % (resumeFile, e))
+            if mapped:
+                program.close()
+            return 1
 
-# Print list of labels
-print("Labels:")
-print("    %-12s %s" % ("Label", "Statement"))
-printLabels(labelD)
+    # Everything is printed to out
+    if settingD["outputFile"] is None:
+        out = OutputSink()
+    else:
+        out = FileSink(settingD["outputFile"])
+    try:
+        if checkOnly:
+            problemM = program.check()
+            printProblems(problemM, out)
+            return 0 if problemM == [] else 1
+        # Print the source code with line numbers, the variables and the
+        # labels, then execute the program
+        cache = None
+        if settingD["resultCacheDir"] is not None:
+            cache = ResultCache(settingD["resultCacheDir"])
+        full = settingD["full"]
+        profileFile = settingD["profileFile"]
+        interpreter = Interpreter(out, listing=full, tables=full, verbose=settingD["verbose"],
+                                  profile=settingD["report"] or profileFile is not None,
+                                  traceSize=settingD["traceSize"], cache=cache,
+                                  **settingD["optionD"])
+        result = interpreter.run(program, checkpointer=checkpointer, snapshot=snapshot)
+        if settingD["report"]:
+            result.profile.printReport(out)
+        if profileFile is not None:
+            with open(profileFile, "w", encoding="utf-8") as file:
+                result.profile.writeJson(file)
+    finally:
+        out.close()
+        if mapped:
+            program.close()
+    return 0
 
-execute(lineM, labelD, varTypeD, varValueD, switch)
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,40 @@
+#! /usr/bin/python
+
+# Filename: beepErrors.py by Geoffrey Sessums
+# Purpose:
+#     Provides the exceptions raised while compiling and executing BEEP source
+#     code:
+#         TooFewOperands – the various operations were given too few operands 
+#             (e.g., only one operand for a greater than)
+#         VarNotDefined – a referenced variable is not defined
+#         LabelNotDefined – a referenced label is not defined
+#         InvalidExpression – other problems with expressions such as unknown 
+#             operator
+#         InvalidValueType – an operation expecting an INT had a value which 
+#             was of the wrong type
+#         MemoryLimitExceeded – the strings held by the variables of a program
+#             are longer than its limit allows
+
+class TooFewOperands(Exception):
+    def __init__(self, *args, **kwargs):
+        super().__init__(self, *args, **kwargs)
+
+class VarNotDefined(Exception):
+    def __init__(self, *args, **kwargs):
+        super().__init__(self, *args, **kwargs)
+
+class LabelNotDefined(Exception):
+    def __init__(self, *args, **kwargs):
+        super().__init__(self, *args, **kwargs)
+
+class InvalidExpression(Exception):
+    def __init__(self, *args, **kwargs):
+        super().__init__(self, *args, **kwargs)
+
+class InvalidValueType(Exception):
+    def __init__(self, *args, **kwargs):
+        super().__init__(self, *args, **kwargs)
+
+class MemoryLimitExceeded(Exception):
+    def __init__(self, *args, **kwargs):
+        super().__init__(self, *args, **kwargs)
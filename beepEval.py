@@ -0,0 +1,241 @@
+#! /usr/bin/python
+
+# Filename: beepEval.py by Geoffrey Sessums
+# Purpose:
+#     Provides the functions which evaluate BEEP expressions. Operands are
+#     decoded by beepCompile.py and variable values are read from the values
+#     list of a RegisterFile.
+
+from beepErrors import VarNotDefined, InvalidExpression, InvalidValueType
+from beepRope import toText, concat, replicate
+
+# Dictionary of prefixed operators (keys) and the functions which evaluate
+# them (values). It is filled in at the end of the file, once the functions
+# are defined.
+binaryOpD = {}
+
+# Function: evalExpr
+# Purpose:
+#    Evaluates expressions
+# Parameters:
+#    expr - decoded expression (see decodeExpr in beepCompile.py) which is one of:
+#        varLiteral	           return the string value (without the ") for a string 
+#                                  literal, the value of a numeric constant or return the 
+#                                  value of a variable
+#        * varLiteral varNumber	   return a string with varLiteral replicated varNumber times
+#        + varNumber1 varNumber2   return the sum of the values
+#        - varNumber1 varNumber2   return the difference of the values (varNumber1 minus varNumber2)
+#        > varNumber1 varNumber2   return True if varNumber1 > varNumber2; this is a numeric comparison
+#        >= varNumber1 varNumber2  return True if varNumber1 >= varNumber2; this is a numeric comparison
+#        & varLiteral1 varLiteral2 return the concatenation of the two strings
+#    values - list of variable values indexed by slot
+# Returns:
+#    Evaluated value of expression
+def evalExpr(expr, values):
+    operator, operand1, operand2 = expr
+    # Evaluate single item expression
+    if operator is None:
+        return evalVar(operand1, values)
+    # Evaluate three item expressions by first getting operands
+    op1 = evalVar(operand1, values)
+    op2 = evalVar(operand2, values)
+    # Evaluate prefixed operator
+    func = binaryOpD.get(operator)
+    if func is None:
+        raise InvalidExpression("unknown operator: %s " % (operator))
+    return func(op1, op2)
+
+# Function: toInt
+# Purpose:
+#    Convert an operand to an int. Values which are already ints (the usual
+#    case, since INT variables and numeric constants are stored as ints) are
+#    returned without conversion.
+# Parameters:
+#    op - operand
+# Returns:
+#    int value of the operand
+def toInt(op):
+    if type(op) is int:
+        return op
+    try:
+        return int(op)
+    except:
+        raise InvalidValueType("'%s' is not numeric" % (op))
+
+# Function: evalGreater
+# Purpose:
+#    Evaluate a greater than expression
+# Parameters:
+#    op1 - first operand
+#    op2 - second operand
+# Returns:
+#    True if op1 is greater than op2
+#    False if op1 is NOT greater than op2
+def evalGreater(op1, op2):
+    iVal1 = toInt(op1)
+    iVal2 = toInt(op2)
+    return iVal1 > iVal2
+
+# Function: evalGreaterEq
+# Purpose:
+#    Evaluate a greater than or equal expression
+# Parameters:
+#    op1 - first operand
+#    op2 - second operand
+# Returns:
+#    True if op1 is greater than or equal to op2
+#    False if op1 is NOT greater than or equal to op2
+def evalGreaterEq(op1, op2):
+    iVal1 = toInt(op1)
+    iVal2 = toInt(op2)
+    return iVal1 >= iVal2
+
+# Function: evalCat
+# Purpose:
+#    Evaluate concantenation statement
+# Parameters:
+#    op1 - first operand
+#    op2 - second operand
+# Returns:
+#    The concatenation of two strings, which is a Rope if it is long
+def evalCat(op1, op2):
+    try:
+        str1 = toText(op1)
+    except:
+        raise InvalidValueType("Operand is not a string")
+    try:
+        str2 = toText(op2)
+    except:
+        raise InvalidValueType("Operand is not a string")
+    return concat(str1, str2)
+
+# Function: evalRep
+# Purpose:
+#    Preforms string replication
+# Parameters:
+#    op1 - first operand
+#    op2 - second operand
+# Returns:
+#    Replicated string, which is a Rope if it is long
+def evalRep(op1, op2):
+    try:
+        str1 = toText(op1)
+    except:
+        raise InvalidValueType("Operand is not a string")
+    iVal = toInt(op2)
+    return replicate(str1, iVal)
+
+# Function: evalAdd
+# Purpose:
+#    Performs addition of two operands
+# Parameters:
+#    op1 - first operand
+#    op2 - second operand
+# Returns:
+#    Sum of two operands
+def evalAdd(op1, op2):
+    iVal1 = toInt(op1)
+    iVal2 = toInt(op2)
+    return iVal1 + iVal2
+
+# Function: evalSub
+# Purpose:
+#    Performs subtraction of two operands
+# Parameters:
+#    op1 - first operand
+#    op2 - second operand
+# Returns:
+#    Difference of two operands
+def evalSub(op1, op2):
+    iVal1 = toInt(op1)
+    iVal2 = toInt(op2)
+    return iVal1 - iVal2
+
+# Function: evalVar
+# Purpose:
+#    Evaluate a single decoded operand
+# Parameters:
+#    operand - (None, value) for a literal or (slot, name) for a variable
+#    values - list of variable values indexed by slot
+# Returns:
+#    Value of the literal or variable
+def evalVar(operand, values):
+    slot, value = operand
+    if slot is None:
+        return value
+    # Return evaluated variable if defined
+    if values[slot] is None:
+        raise VarNotDefined("variable %s not defined" % (value))
+    return values[slot]
+
+binaryOpD.update({
+    '>': evalGreater,
+    '>=': evalGreaterEq,
+    '&': evalCat,
+    '*': evalRep,
+    '+': evalAdd,
+    '-': evalSub,
+})
+
+# Function: fastExpr
+# Purpose:
+#    Compile an expression of a verified program (see beepCheck.py) into a
+#    function which evaluates it without checking its operands: every
+#    variable it reads has a value, its operator is known, and the operands
+#    of +, -, >, >= and the count of * are ints
+# Parameters:
+#    expr - decoded expression
+# Returns:
+#    Function of the list of variable values which returns the value of expr
+def fastExpr(expr):
+    operator, (slot1, value1), operand2 = expr
+    if operator is None:
+        if slot1 is None:
+            return lambda values: value1
+        return lambda values: values[slot1]
+    slot2, value2 = operand2
+    if slot1 is None and slot2 is None:
+        value = binaryOpD[operator](value1, value2)
+        return lambda values: value
+    if operator == '+':
+        if slot1 is None:
+            return lambda values: value1 + values[slot2]
+        if slot2 is None:
+            return lambda values: values[slot1] + value2
+        return lambda values: values[slot1] + values[slot2]
+    if operator == '-':
+        if slot1 is None:
+            return lambda values: value1 - values[slot2]
+        if slot2 is None:
+            return lambda values: values[slot1] - value2
+        return lambda values: values[slot1] - values[slot2]
+    if operator == '>':
+        if slot1 is None:
+            return lambda values: value1 > values[slot2]
+        if slot2 is None:
+            return lambda values: values[slot1] > value2
+        return lambda values: values[slot1] > values[slot2]
+    if operator == '>=':
+        if slot1 is None:
+            return lambda values: value1 >= values[slot2]
+        if slot2 is None:
+            return lambda values: values[slot1] >= value2
+        return lambda values: values[slot1] >= values[slot2]
+    # Literal operands are converted once, as toText and toInt would
+    if operator == '&':
+        if slot1 is None:
+            text1 = toText(value1)
+            return lambda values: concat(text1, toText(values[slot2]))
+        if slot2 is None:
+            text2 = toText(value2)
+            return lambda values: concat(toText(values[slot1]), text2)
+        return lambda values: concat(toText(values[slot1]), toText(values[slot2]))
+    # The count of * may be a Numeral or a boolean, which is replicated by the
+    # plain int toInt would give
+    if slot1 is None:
+        text1 = toText(value1)
+        return lambda values: replicate(text1, int(values[slot2]))
+    if slot2 is None:
+        count = toInt(value2)
+        return lambda values: replicate(toText(values[slot1]), count)
+    return lambda values: replicate(toText(values[slot1]), int(values[slot2]))
@@ -26,377 +26,583 @@
 #         InvalidValueType – an operation expecting an INT had a value which 
 #             was of the wrong type
 
-class TooFewOperands(Exception):
-    def __init__(self, *args, **kwargs):
-        super().__init__(self, *args, **kwargs)
+import sys
+import traceback
 
-class VarNotDefined(Exception):
-    def __init__(self, *args, **kwargs):
-        super().__init__(self, *args, **kwargs)
+from beepErrors import TooFewOperands, VarNotDefined, LabelNotDefined, \
+    InvalidExpression, InvalidValueType, MemoryLimitExceeded
+from beepCompile import decodeLine, decodeProgram, foldProgram, undefinedLabels, \
+    decodeStub, OP_ASSIGN, OP_IF, OP_GOTO, OP_PRINT, OP_RAISE, OP_INC, OP_DECODE
+from beepOptimize import optimizeInstr, optimizeProgram
+from beepTranspile import transpile
+from beepJit import Jit
+from beepRope import StringHeap
+from beepRegs import RegisterFile
+from beepBudget import Budget, BudgetExceeded
+from beepOutput import OutputSink
+from beepEval import evalExpr, evalVar, toInt, fastExpr
+from beepCheck import checkProgram
+from beepLoops import findLoops
 
-class LabelNotDefined(Exception):
-    def __init__(self, *args, **kwargs):
-        super().__init__(self, *args, **kwargs)
-
-class InvalidExpression(Exception):
-    def __init__(self, *args, **kwargs):
-        super().__init__(self, *args, **kwargs)
-
-class InvalidValueType(Exception):
-    def __init__(self, *args, **kwargs):
-        super().__init__(self, *args, **kwargs)
-
-# Function: execute(lineM, labelD, varTypeD, varValueD, switch)
+# Function: execute(lineM, labelD, varTypeD, varValueD, switch, optimize, backend,
+#                   memoryLimit, maxLines, maxSeconds, detectLoops, out,
+#                   decoded, lazy, observer, verified, trace)
 # Purpose: 
-#     Executes BEEP soure code
+#     Executes BEEP soure code. Each variable is given a slot in a
+#     RegisterFile and the lines are compiled into decoded instructions (see
+#     beepCompile.py) which are then run in a loop. Labels which are referenced
+#     but never defined are reported before execution begins. Unless turned
+#     off, the instructions are then optimized (see beepOptimize.py). Unless
+#     verbose printing or an observer is requested, the program is folded so
+#     that lines which do nothing and chains of GOTOs cost nothing but a
+#     count. With the
+#     "python" backend the program is translated into a Python function (see
+#     beepTranspile.py) which runs until the program ends or nears the line
+#     limit, and the interpreter loop finishes whatever is left. With the "jit"
+#     backend the interpreter hands hot loops to a tracing JIT (see
+#     beepJit.py). Long strings are kept as Ropes (see beepRope.py) and, if a
+#     memory limit is given, the characters held by the variables are
+#     accounted for by a StringHeap. Execution stops when the program reaches
+#     a limit of its Budget (see beepBudget.py). A program which the checker
+#     finds no problems in (see beepCheck.py) is interpreted on a fast path
+#     which leaves out the checks of its operands. Counted loops of a folded
+#     program skip ahead many iterations at a time (see beepLoops.py). When
+#     execution ends the final values are copied back into varValueD.
 # Parameters:
 #     lineM - array of lines read from BEEP source code.
 #     labelD - dictionary containing label names (keys) and line numbers (values)
 #     varTypeD - dictionary containing variable names (keys) and types (values)
 #     varValueD - dictionary containing variable names (keys) and values (values)
 #     switch - optional flag indicating verbose printing for debugging
+#     optimize - False to execute the instructions without optimizing them, so
+#                that results can be compared against the optimized program.
+#                Counted loops (see beepLoops.py) are only run many
+#                iterations at a time when optimizing.
+#     backend - "interp" to interpret the instructions, "python" to run them as
+#               a Python function, or "jit" to interpret them and trace hot
+#               loops. Verbose printing always interprets.
+#     memoryLimit - most characters the strings held by the variables may
+#                   have in total, or None for no limit
+#     maxLines - most lines which may be executed, or None for no limit
+#     maxSeconds - most seconds execution may take, or None for no limit
+#     detectLoops - True to stop as soon as the program returns to a state it
+#                   has been in before, which means it would loop forever
+#                   (see beepBudget.py)
+#     out - output sink everything is printed to (see beepOutput.py), or None
+#           for a buffered sink writing to sys.stdout. It is flushed when
+#           execution ends.
+#     decoded - (codeM, nameM) where codeM is the array of Instr returned by
+#               decodeProgram for lineM and nameM lists the names of the
+#               variables in slot order, or None to decode lineM
+#     lazy - True to decode each line when it is first executed, so that only
+#            the lines which run are decoded (see beepLoader.py). The
+#            program is interpreted and undefined labels are only reported
+#            when a line using them runs.
+#     observer - function called with the Instr of every line and the
+#                RegisterFile before the line is executed (e.g.
+#                Profile.observe, see beepProfile.py), or None.
+#                Like verbose printing, it makes the program be interpreted
+#                without folding.
+#     verified - the verified result of checkProgram for the program (see
+#                beepCheck.py), or None to check it here. The "interp" and
+#                "jit" backends use the fast path, but never for a traced or
+#                lazy program.
+#     trace - Trace which keeps the last lines executed (see beepTrace.py), or
+#             None. Unlike an observer it is fed by every path and backend.
 # Returns:
-#     N/A
-def execute(lineM, labelD, varTypeD, varValueD, switch):
-    # Execute BEEP source code
-    print("execution begins...")
+#     (counter, error) where counter is the number of lines executed and
+#     error is None if the program ended normally, or (line, message, kind)
+#     for the error which stopped it; line is None when it reached a limit
+#     and kind is the name of the exception's class (e.g. "BudgetExceeded")
+def execute(lineM, labelD, varTypeD, varValueD, switch, optimize=True,
+            backend="interp", memoryLimit=None, maxLines=5000, maxSeconds=None,
+            detectLoops=False, out=None, decoded=None, lazy=False, observer=None,
+            verified=None, trace=None):
+    return finishSteps(executeSteps(lineM, labelD, varTypeD, varValueD, switch, optimize,
+                                    backend, memoryLimit, maxLines, maxSeconds, detectLoops,
+                                    out, decoded, lazy, observer, verified, trace=trace))
 
-    lineNum = 0    # current line executed
-    counter = 0    # total of lines executed 
-    # Loop through lineM containing lines of BEEP source code
-    while lineNum < len(lineM):
-        counter = counter + 1
+# Function: finishSteps
+# Purpose:
+#    Run a generator of steps, such as executeSteps, to its end
+# Parameters:
+#    steps - generator
+# Returns:
+#    The value the generator returns
+def finishSteps(steps):
+    try:
+        while True:
+            next(steps)
+    except StopIteration as e:
+        return e.value
 
-        # Tokenize input line
-        tokenM = lineM[lineNum].split()
+# Function: executeSteps
+# Purpose:
+#     Execute BEEP source code as execute does, but in slices: a generator
+#     which pauses every sliceLines lines (the line count at which it pauses
+#     is a stopping point of the Budget, see beepBudget.py) so that whatever
+#     drives it (e.g. the Scheduler in beepAsync.py) can do other work before
+#     it resumes
+# Parameters:
+#     sliceLines - most lines executed between pauses, or None to run to the
+#                  end without pausing
+#     checkpointer - Checkpointer which saves snapshots of the program at the
+#                    Budget's stopping points (see beepCheckpoint.py), or
+#                    None
+#     resume - (index, counter) to resume a program from a snapshot instead
+#              of starting it: index is the index in the decoded program of
+#              the instruction to execute first and counter is the number of
+#              lines already executed. varValueD holds the values of the
+#              variables saved with the snapshot.
+#     the others - see execute
+# Yields:
+#     Number of lines executed so far, at each pause
+# Returns:
+#     (counter, error) as execute
+def executeSteps(lineM, labelD, varTypeD, varValueD, switch, optimize=True,
+                 backend="interp", memoryLimit=None, maxLines=5000, maxSeconds=None,
+                 detectLoops=False, out=None, decoded=None, lazy=False, observer=None,
+                 verified=None, sliceLines=None, checkpointer=None, resume=None, trace=None):
+    verbose = switch == "-v"
+    # Traced programs are interpreted one source line at a time
+    traced = verbose or observer is not None
+    if out is None:
+        out = OutputSink()
+    regs = RegisterFile(varTypeD, varValueD)
+    lineNum = 0    # index of the current instruction
+    counter = 0    # total of lines executed 
+    if resume is not None:
+        lineNum, counter = resume
+    if lazy:
+        # Every line is decoded when it is first executed, so the program is
+        # neither checked nor folded beforehand
+        codeM = [decodeStub] * len(lineM)
+    else:
+        if decoded is None:
+            codeM = decodeProgram(lineM, labelD, regs)
+        else:
+            # Give the variables the slots the instructions were decoded with
+            codeM, nameM = decoded
+            for name in nameM:
+                regs.slot(name)
+        for label, line in undefinedLabels(codeM):
+            print("***Error: label %s on line %d is not defined" % (label, line), file=out)
+        if backend == "python" or traced:
+            verified = False
+        elif verified is None:
+            verified = checkProgram(codeM, regs)[1]
+        if optimize:
+            codeM = optimizeProgram(codeM, regs)
+        if not traced:
+            codeM, lineNum, skipped = foldProgram(codeM, lineNum)
+            counter = counter + skipped
+    # Counted loops run many iterations at once (see beepLoops.py), except in
+    # the python backend, whose functions run the loops themselves, and when
+    # every repeated state must be seen
+    loopM = None
+    if optimize and not traced and not lazy and backend != "python" and not detectLoops:
+        loopM = findLoops(codeM)
+    # Counted loops leave enough iterations to fill the Trace, each of which
+    # executes at least one instruction
+    keepIterations = trace.size if trace is not None else 0
+    values = regs.values
+    heap = None
+    if memoryLimit is not None:
+        heap = StringHeap(memoryLimit, values)
+    transpiled = None
+    jit = None
+    if trace is not None:
+        trace.attach(regs)
+    if backend == "python" and not traced and not lazy:
+        transpiled = transpile(codeM, lineNum, regs, heap, out, trace)
+    elif backend == "jit" and not traced and not lazy:
+        jit = Jit(codeM, heap, out, trace)
+    fastM = None
+    if verified and not lazy:
+        # An instruction is None until it is first executed, False until it
+        # is executed again, and then compiled (see fastStep), so lines which
+        # run once are not compiled
+        fastM = [None] * len(codeM)
 
-        # Limit line execution to 5,000 
-        if (counter + 1) > 5000:
-            print("***Error: an infinite loop was most likely encountered")
-            break
-        # Print line number and line currently executing
-        if switch == "-v":
-            print("executing line %d: %s" % (lineNum + 1, lineM[lineNum]))
-        
-        # If token array is empty (blank line), then skip it
-        if tokenM == []:
-            lineNum = lineNum + 1
-            continue
-        token = tokenM[0]
+    # Execute BEEP source code
+    if resume is None:
+        print("execution begins...", file=out)
+    else:
+        print("execution resumes at line %d..." % (resume[0] + 1), file=out)
+    if checkpointer is not None:
+        checkpointer.attach(lineM, regs, counter)
 
-        # If the first token is a label, then process following statement 
-        if token[-1] == ':':
-            token = tokenM[1]
-            tokenM = tokenM[1:]
-            #print(token)
-            #print(tokenM)
-        try: 
-            # Perform ASSIGN statement
-            if token == "ASSIGN":
-                # get variable name
-                varNm = tokenM[1]
-                # get expression
-                exprM = tokenM[2:]
-                execAssign(varNm, exprM, varTypeD, varValueD)
+    budget = Budget(maxLines, maxSeconds, detectLoops, sliceLines, checkpointer)
+    detector = budget.detector
+    stopAt = budget.nextStop(counter)
+    instr = None
+    error = None
+    try:
+        # Run until the program ends or the line count reaches stopAt, then
+        # check the budget and go on
+        while True:
+            if transpiled is not None and lineNum in transpiled.leaderS:
+                start = counter
+                try:
+                    lineNum, counter = transpiled.run(values, lineNum, counter, stopAt)
+                except Exception as e:
+                    instr, counter = transpiled.locate(e)
+                    raise
+                # The function returns at the first instruction of a block, so
+                # the budget can be checked there unless the block is too long
+                # or only the last lines before maxLines are left
+                if lineNum < len(codeM) and counter != start and stopAt < budget.maxLines:
+                    budget.check(codeM, lineNum, values, counter)
+                    stopAt = budget.nextStop(counter)
+                    if sliceLines is not None:
+                        yield counter
+                    continue
 
-            # Process IF statement
-            if token.upper() == "IF":
-                # get expression
-                exprM = tokenM[1:-1]
-                # get label which is the always last element of tokenM
-                label = tokenM[-1]
-                lineNum = execIf(exprM, label, labelD, varTypeD, varValueD, lineNum)
+            if fastM is not None:
+                # The same loop for a verified program, whose instructions
+                # are compiled into functions which make no checks (see
+                # fastStep)
+                while lineNum < len(codeM):
+                    counter = counter + 1
+                    if counter >= stopAt:
+                        counter = counter - 1
+                        break
+                    instr = codeM[lineNum]
+                    if trace is not None:
+                        trace.record(instr, values)
+                    op = instr.op
+                    if op == OP_IF:
+                        test = fastM[lineNum]
+                        if test is None:
+                            fastM[lineNum] = False
+                            jump = execIf(instr, values)
+                        else:
+                            if test is False:
+                                test = fastM[lineNum] = fastStep(instr, heap, out)
+                            jump = test(values) == True
+                        if jump:
+                            if trace is not None:
+                                trace.jumped()
+                            counter = counter + instr.jumpSkip
+                            if loopM is not None and loopM[lineNum] is not None:
+                                counter = loopM[lineNum].advance(values, counter, stopAt, True,
+                                                                 keepIterations)
+                            target = instr.target
+                            if target <= lineNum:
+                                if detector is not None:
+                                    budget.loopCheck(codeM, target, values, counter)
+                                if jit is not None:
+                                    lineNum, counter = jit.backEdge(target, values, counter,
+                                                                    stopAt)
+                                    continue
+                            lineNum = target
+                            continue
+                        if loopM is not None and loopM[lineNum] is not None:
+                            counter = loopM[lineNum].advance(values, counter, stopAt, False,
+                                                             keepIterations)
+                    elif op == OP_GOTO:
+                        counter = counter + instr.jumpSkip
+                        target = instr.target
+                        if target <= lineNum:
+                            if detector is not None:
+                                budget.loopCheck(codeM, target, values, counter)
+                            if jit is not None:
+                                lineNum, counter = jit.backEdge(target, values, counter, stopAt)
+                                continue
+                        lineNum = target
+                        continue
+                    else:
+                        step = fastM[lineNum]
+                        if step is None:
+                            fastM[lineNum] = False
+                            execInstr(instr, values, heap, out)
+                        else:
+                            if step is False:
+                                step = fastM[lineNum] = fastStep(instr, heap, out)
+                            step(values)
+                    counter = counter + instr.skip
+                    if jit is not None and instr.next <= lineNum:
+                        lineNum, counter = jit.backEdge(instr.next, values, counter, stopAt)
+                        continue
+                    lineNum = instr.next
+                else:
+                    if counter >= budget.maxLines:
+                        raise BudgetExceeded("an infinite loop was most likely encountered",
+                                             budget.maxLines)
+                    break
+                budget.check(codeM, lineNum, values, counter)
+                stopAt = budget.nextStop(counter)
+                if sliceLines is not None:
+                    yield counter
                 continue
 
-            # Process GOTO statement
-            if token == "GOTO":
-                # get label
-                label = tokenM[1]
-                lineNum = execGoTo(label, labelD)
-                continue
+            # Loop through codeM containing the decoded BEEP statements
+            while lineNum < len(codeM):
+                counter = counter + 1
+
+                # Limit line execution to maxLines (5,000 by default)
+                if counter >= stopAt:
+                    counter = counter - 1
+                    break
 
-            # Get PRINT statement
-            if token == "PRINT":
-                # pass varLiteral1 varLiteral2 ... varLiteralN
-                execPrint(tokenM[1:], varTypeD, varValueD)
-    
-        except(InvalidValueType, TooFewOperands, VarNotDefined, LabelNotDefined, InvalidExpression) as e:
-            print ("*** line %d error detected ***" % (lineNum+1))
-            print("%-10s %d *** %s ***" % (" ", lineNum+1, str(e.args[1])))
-            break
-        except Exception as e:
-            print("*** line %d error detected ***" % (lineNum+1))
-            print(e)
-            break
-        except:
-            print("*** line %d error detected ***" % (lineNum+1))
-            traceback.print_exc()
-            break
-        lineNum = lineNum + 1
+                instr = codeM[lineNum]
+                if traced and instr.op != OP_DECODE:
+                    # Print line number and line currently executing
+                    if verbose:
+                        out.write("executing line %d: %s\n" % (instr.line, lineM[instr.line - 1]))
+                    if observer is not None:
+                        observer(instr, regs)
+                if trace is not None and instr.op != OP_DECODE:
+                    trace.record(instr, values)
+
+                op = instr.op
+                if op == OP_INC:
+                    execInc(instr, values, heap)
+                elif op == OP_ASSIGN:
+                    execAssign(instr.args[0], instr.args[1], values, heap)
+                elif op == OP_IF:
+                    if execIf(instr, values):
+                        if trace is not None:
+                            trace.jumped()
+                        counter = counter + instr.jumpSkip
+                        if loopM is not None and loopM[lineNum] is not None:
+                            counter = loopM[lineNum].advance(values, counter, stopAt, True,
+                                                             keepIterations)
+                        target = instr.target
+                        # Backward jumps close loops; look for a repeated
+                        # state and let the JIT run them
+                        if target <= lineNum:
+                            if detector is not None:
+                                budget.loopCheck(codeM, target, values, counter)
+                            if jit is not None:
+                                lineNum, counter = jit.backEdge(target, values, counter, stopAt)
+                                continue
+                        lineNum = target
+                        continue
+                    if loopM is not None and loopM[lineNum] is not None:
+                        counter = loopM[lineNum].advance(values, counter, stopAt, False,
+                                                         keepIterations)
+                elif op == OP_GOTO:
+                    counter = counter + instr.jumpSkip
+                    target = execGoTo(instr)
+                    if target <= lineNum:
+                        if detector is not None:
+                            budget.loopCheck(codeM, target, values, counter)
+                        if jit is not None:
+                            lineNum, counter = jit.backEdge(target, values, counter, stopAt)
+                            continue
+                    lineNum = target
+                    continue
+                elif op == OP_PRINT:
+                    execPrint(instr.args, values, out)
+                elif op == OP_RAISE:
+                    raise instr.args[0](instr.args[1])
+                elif op == OP_DECODE:
+                    # Decode the line, then execute it without counting it twice
+                    instr = decodeLine(lineM[lineNum], lineNum + 1, labelD, regs)
+                    if optimize:
+                        instr = optimizeInstr(instr, regs)
+                    codeM[lineNum] = instr
+                    counter = counter - 1
+                    continue
+                counter = counter + instr.skip
+                # A loop closed by a folded GOTO goes back through next
+                if jit is not None and instr.next <= lineNum:
+                    lineNum, counter = jit.backEdge(instr.next, values, counter, stopAt)
+                    continue
+                lineNum = instr.next
+            else:
+                # Folded lines at the end of the program may reach the limit too
+                if counter >= budget.maxLines:
+                    raise BudgetExceeded("an infinite loop was most likely encountered",
+                                         budget.maxLines)
+                break
+            budget.check(codeM, lineNum, values, counter)
+            stopAt = budget.nextStop(counter)
+            if sliceLines is not None:
+                yield counter
+    except BudgetExceeded as e:
+        print("***Error: %s" % (e.args[0]), file=out)
+        counter = e.args[1]
+        error = (None, e.args[0], type(e).__name__)
+    except(InvalidValueType, TooFewOperands, VarNotDefined, LabelNotDefined, InvalidExpression,
+           MemoryLimitExceeded) as e:
+        print ("*** line %d error detected ***" % (instr.line), file=out)
+        print("%-10s %d *** %s ***" % (" ", instr.line, str(e.args[1])), file=out)
+        error = (instr.line, str(e.args[1]), type(e).__name__)
+    except Exception as e:
+        print("*** line %d error detected ***" % (instr.line), file=out)
+        print(e, file=out)
+        error = (instr.line, str(e), type(e).__name__)
+    except GeneratorExit:
+        # The steps were closed while paused (e.g. a cancelled program)
+        raise
+    except:
+        print("*** line %d error detected ***" % (instr.line), file=out)
+        # The traceback goes to stderr, after the output which led to it
+        out.flush()
+        traceback.print_exc()
+        error = (instr.line, traceback.format_exc(), sys.exc_info()[0].__name__)
+    regs.toDict(varValueD)
+    if trace is not None:
+        trace.count = counter
     # Print total number of lines executed
-    print("execution ends, %d lines executed" % (counter))
+    print("execution ends, %d lines executed" % (counter), file=out)
+    out.flush()
+    return counter, error
 
 # Function: execAssign
 # Purpose: 
-#   Assigns the value of the expression to the specified variable which must
-#   have been declared.  
+#   Assigns the value of the expression to the specified variable. The compiler
+#   has already verified that the variable was declared.
 # Parameters: 
-#    varNm- name of variable 
-#    exprM - list of expression elements which is one of:
-#        varLiteral	           return the string value (without the ") for a string 
-#                                  literal, the value of a numeric constant or return the 
-#                                  value of a variable
-#        * varLiteral varNumber	   return a string with varLiteral replicated varNumber times
-#        + varNumber1 varNumber2   return the sum of the values
-#        - varNumber1 varNumber2   return the difference of the values (varNumber1 minus varNumber2)
-#        > varNumber1 varNumber2   return True if varNumber1 > varNumber2; this is a numeric comparison
-#        >= varNumber1 varNumber2  return True if varNumber1 >= varNumber2; this is a numeric comparison
-#        & varLiteral1 varLiteral2 return the concatenation of the two strings
-#
-#    varTypeD - dictionary containing variable names (keys) and types (values)
-#    varValueD - dictionary containing variable names (keys) and values (values)
+#    slot - slot of the variable
+#    expr - decoded expression (see evalExpr)
+#    values - list of variable values indexed by slot
+#    heap - StringHeap accounting for the strings, or None
 # Returns:
 #    N/A
-def execAssign(varNm, exprM, varTypeD, varValueD):
-    # Is varNm defined?
-    if varTypeD.get(varNm, "NF") == "NF":
-        raise VarNotDefined("variable %s is not defined" % (varNm))
-    varValueD[varNm] = evalExpr(exprM, varTypeD, varValueD)
+def execAssign(slot, expr, values, heap=None):
+    value = evalExpr(expr, values)
+    if heap is not None:
+        heap.store(slot, value)
+    values[slot] = value
 
-# Function: execIf
-# Purpose:
-#     Executes BEEP if statements
-# Parameters:
-#    exprM - list of expression elements which is one of:
-#        varLiteral	           return the string value (without the ") for a string 
-#                                  literal, the value of a numeric constant or return the 
-#                                  value of a variable
-#        * varLiteral varNumber	   return a string with varLiteral replicated varNumber times
-#        + varNumber1 varNumber2   return the sum of the values
-#        - varNumber1 varNumber2   return the difference of the values (varNumber1 minus varNumber2)
-#        > varNumber1 varNumber2   return True if varNumber1 > varNumber2; this is a numeric comparison
-#        >= varNumber1 varNumber2  return True if varNumber1 >= varNumber2; this is a numeric comparison
-#        & varLiteral1 varLiteral2 return the concatenation of the two strings
-#    label - label name
-#    label - dictionary containing label names (keys) and line numbers (values)
-#    varTypeD - dictionary containing variable names (keys) and types (values)
-#    varValueD - dictionary containing variable names (keys) and values (values)
-#    lineNum - current line of execution
-# Returns:
-#    Line number of a label if jump is necessary
-#    Current line number if jump is unnecessary
-def execIf(exprM, label, labelD, varTypeD, varValueD, lineNum):
-    boolean = evalExpr(exprM, varTypeD, varValueD)
-    # If condition is true perform a goto
-    if boolean == True:
-        return  execGoTo(label, labelD)
-    return lineNum + 1
-
-# Function: execPrint
+# Function: execInstr
 # Purpose:
-#    Execute print statements
+#   Execute an instruction which does not jump
 # Parameters:
-#    tokenM - list containing line tokens
-#    varTypeD - dictionary containing variable names (keys) and types (values)
-#    varValueD - dictionary containing variable names (keys) and values (values)
+#    instr - decoded instruction
+#    values - list of variable values indexed by slot
+#    heap - StringHeap accounting for the strings, or None
+#    out - output sink (see beepOutput.py)
 # Returns:
 #    N/A
-def execPrint(tokenM, varTypeD, varValueD):
-    for token in tokenM: 
-        var = evalVar(token, varTypeD, varValueD) 
-        print(var, end=" ")
-    print()
-
-# Function: execGoTo
-# Purpose:
-#    Execute goto statements
-# Parameters:
-#    label - label name 
-#    label - dictionary containing label names (keys) and line numbers (values)
-# Returns:
-#    Line number where the label is located
-def execGoTo(label, labelD):
-    if labelD.get(label, "NF") == "NF":
-        raise LabelNotDefined("label '%s' is not defined" % (label))
-    return labelD[label] - 1
+def execInstr(instr, values, heap, out):
+    op = instr.op
+    if op == OP_ASSIGN:
+        execAssign(instr.args[0], instr.args[1], values, heap)
+    elif op == OP_INC:
+        execInc(instr, values, heap)
+    elif op == OP_PRINT:
+        execPrint(instr.args, values, out)
+    elif op == OP_RAISE:
+        raise instr.args[0](instr.args[1])
 
-# Function: evalExpr
+# Function: fastStep
 # Purpose:
-#    Evaluates expressions
+#   Compile an instruction of a verified program (see beepCheck.py) into a
+#   function which executes it without checking its operands
 # Parameters:
-#    exprM - list of expression elements which is one of:
-#        varLiteral	           return the string value (without the ") for a string 
-#                                  literal, the value of a numeric constant or return the 
-#                                  value of a variable
-#        * varLiteral varNumber	   return a string with varLiteral replicated varNumber times
-#        + varNumber1 varNumber2   return the sum of the values
-#        - varNumber1 varNumber2   return the difference of the values (varNumber1 minus varNumber2)
-#        > varNumber1 varNumber2   return True if varNumber1 > varNumber2; this is a numeric comparison
-#        >= varNumber1 varNumber2  return True if varNumber1 >= varNumber2; this is a numeric comparison
-#        & varLiteral1 varLiteral2 return the concatenation of the two strings
-#    varTypeD - dictionary containing variable names (keys) and types (values)
-#    varValueD - dictionary containing variable names (keys) and values (values)
+#    instr - decoded instruction
+#    heap - StringHeap accounting for the strings, or None
+#    out - output sink (see beepOutput.py)
 # Returns:
-#    Evaluated value of expression
-def evalExpr(exprM, varTypeD, varValueD):
-    # Evaluate single item expression
-    if len(exprM) == 1:
-        return evalVar(exprM[0], varTypeD, varValueD)
-    # Evaluate three item expressions by first getting operands
-    elif len(exprM) != 3:
-        raise TooFewOperands("expression '%s' has too few operands" % (exprM))
-    op1 = evalVar(exprM[1], varTypeD, varValueD)
-    op2 = evalVar(exprM[2], varTypeD, varValueD)
-    # Evaluate prefixed operator
-    if exprM[0] == '>':
-        return evalGreater(op1, op2)
-    if exprM[0] == ">=":
-        return evalGreaterEq(op1, op2)
-    if exprM[0] == '&':
-        return evalCat(op1, op2)
-    if exprM[0] == '*':
-        return evalRep(op1, op2)
-    if exprM[0] == '+':
-        return evalAdd(op1, op2)
-    if exprM[0] == '-':
-        return evalSub(op1, op2)
-    else:
-        raise InvalidExpression("unknown operator: %s " % (exprM[0]))
+#    For an IF, a function of the list of variable values which returns the
+#    value of its condition; for a GOTO, None; otherwise a function of the
+#    list of variable values which executes the instruction
+def fastStep(instr, heap, out):
+    op = instr.op
+    if op == OP_ASSIGN:
+        slot, expr = instr.args
+        func = fastExpr(expr)
+        if heap is None:
+            def step(values):
+                values[slot] = func(values)
+        else:
+            def step(values):
+                value = func(values)
+                heap.store(slot, value)
+                values[slot] = value
+        return step
+    if op == OP_INC:
+        # The variable holds an int, so the heap has nothing to account for
+        slot, name, amount = instr.args
+        def step(values):
+            values[slot] = values[slot] + amount
+        return step
+    if op == OP_IF:
+        return fastExpr(instr.args[0])
+    if op == OP_PRINT:
+        operandM = instr.args
+        def step(values):
+            out.write("".join([str(value if slot is None else values[slot]) + " "
+                               for slot, value in operandM]) + "\n")
+        return step
+    if op == OP_GOTO:
+        return None
+    return lambda values: None
 
-# Function: evalGreater
+# Function: execInc
 # Purpose:
-#    Evaluate a greater than expression
+#   Adds a constant to a variable. This is the optimized form of
+#   "ASSIGN x + x 1" (see beepOptimize.py).
 # Parameters:
-#    op1 - first operand
-#    op2 - second operand
+#    instr - decoded INC instruction whose args are (slot, name, amount)
+#    values - list of variable values indexed by slot
+#    heap - StringHeap accounting for the strings, or None
 # Returns:
-#    True if op1 is greater than op2
-#    False if op1 is NOT greater than op2
-def evalGreater(op1, op2):
-    try:
-        iVal1 = int(op1)
-    except:
-        raise InvalidValueType("'%s' is not numeric" % (op1))
-    try:
-        iVal2 = int(op2)
-    except:
-        raise InvalidValueType("'%s' is not numeric" % (op2))
-    return iVal1 > iVal2
-
-# Function: evalGreaterEq
-# Purpose:
-#    Evaluate a greater than or equal expression
-# Parameters:
-#    op1 - first operand
-#    op2 - second operand
-# Returns:
-#    True if op1 is greater than or equal to op2
-#    False if op1 is NOT greater than or equal to op2
-def evalGreaterEq(op1, op2):
-    try:
-        iVal1 = int(op1)
-    except:
-        raise InvalidValueType("'%s' is not numeric" % (op1))
-    try:
-        iVal2 = int(op2)
-    except:
-        raise InvalidValueType("'%s' is not numeric" % (op2))
-    return iVal1 >= iVal2
-
-# Function: evalCat
-# Purpose:
-#    Evaluate concantenation statement
-# Parameters:
-#    op1 - first operand
-#    op2 - second operand
-# Returns:
-#    The concatenation of two strings
-def evalCat(op1, op2):
-    try:
-        str1 = str(op1)
-    except:
-        raise InvalidValueType("Operand is not a string")
-    try:
-        str2 = str(op2)
-    except:
-        raise InvalidValueType("Operand is not a string")
-    return str1 + str2 
-
-# Function: evalRep
-# Purpose:
-#    Preforms string replication
-# Parameters:
-#    op1 - first operand
-#    op2 - second operand
-# Returns:
-#    Replicated string
-def evalRep(op1, op2):
-    try:
-        str1 = str(op1)
-    except:
-        raise InvalidValueType("Operand is not a string")
-    try:
-        iVal = int(op2)
-    except:
-        raise InvalidValueType("'%s' is not numeric" % (op2))
-    return str1 * iVal
+#    N/A
+def execInc(instr, values, heap=None):
+    slot, name, amount = instr.args
+    value = values[slot]
+    if type(value) is not int:
+        if value is None:
+            raise VarNotDefined("variable %s not defined" % (name))
+        value = toInt(value)
+        # The variable may have held a string
+        if heap is not None:
+            heap.store(slot, value)
+    values[slot] = value + amount
 
-# Function: evalAdd
+# Function: execIf
 # Purpose:
-#    Performs addition of two operands
+#     Executes BEEP if statements
 # Parameters:
-#    op1 - first operand
-#    op2 - second operand
+#    instr - decoded IF instruction whose args are (expr, label)
+#    values - list of variable values indexed by slot
 # Returns:
-#    Sum of two operands
-def evalAdd(op1, op2):
-    try:
-        iVal1 = int(op1)
-    except:
-        raise InvalidValueType("'%s' is not numeric" % (op1))
-    try:
-        iVal2 = int(op2)
-    except:
-        raise InvalidValueType("'%s' is not numeric" % (op2))
-    return iVal1 + iVal2
+#    True if jump is necessary
+#    False if jump is unnecessary
+def execIf(instr, values):
+    boolean = evalExpr(instr.args[0], values)
+    # If condition is true perform a goto
+    if boolean == True:
+        execGoTo(instr)
+        return True
+    return False
 
-# Function: evalSub
+# Function: execPrint
 # Purpose:
-#    Performs subtraction of two operands
+#    Execute print statements. Each value is followed by a space and the line
+#    is written in one piece; if a value raises an error, the values before it
+#    are still written.
 # Parameters:
-#    op1 - first operand
-#    op2 - second operand
+#    operandM - tuple of decoded operands
+#    values - list of variable values indexed by slot
+#    out - output sink (see beepOutput.py)
 # Returns:
-#    Difference of two operands
-def evalSub(op1, op2):
-    try:
-        iVal1 = int(op1)
-    except:
-        raise InvalidValueType("'%s' is not numeric" % (op1))
+#    N/A
+def execPrint(operandM, values, out):
+    textM = []
     try:
-        iVal2 = int(op2)
-    except:
-        raise InvalidValueType("'%s' is not numeric" % (op2))
-    return iVal1 - iVal2
+        for operand in operandM: 
+            textM.append(str(evalVar(operand, values)) + " ")
+    except Exception:
+        out.write("".join(textM))
+        raise
+    textM.append("\n")
+    out.write("".join(textM))
 
-# Function: evalVar
+# Function: execGoTo
 # Purpose:
-#    Evaluate a single variable
+#    Execute goto statements
 # Parameters:
-#    op - operand is a variable
-#    varTypeD - dictionary containing variable names (keys) and types (values)
-#    varValueD - dictionary containing variable names (keys) and values (values)
+#    instr - decoded GOTO or IF instruction whose target was resolved by the
+#            compiler
 # Returns:
-#    Value of the variable
-def evalVar(op, varTypeD, varValueD):
-    # Return a stripped string
-    if op[0] == '"':
-        return op[1:-1]
-    # Return decimal
-    if op.isdecimal():
-        return op
-    value = varValueD.get(op, "NF")
-    # Return evaluated variable if defined
-    if value == "NF":
-        raise VarNotDefined("variable %s not defined" % (op))
-    return value
+#    Index of the instruction where the label is located
+def execGoTo(instr):
+    if instr.target is None:
+        raise LabelNotDefined("label '%s' is not defined" % (instr.args[-1]))
+    return instr.target
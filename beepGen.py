@@ -0,0 +1,239 @@
+#! /usr/bin/python
+
+# Filename: beepGen.py by Geoffrey Sessums
+# Purpose:
+#     Generates synthetic BEEP programs for benchmarking (see beepBench.py).
+#     Each workload stresses one part of the interpreter, and its size sets
+#     how much work it does. The same workload, size and seed always give the
+#     same program, so results can be compared from run to run.
+#         loop - nested counted loops of arithmetic
+#         branch - a tree of IF statements chosen by a cycling counter
+#         string - building strings with & and *
+#         print - a loop which prints several values per line
+#         huge - a long straight-line program with many labels and VARs,
+#                which is dominated by loading and decoding
+# Usage:
+#     python3 beepGen.py workload [size] [-s seed] [-o outputFile]
+#         Example: python3 beepGen.py loop 20000 -o loop.txt
+
+import random
+import sys
+
+# Seed used when none is given
+defaultSeed = 3723
+
+# Function: genLoop
+# Purpose:
+#    Generate nested counted loops: an outer loop of size iterations around
+#    an inner loop of 10 iterations
+# Parameters:
+#    size - number of outer iterations
+#    rand - random.Random which chooses the step of each sum
+# Returns:
+#    List of lines of BEEP source code
+def genLoop(size, rand):
+    stepM = [rand.randint(1, 9) for i in range(3)]
+    return [
+        "VAR INT i 0",
+        "VAR INT j 0",
+        "VAR INT n %d" % (size),
+        "VAR INT m 10",
+        "VAR INT a 0",
+        "VAR INT b 0",
+        "VAR INT c 0",
+        "OUTER: ASSIGN j 0",
+        "INNER: ASSIGN a + a %d" % (stepM[0]),
+        "    ASSIGN b + b j",
+        "    ASSIGN c - c %d" % (stepM[1]),
+        "    ASSIGN j + j 1",
+        "    IF > m j INNER",
+        "ASSIGN c + c %d" % (stepM[2]),
+        "ASSIGN i + i 1",
+        "IF > n i OUTER",
+        "PRINT \"loop\" a b c",
+    ]
+
+# Function: genBranch
+# Purpose:
+#    Generate a loop which cycles a counter k through 16 values and finds its
+#    value with a tree of IF statements; each arm adds to a different sum
+# Parameters:
+#    size - number of iterations
+#    rand - random.Random which chooses the amount added by each arm
+# Returns:
+#    List of lines of BEEP source code
+def genBranch(size, rand):
+    arms = 16
+    lineM = [
+        "VAR INT i 0",
+        "VAR INT k 0",
+        "VAR INT n %d" % (size),
+        "VAR INT w %d" % (arms),
+    ]
+    lineM.extend("VAR INT s%d 0" % (arm) for arm in range(arms))
+    lineM.append("TOP: ASSIGN k + k 1")
+    lineM.append("IF > w k TREE")
+    lineM.append("ASSIGN k 0")
+
+    # Function: node
+    # Purpose:
+    #    Add the IF statements which find k among the arms low to high - 1
+    def node(low, high, label):
+        if high - low == 1:
+            lineM.append("%s: ASSIGN s%d + s%d %d" % (label, low, low, rand.randint(1, 99)))
+            lineM.append("GOTO JOIN")
+            return
+        mid = (low + high) // 2
+        upper = "N%d_%d" % (mid, high)
+        lineM.append("%s: IF >= k %d %s" % (label, mid, upper))
+        node(low, mid, "N%d_%d" % (low, mid))
+        node(mid, high, upper)
+
+    node(0, arms, "TREE")
+    lineM.append("JOIN: ASSIGN i + i 1")
+    lineM.append("IF > n i TOP")
+    lineM.append("PRINT \"branch\" " + " ".join("s%d" % (arm) for arm in range(arms)))
+    return lineM
+
+# Function: genString
+# Purpose:
+#    Generate a loop which builds a string with & and * and starts it again
+#    every 50 iterations
+# Parameters:
+#    size - number of iterations
+#    rand - random.Random which chooses the text added
+# Returns:
+#    List of lines of BEEP source code
+def genString(size, rand):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    piece = "".join(rand.choice(letters) for i in range(3))
+    return [
+        "VAR INT i 0",
+        "VAR INT r 0",
+        "VAR INT n %d" % (size),
+        "VAR INT w 50",
+        "VAR STRING s \"x\"",
+        "VAR STRING t \"x\"",
+        "TOP: ASSIGN s & s \"%s\"" % (piece),
+        "ASSIGN t * \"%s\" %d" % (piece[:2], rand.randint(2, 6)),
+        "ASSIGN s & s t",
+        "ASSIGN r + r 1",
+        "IF > w r NEXT",
+        "ASSIGN r 0",
+        "ASSIGN s \"x\"",
+        "NEXT: ASSIGN i + i 1",
+        "IF > n i TOP",
+        "PRINT \"string\" s",
+    ]
+
+# Function: genPrint
+# Purpose:
+#    Generate a loop which prints a line of several values each iteration
+# Parameters:
+#    size - number of iterations
+#    rand - random.Random which chooses the text printed
+# Returns:
+#    List of lines of BEEP source code
+def genPrint(size, rand):
+    return [
+        "VAR INT i 0",
+        "VAR INT n %d" % (size),
+        "VAR INT total 0",
+        "VAR STRING s \"%s\"" % ("".join(rand.choice("xyz") for i in range(8))),
+        "TOP: PRINT \"row\" i s total",
+        "ASSIGN total + total i",
+        "ASSIGN i + i 1",
+        "IF > n i TOP",
+    ]
+
+# Function: genHuge
+# Purpose:
+#    Generate a straight-line program in which every statement has a label
+#    and every fourth line declares a variable; some GOTOs jump forward over
+#    a few lines
+# Parameters:
+#    size - number of lines
+#    rand - random.Random which places the GOTOs
+# Returns:
+#    List of lines of BEEP source code
+def genHuge(size, rand):
+    lineM = ["VAR INT total 0"]
+    block = 0
+    while len(lineM) < size:
+        lineM.append("VAR INT v%d %d" % (block, rand.randint(0, 999)))
+        lineM.append("L%d: ASSIGN total + total v%d" % (block, block))
+        if rand.random() < 0.1:
+            lineM.append("M%d: GOTO L%d" % (block, block + 1))
+        else:
+            lineM.append("M%d: ASSIGN v%d + v%d 1" % (block, block, block))
+        lineM.append("N%d: PRINT v%d" % (block, block))
+        block = block + 1
+    lineM.append("L%d: PRINT \"huge\" total" % (block))
+    return lineM
+
+# Dictionary of workload names (keys) and (generator, default size,
+# description) (values)
+workloadD = {
+    "loop": (genLoop, 15000, "nested counted loops"),
+    "branch": (genBranch, 40000, "tree of IF statements"),
+    "string": (genString, 40000, "string building with & and *"),
+    "print": (genPrint, 40000, "PRINT-heavy output"),
+    "huge": (genHuge, 200000, "huge source with many labels and VARs"),
+}
+
+# Function: generate
+# Purpose:
+#    Generate the source code of a workload
+# Parameters:
+#    name - name of the workload (a key of workloadD)
+#    size - size of the workload, or None for its default size
+#    seed - seed of the random choices
+# Returns:
+#    Source code as a string
+def generate(name, size=None, seed=defaultSeed):
+    generator, defaultSize, description = workloadD[name]
+    if size is None:
+        size = defaultSize
+    # The seed is combined with the name so that workloads differ
+    rand = random.Random("%s:%d" % (name, seed))
+    return "\n".join(generator(size, rand)) + "\n"
+
+# Function: main
+# Purpose:
+#    Parse the command arguments and write the generated program
+# Parameters:
+#    argM - command arguments, starting with the name of this program
+# Returns:
+#    Exit status
+def main(argM):
+    if len(argM) < 2 or argM[1] not in workloadD:
+        print("Usage: python3 beepGen.py workload [size] [-s seed] [-o outputFile]")
+        for name, (generator, size, description) in workloadD.items():
+            print("    %-8s %s (default size %d)" % (name, description, size))
+        return 1
+    size = None
+    seed = defaultSeed
+    outputFile = None
+    flagM = argM[2:]
+    if flagM != [] and flagM[0].isdecimal():
+        size = int(flagM.pop(0))
+    while flagM != []:
+        flag = flagM.pop(0)
+        if flag == "-s" and flagM != [] and flagM[0].isdecimal():
+            seed = int(flagM.pop(0))
+        elif flag == "-o" and flagM != []:
+            outputFile = flagM.pop(0)
+        else:
+            print("Unkown Flag: %s" % (flag))
+            return 1
+
+    source = generate(argM[1], size, seed)
+    if outputFile is None:
+        sys.stdout.write(source)
+    else:
+        with open(outputFile, "w", encoding="latin-1") as file:
+            file.write(source)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
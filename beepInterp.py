@@ -0,0 +1,374 @@
+#! /usr/bin/python
+
+# Filename: beepInterp.py by Geoffrey Sessums
+# Purpose:
+#     Provides the Program, Interpreter and RunResult classes, which let a
+#     Python program load and run BEEP programs without going through
+#     beepDriver.py. A Program is loaded once from a string, a file or a
+#     stream, and may then be run any number of times; every run starts from
+#     the declared values of the variables, so runs never see each other's
+#     state. An Interpreter holds the settings for running programs (see
+#     execute in beepExec.py) and the sink their output goes to.
+# Usage:
+#     program = Program.fromString('VAR INT x 1\nPRINT x\n')
+#     result = Interpreter().run(program)
+#     print(result.output, result.lines, result.variables)
+
+import io
+
+from beepDict import addLabel, printLabels, printVariables, declareVar
+from beepCompile import decodeProgram
+from beepCheck import checkProgram
+from beepRegs import RegisterFile
+from beepExec import executeSteps, finishSteps
+from beepOutput import MemorySink
+from beepProfile import Profile
+from beepTrace import Trace
+from beepRope import flatValue
+
+# Class: Program
+# Purpose:
+#    A loaded BEEP program.
+# Attributes:
+#    name - name of the program printed in the listing (e.g. its file name)
+#    lineM - array of lines of BEEP source code
+#    labelD - dictionary containing label names (keys) and line numbers (values)
+#    varTypeD - dictionary containing variable names (keys) and types (values)
+#    varValueD - dictionary containing variable names (keys) and declared
+#                values (values)
+#    messageM - list of (line number, message) for the errors found while
+#               loading, which are printed before that line of the listing
+#    decoded - (codeM, nameM) once the program has been decoded (see decode),
+#              otherwise None
+#    problemM - list of (line number, message) for the problems the checker
+#               found once the program has been decoded (see beepCheck.py),
+#               otherwise None
+#    verified - True if the checker verified the program so that it runs on
+#               the fast path, or None until the program has been decoded
+#    lazy - True if the lines are decoded as they are first executed rather
+#           than before execution begins (see beepLoader.py)
+class Program:
+    lazy = False
+
+    def __init__(self, name):
+        self.name = name
+        self.lineM = []
+        self.labelD = {}
+        self.varTypeD = {}
+        self.varValueD = {}
+        self.messageM = []
+        self.decoded = None
+        self.problemM = None
+        self.verified = None
+
+    # Function: decode
+    # Purpose:
+    #    Decode and check the instructions of the program once, so that every
+    #    run (and the cache, see beepCache.py) can use them without decoding
+    #    and checking the lines again
+    # Returns:
+    #    The program
+    def decode(self):
+        if self.decoded is None:
+            regs = RegisterFile(self.varTypeD, self.varValueD)
+            codeM = decodeProgram(self.lineM, self.labelD, regs)
+            self.problemM, self.verified = checkProgram(codeM, regs)
+            self.decoded = (codeM, regs.nameM)
+        return self
+
+    # Function: check
+    # Purpose:
+    #    Find the problems which could stop the program with an error before
+    #    it runs (see beepCheck.py)
+    # Returns:
+    #    List of (line number, message) in line order, or None if the lines
+    #    of the program are only decoded as they run
+    def check(self):
+        self.decode()
+        return self.problemM
+
+    # Function: fromStream
+    # Purpose:
+    #    Load a program from a stream of lines
+    # Parameters:
+    #    stream - file object open for reading text
+    #    name - name of the program
+    # Returns:
+    #    Program
+    @classmethod
+    def fromStream(cls, stream, name="<stream>"):
+        program = cls(name)
+        count = 0
+        for inputLine in stream:
+            count = count + 1
+            program.addLine(inputLine.rstrip('\n'), count)
+        return program
+
+    # Function: fromString
+    # Purpose:
+    #    Load a program from its source code
+    # Parameters:
+    #    text - BEEP source code
+    #    name - name of the program
+    # Returns:
+    #    Program
+    @classmethod
+    def fromString(cls, text, name="<string>"):
+        return cls.fromStream(io.StringIO(text, newline=None), name)
+
+    # Function: fromFile
+    # Purpose:
+    #    Load a program from a file
+    # Parameters:
+    #    fileName - name of the file
+    # Returns:
+    #    Program
+    @classmethod
+    def fromFile(cls, fileName):
+        with open(fileName, "r", encoding='latin-1') as file:
+            return cls.fromStream(file, fileName)
+
+    # Function: addLine
+    # Purpose:
+    #    Add a line to the program, recording its label and its declaration
+    # Parameters:
+    #    inputLine - text of the line without its newline
+    #    count - line number of the line
+    def addLine(self, inputLine, count):
+        self.scanLine(inputLine, count)
+        self.lineM.append(inputLine)
+
+    # Function: scanLine
+    # Purpose:
+    #    Record the label and the declaration of a line
+    # Parameters:
+    #    inputLine - text of the line without its newline
+    #    count - line number of the line
+    def scanLine(self, inputLine, count):
+        tokenM = inputLine.split()
+        # Blank lines declare nothing
+        if tokenM != []:
+            token = tokenM[0]
+
+            # If the first token is a label, then add label and count to dictionary
+            if token[-1] == ':':
+                # Strip the colon
+                token = token.rstrip(':')
+                out = io.StringIO()
+                addLabel(self.labelD, token, count, out)
+                if out.getvalue():
+                    self.messageM.append((count, out.getvalue()))
+
+            # If the first token is "VAR", then declare a variable
+            if token == "VAR":
+                declareVar(tokenM[1:], self.varTypeD, self.varValueD)
+
+    # Function: printListing
+    # Purpose:
+    #    Print the BEEP source code with line numbers, and the errors found
+    #    while loading it
+    # Parameters:
+    #    out - output sink (see beepOutput.py)
+    def printListing(self, out):
+        print("BEEP source code in " + self.name + ":", file=out)
+        messageM = list(self.messageM)
+        messageM.reverse()
+        for count, inputLine in enumerate(self.lineM, 1):
+            while messageM != [] and messageM[-1][0] == count:
+                out.write(messageM.pop()[1])
+            out.write(str(count).rjust(3) + ". " + inputLine + "\n")
+
+    # Function: printTables
+    # Purpose:
+    #    Print the variables and labels of the program
+    # Parameters:
+    #    out - output sink (see beepOutput.py)
+    def printTables(self, out):
+        # Print list of variables
+        print("Variables:", file=out)
+        print("    %-12s %-9s %s" % ("Variable", "Type", "Value"), file=out)
+        printVariables(self.varTypeD, self.varValueD, out)
+
+        # Print list of labels
+        print("Labels:", file=out)
+        print("    %-12s %s" % ("Label", "Statement"), file=out)
+        printLabels(self.labelD, out)
+
+# Class: RunResult
+# Purpose:
+#    The result of running a program.
+# Attributes:
+#    variables - dictionary containing variable names (keys) and their final
+#                values (values); long strings are strs, not Ropes, unless
+#                they are too long or there is not enough memory to build
+#                them (see flatValue in beepRope.py)
+#    lines - number of lines executed
+#    error - None if the program ended normally, otherwise the message of the
+#            error which stopped it
+#    errorLine - line number of the error, or None if there was no error or
+#                the program reached a limit
+#    errorKind - name of the class of the exception which stopped the program
+#                (e.g. "BudgetExceeded" for a limit), or None if there was no
+#                error
+#    output - everything printed, if the Interpreter has no sink; otherwise
+#             None
+#    profile - Profile of the run (see beepProfile.py) if the Interpreter
+#              profiles, otherwise None
+#    trace - Trace of the last lines executed (see beepTrace.py) if the
+#            Interpreter traces, otherwise None
+#    cached - True if the result was found in the Interpreter's ResultCache
+#             (see beepMemo.py) instead of running the program
+class RunResult:
+    __slots__ = ("variables", "lines", "error", "errorLine", "errorKind", "output", "profile",
+                 "trace", "cached")
+
+    def __init__(self, variables, lines, error, errorLine, output, profile=None, trace=None,
+                 errorKind=None):
+        self.variables = variables
+        self.lines = lines
+        self.error = error
+        self.errorLine = errorLine
+        self.errorKind = errorKind
+        self.output = output
+        self.profile = profile
+        self.trace = trace
+        self.cached = False
+
+    def __repr__(self):
+        return "RunResult(lines=%d, error=%r, errorLine=%r)" % (
+            self.lines, self.error, self.errorLine)
+
+# Class: Interpreter
+# Purpose:
+#    Runs BEEP programs.
+# Attributes:
+#    out - output sink every run prints to, or None to collect the output of
+#          each run in RunResult.output
+#    listing - True to print the source listing before running
+#    tables - True to print the variable and label tables before running
+#    verbose - True to print every line executed
+#    profile - True to profile every run
+#    traceSize - number of lines kept by the trace of every run, or 0
+#    optionD - dictionary of the keyword arguments passed to execute
+#    cache - ResultCache which run looks the results of runs up in (see
+#            beepMemo.py), or None
+class Interpreter:
+    # Function: __init__
+    # Parameters:
+    #    out - output sink (see beepOutput.py), or None
+    #    listing - True to print the source listing before running
+    #    tables - True to print the variable and label tables before running
+    #    verbose - True to print every line executed
+    #    profile - True to profile every run (see beepProfile.py)
+    #    traceSize - number of lines to keep in a trace of every run, which is
+    #                printed if the run stops with an error or reaches a
+    #                limit (see beepTrace.py), or 0 for no trace
+    #    optimize, backend, memoryLimit, maxLines, maxSeconds, detectLoops -
+    #        see execute in beepExec.py
+    #    cache - ResultCache (see beepMemo.py), or None
+    def __init__(self, out=None, listing=False, tables=False, verbose=False,
+                 profile=False, traceSize=0, optimize=True, backend="interp",
+                 memoryLimit=None, maxLines=5000, maxSeconds=None, detectLoops=False,
+                 cache=None):
+        self.out = out
+        self.listing = listing
+        self.tables = tables
+        self.verbose = verbose
+        self.profile = profile
+        self.traceSize = traceSize
+        self.optionD = {"optimize": optimize, "backend": backend,
+                        "memoryLimit": memoryLimit, "maxLines": maxLines,
+                        "maxSeconds": maxSeconds, "detectLoops": detectLoops}
+        self.cache = cache
+
+    # Function: run
+    # Purpose:
+    #    Run a program. If the Interpreter has a cache, a run which neither
+    #    profiles, traces, saves snapshots nor resumes from one returns the
+    #    result of the same run made before, if there was one.
+    # Parameters:
+    #    program - Program, or the source code of a program
+    #    valueD - dictionary containing names of declared variables (keys) and
+    #             the values they start with in this run instead of their
+    #             declared values (values), or None
+    #    checkpointer - Checkpointer which saves snapshots of the run (see
+    #                   beepCheckpoint.py), or None
+    #    snapshot - Snapshot saved by an earlier run of the program to resume
+    #               from, or None to run it from the start
+    # Returns:
+    #    RunResult; its lines include the lines executed before the snapshot
+    # Raises:
+    #    ValueError if the snapshot was saved by a different program
+    def run(self, program, valueD=None, checkpointer=None, snapshot=None):
+        if self.cache is not None and not self.profile and self.traceSize == 0 and \
+                checkpointer is None and snapshot is None:
+            if not isinstance(program, Program):
+                program = Program.fromString(program)
+            return self.cache.run(self, program, valueD)
+        return finishSteps(self.runSteps(program, valueD, None, checkpointer, snapshot))
+
+    # Function: runSteps
+    # Purpose:
+    #    Run a program in slices (see executeSteps in beepExec.py), without
+    #    the cache
+    # Parameters:
+    #    program - Program, or the source code of a program
+    #    valueD - see run
+    #    sliceLines - most lines executed between pauses, or None to run to
+    #                 the end without pausing
+    #    checkpointer, snapshot - see run
+    # Yields:
+    #    Number of lines executed so far, at each pause
+    # Returns:
+    #    RunResult
+    # Raises:
+    #    ValueError if the snapshot was saved by a different program
+    def runSteps(self, program, valueD=None, sliceLines=None, checkpointer=None,
+                 snapshot=None):
+        if not isinstance(program, Program):
+            program = Program.fromString(program)
+        resume = None
+        if snapshot is not None:
+            snapshot.check(program.lineM)
+            resume = (snapshot.index, snapshot.counter)
+        out = self.out
+        if out is None:
+            out = MemorySink()
+        if self.listing:
+            program.printListing(out)
+        if self.tables:
+            program.printTables(out)
+        varValueD = dict(program.varValueD)
+        verified = program.verified
+        if valueD is not None:
+            varValueD.update(valueD)
+            # The program was checked with its declared values
+            verified = None
+        if snapshot is not None:
+            varValueD.update(snapshot.valueD)
+            verified = None
+        switch = "-v" if self.verbose else ""
+        profile = None
+        observer = None
+        trace = None
+        if self.profile:
+            profile = Profile(program.lineM)
+            observer = profile.observe
+        if self.traceSize > 0:
+            trace = Trace(self.traceSize)
+        counter, error = yield from executeSteps(
+            program.lineM, program.labelD, program.varTypeD, varValueD, switch, out=out,
+            decoded=program.decoded, lazy=program.lazy, observer=observer,
+            verified=verified, sliceLines=sliceLines, checkpointer=checkpointer,
+            resume=resume, trace=trace, **self.optionD)
+        if profile is not None:
+            profile.finish()
+        for name, value in varValueD.items():
+            varValueD[name] = flatValue(value)
+        errorLine, message, errorKind = error if error is not None else (None, None, None)
+        if trace is not None and error is not None:
+            trace.dump(out, errorLine)
+            out.flush()
+        output = out.getvalue() if self.out is None else None
+        return RunResult(varValueD, counter, message, errorLine, output, profile, trace,
+                         errorKind)
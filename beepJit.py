@@ -0,0 +1,426 @@
+#! /usr/bin/python
+
+# Filename: beepJit.py by Geoffrey Sessums
+# Purpose:
+#     Provides a tracing just-in-time compiler for hot BEEP loops. The
+#     interpreter loop of execute reports every backward jump to a Jit. Once
+#     the target of backward jumps has been reached often enough, one trip
+#     around the loop is recorded and translated into a specialized Python
+#     function (a trace) which repeats that path until something differs:
+#         - an IF goes the other way than it did when the trace was recorded
+#         - an operand of an int operator is not an int (a Numeral, the int
+#           of a constant or declared value, is an int here, but a bool is
+#           not)
+#         - a variable has no value
+#     The trace then returns to the interpreter just before the instruction
+#     whose guard failed, so the interpreter executes that instruction (and
+#     reports any error) exactly as it would have without the trace.
+#     Recording does not execute anything: it evaluates the loop on a copy of
+#     the variable values and gives up on any loop whose first trip would
+#     raise an error or leave the program. Errors no guard foresees (e.g. an
+#     int too long to print, or a string too long to hold) can still happen on
+#     a later trip; the trace then finds the instruction which raised it from
+#     the traceback (as Transpiled.locate does in beepTranspile.py) and
+#     returns to the interpreter just before it, so the interpreter executes
+#     it again and reports the error. If the program has a StringHeap, an
+#     assignment which does not fit within its limit also leaves the trace.
+#     If the program has a Trace of the lines executed (see beepTrace.py),
+#     the trace stores each instruction it executes in the Trace's buffers.
+
+import sys
+
+from beepCompile import OP_NOP, OP_ASSIGN, OP_IF, OP_GOTO, OP_PRINT, OP_INC
+from beepEval import evalExpr, evalCat, evalRep
+from beepDict import Numeral
+
+# Number of backward jumps to a target before its loop is traced
+hotLoopThreshold = 50
+
+# Longest loop, in instructions, which is traced
+maxTraceLength = 200
+
+# Operators whose operands must both be ints, and the Python operators for them
+intOpD = {'+': '+', '-': '-', '>': '>', '>=': '>='}
+
+# Types of the values a trace uses as ints
+intTypes = (int, Numeral)
+
+# Class: Jit
+# Purpose:
+#    The traces of one executing program.
+# Attributes:
+#    codeM - array of Instr being executed
+#    countD - dictionary of jump targets (keys) and number of backward jumps
+#             to them (values)
+#    traceD - dictionary of jump targets (keys) and their trace functions
+#             (values); None if the loop cannot be traced
+#    heap - StringHeap of the program, or None
+#    out - output sink PRINT writes to (see beepOutput.py), or None for
+#          sys.stdout
+#    lineTrace - Trace the lines executed are recorded in, or None
+class Jit:
+    def __init__(self, codeM, heap=None, out=None, lineTrace=None):
+        self.codeM = codeM
+        self.countD = {}
+        self.traceD = {}
+        self.heap = heap
+        self.out = out
+        self.lineTrace = lineTrace
+
+    # Function: backEdge
+    # Purpose:
+    #    Called by the interpreter when a jump to target at or before the
+    #    jumping instruction is taken, or when the next instruction of one
+    #    which does not jump is at or before it (a loop closed by a GOTO
+    #    which was folded away, see foldProgram in beepCompile.py). Runs the
+    #    trace of the loop at target, recording it first if the loop has just
+    #    become hot.
+    # Parameters:
+    #    target - index of the instruction jumped to
+    #    values - list of variable values indexed by slot
+    #    counter - number of lines executed so far
+    #    limit - line limit of the program
+    # Returns:
+    #    (pc, counter) at which the interpreter continues
+    def backEdge(self, target, values, counter, limit):
+        trace = self.traceD.get(target)
+        if trace is None:
+            if target in self.traceD:
+                return target, counter
+            count = self.countD.get(target, 0) + 1
+            self.countD[target] = count
+            if count < hotLoopThreshold:
+                return target, counter
+            trace = compileTrace(self.codeM, target, recordTrace(self.codeM, target, values),
+                                 self.heap, self.out, self.lineTrace)
+            self.traceD[target] = trace
+            if trace is None:
+                return target, counter
+        return trace(values, counter, limit)
+
+# Function: operandOk
+# Purpose:
+#    Check an operand value while recording a trace
+# Parameters:
+#    operand - decoded operand
+#    sim - copy of the variable values
+#    needInt - True if the operand must be an int
+# Returns:
+#    True if the operand can be used by the trace
+def operandOk(operand, sim, needInt):
+    slot, value = operand
+    if slot is not None:
+        value = sim[slot]
+    if needInt:
+        return type(value) in intTypes
+    return value is not None
+
+# Function: exprOk
+# Purpose:
+#    Check that an expression can be evaluated by a trace without raising an
+#    error
+# Parameters:
+#    expr - decoded expression
+#    sim - copy of the variable values
+# Returns:
+#    True if the expression can be used by the trace
+def exprOk(expr, sim):
+    operator, operand1, operand2 = expr
+    if operator is None:
+        return operandOk(operand1, sim, False)
+    if operator in intOpD:
+        return operandOk(operand1, sim, True) and operandOk(operand2, sim, True)
+    if operator == '&':
+        return operandOk(operand1, sim, False) and operandOk(operand2, sim, False)
+    if operator == '*':
+        return operandOk(operand1, sim, False) and operandOk(operand2, sim, True)
+    return False
+
+# Function: recordTrace
+# Purpose:
+#    Find the path of one trip around the loop at head, without executing it
+# Parameters:
+#    codeM - array of Instr
+#    head - index of the first instruction of the loop
+#    values - list of variable values indexed by slot
+# Returns:
+#    List of (pc, jumped) pairs, one per instruction of the loop, or None if
+#    the loop cannot be traced
+def recordTrace(codeM, head, values):
+    sim = list(values)
+    pathM = []
+    pc = head
+    while len(pathM) < maxTraceLength:
+        if pc >= len(codeM):
+            return None
+        instr = codeM[pc]
+        op = instr.op
+        jumped = False
+        if op == OP_ASSIGN:
+            if not exprOk(instr.args[1], sim):
+                return None
+            try:
+                sim[instr.args[0]] = evalExpr(instr.args[1], sim)
+            except Exception:
+                # e.g. a string too long to hold
+                return None
+        elif op == OP_INC:
+            slot = instr.args[0]
+            if type(sim[slot]) not in intTypes:
+                return None
+            sim[slot] = sim[slot] + instr.args[2]
+        elif op == OP_PRINT:
+            for operand in instr.args:
+                if not operandOk(operand, sim, False):
+                    return None
+        elif op == OP_IF:
+            if not exprOk(instr.args[0], sim):
+                return None
+            jumped = evalExpr(instr.args[0], sim) == True
+            if jumped and instr.target is None:
+                return None
+        elif op == OP_GOTO:
+            if instr.target is None:
+                return None
+            jumped = True
+        elif op != OP_NOP:
+            return None
+        pathM.append((pc, jumped))
+        pc = instr.target if jumped else instr.next
+        if pc == head:
+            return pathM
+    return None
+
+# Class: TraceGenerator
+# Purpose:
+#    Builds the Python source of a trace.
+# Attributes:
+#    lineM - lines of generated Python source for the body of the loop
+#    lineMapM - the (instruction index, lines executed in the trip before it,
+#               True once it is recorded in the Trace) of each line of lineM,
+#               so that the trace can find the instruction which raised an
+#               exception
+#    location - the entry of lineMapM for the lines being emitted
+#    constD - dictionary of global names (keys) and values (values) for the
+#             generated code
+#    slotS - set of slots used by the trace
+#    lineTrace - Trace the lines executed are recorded in, or None
+class TraceGenerator:
+    def __init__(self, heap, out, lineTrace=None):
+        self.lineM = []
+        self.lineMapM = []
+        self.location = (0, 0, False)
+        self.constD = {"_cat": evalCat, "_rep": evalRep, "_write": out.write,
+                       "_ints": intTypes}
+        if heap is not None:
+            self.constD["_fits"] = heap.fits
+        if lineTrace is not None:
+            self.constD.update({"_trace": lineTrace, "_ri": lineTrace.instrM,
+                                "_rv": lineTrace.valueM})
+        self.slotS = set()
+        self.lineTrace = lineTrace
+
+    # Function: emit
+    # Purpose:
+    #    Add a line to the body of the loop
+    # Parameters:
+    #    text - text of the line, indented for the body
+    def emit(self, text):
+        self.lineM.append(text)
+        self.lineMapM.append(self.location)
+
+    # Function: constant
+    # Purpose:
+    #    Get the Python source for a literal value (see beepTranspile.py)
+    # Parameters:
+    #    value - literal value
+    # Returns:
+    #    Python source of the value
+    def constant(self, value):
+        if type(value) is str or type(value) is int:
+            return repr(value)
+        name = "_k%d" % (len(self.constD))
+        self.constD[name] = value
+        return name
+
+    # Function: operand
+    # Purpose:
+    #    Get the Python source for an operand and the guard it needs
+    # Parameters:
+    #    operand - decoded operand
+    #    needInt - True if the operand must be an int
+    #    guardM - list to which the guard condition (true when the trace must
+    #             exit) is added
+    # Returns:
+    #    Python source of the operand
+    def operand(self, operand, needInt, guardM):
+        slot, value = operand
+        if slot is None:
+            return self.constant(value)
+        self.slotS.add(slot)
+        var = "v%d" % (slot)
+        if needInt:
+            guardM.append("type(%s) not in _ints" % (var))
+        else:
+            guardM.append("%s is None" % (var))
+        return var
+
+    # Function: expr
+    # Purpose:
+    #    Get the Python source for an expression which exprOk accepted
+    # Parameters:
+    #    expr - decoded expression
+    #    guardM - list to which guard conditions are added
+    # Returns:
+    #    Python source of the expression
+    def expr(self, expr, guardM):
+        operator, operand1, operand2 = expr
+        if operator is None:
+            return self.operand(operand1, False, guardM)
+        if operator in intOpD:
+            return "(%s %s %s)" % (self.operand(operand1, True, guardM),
+                                   intOpD[operator], self.operand(operand2, True, guardM))
+        if operator == '&':
+            return "_cat(%s, %s)" % (self.operand(operand1, False, guardM),
+                                     self.operand(operand2, False, guardM))
+        return "_rep(%s, %s)" % (self.operand(operand1, False, guardM),
+                                 self.operand(operand2, True, guardM))
+
+    # Function: exitUnless
+    # Purpose:
+    #    Emit the guards which leave the trace before an instruction
+    # Parameters:
+    #    guardM - guard conditions
+    #    pc - index of the instruction
+    #    offset - lines executed in this trip around the loop before it
+    def exitUnless(self, guardM, pc, offset):
+        if guardM:
+            self.emit("            if %s: return %d, counter + %d" % (
+                " or ".join(guardM), pc, offset))
+
+    # Function: record
+    # Purpose:
+    #    Emit the code which stores an instruction in the buffer of the Trace
+    #    of the lines executed, once its guards have passed (see record in
+    #    beepTranspile.py)
+    # Parameters:
+    #    instr - Instr about to be executed
+    #    jumped - True if the instruction is an IF which jumps
+    def record(self, instr, jumped=False):
+        if self.lineTrace is None:
+            return
+        self.emit("            _ri[p] = %s" % (self.constant(instr)))
+        if instr.op == OP_ASSIGN or instr.op == OP_INC:
+            self.emit("            q = p")
+        elif instr.op == OP_IF:
+            # The trace only continues the way the IF went when it was
+            # recorded
+            self.emit("            _rv[p] = %s" % (jumped))
+        self.emit("            p = p + 1 if p < %d else 0" % (self.lineTrace.size - 1))
+        pc, offset, recorded = self.location
+        self.location = (pc, offset, True)
+
+    # Function: recordValue
+    # Purpose:
+    #    Emit the code which stores the value an instruction assigned
+    # Parameters:
+    #    var - Python source of the variable
+    def recordValue(self, var):
+        if self.lineTrace is not None:
+            self.emit("            _rv[q] = %s" % (var))
+
+# Function: compileTrace
+# Purpose:
+#    Translate a recorded path into a trace function
+# Parameters:
+#    codeM - array of Instr
+#    head - index of the first instruction of the loop
+#    pathM - path returned by recordTrace, or None
+#    heap - StringHeap of the program, or None
+#    out - output sink PRINT writes to, or None for sys.stdout
+#    lineTrace - Trace the lines executed are recorded in, or None
+# Returns:
+#    The function trace(values, counter, limit) which returns the (pc,
+#    counter) at which the interpreter continues, or None if pathM is None
+def compileTrace(codeM, head, pathM, heap=None, out=None, lineTrace=None):
+    if pathM is None:
+        return None
+    if out is None:
+        out = sys.stdout
+    gen = TraceGenerator(heap, out, lineTrace)
+    emit = gen.emit
+    offset = 0
+    for pc, jumped in pathM:
+        instr = codeM[pc]
+        op = instr.op
+        guardM = []
+        gen.location = (pc, offset, False)
+        if op == OP_ASSIGN:
+            code = gen.expr(instr.args[1], guardM)
+            gen.exitUnless(guardM, pc, offset)
+            gen.slotS.add(instr.args[0])
+            if heap is None:
+                gen.record(instr)
+                emit("            v%d = %s" % (instr.args[0], code))
+            else:
+                emit("            t = %s" % (code))
+                gen.exitUnless(["not _fits(%d, t)" % (instr.args[0])], pc, offset)
+                gen.record(instr)
+                emit("            v%d = t" % (instr.args[0]))
+            gen.recordValue("v%d" % (instr.args[0]))
+        elif op == OP_INC:
+            var = gen.operand((instr.args[0], instr.args[1]), True, guardM)
+            gen.exitUnless(guardM, pc, offset)
+            gen.record(instr)
+            emit("            %s = %s + %d" % (var, var, instr.args[2]))
+            gen.recordValue(var)
+        elif op == OP_PRINT:
+            varM = [gen.operand(operand, False, guardM) for operand in instr.args]
+            gen.exitUnless(guardM, pc, offset)
+            gen.record(instr)
+            if varM:
+                emit("            _write(%r %% (%s,))" % ("%s " * len(varM) + "\n",
+                                                         ", ".join(varM)))
+            else:
+                emit("            _write(\"\\n\")")
+        elif op == OP_IF:
+            cond = gen.expr(instr.args[0], guardM)
+            if instr.args[0][0] not in ('>', '>='):
+                cond = "(%s == True)" % (cond)
+            guardM.append(cond if not jumped else "not %s" % (cond))
+            gen.exitUnless(guardM, pc, offset)
+            gen.record(instr, jumped)
+        else:
+            gen.record(instr)
+        offset = offset + 1 + (instr.jumpSkip if jumped else instr.skip)
+
+    slotM = sorted(gen.slotS)
+    lineM = ["def trace(values, counter, limit):"]
+    lineM += ["    v%d = values[%d]" % (slot, slot) for slot in slotM]
+    lineM += ["    lim = limit - 1"]
+    if lineTrace is not None:
+        lineM += ["    _trace.settle(values)",
+                  "    p = _trace.pos"]
+    lineM += ["    try:",
+              "        while True:",
+              "            if counter + %d > lim: return %d, counter" % (offset, head)]
+    first = len(lineM) + 1
+    lineM += gen.lineM
+    lineM += ["            counter += %d" % (offset)]
+    # An exception leaves the trace just before the instruction which raised
+    # it, and the line recorded for that instruction is taken back, since the
+    # interpreter records it again
+    lineM += ["    except Exception as e:",
+              "        pc, offset, recorded = _map[e.__traceback__.tb_lineno - %d]" % (first)]
+    if lineTrace is not None:
+        lineM += ["        if recorded: p = p - 1 if p > 0 else %d" % (lineTrace.size - 1)]
+    lineM += ["        return pc, counter + offset",
+              "    finally:"]
+    lineM += ["        values[%d] = v%d" % (slot, slot) for slot in slotM]
+    if lineTrace is not None:
+        lineM += ["        _trace.pos = p"]
+    lineM += ["        pass"]
+    namespaceD = dict(gen.constD)
+    namespaceD["_map"] = gen.lineMapM
+    exec(compile("\n".join(lineM) + "\n", "<beep trace>", "exec"), namespaceD)
+    return namespaceD["trace"]
@@ -0,0 +1,167 @@
+#! /usr/bin/python
+
+# Filename: beepLoader.py by Geoffrey Sessums
+# Purpose:
+#     Loads very large BEEP programs without reading them into memory. The
+#     file is memory mapped and scanned once, a chunk at a time, to build an
+#     array of the offsets at which its lines begin; the text of a line is
+#     only decoded from the mapping when it is needed. The same scan finds the
+#     lines which may hold a label or a VAR declaration, and only those lines
+#     are decoded to record them. The loaded MappedProgram is lazy (see execute in beepExec.py): a
+#     line is only decoded into an instruction when it is first executed, so
+#     the time to start and the memory used depend on the lines which run
+#     rather than on the size of the file.
+#     Lines are ended by "\n", "\r\n" or "\r", as they are by Program.fromFile.
+# Usage:
+#     with loadMapped("huge.txt") as program:
+#         result = Interpreter().run(program)
+
+import array
+import bisect
+import itertools
+import mmap
+import re
+
+from beepInterp import Program
+
+# Bytes of the file scanned at a time
+scanChunkSize = 1 << 20
+
+# What a line which may have a label or a VAR declaration holds (see
+# Program.scanLine)
+candidateRe = re.compile(rb":|VAR")
+
+# Class: MappedLines
+# Purpose:
+#    The lines of a memory mapped file, decoded when they are read. It can be
+#    used in place of the list of lines of a Program.
+# Attributes:
+#    data - the mmap of the file, or b"" for an empty file
+#    offsetM - array of the offset of the start of each line, followed by the
+#              offset of the end of the last line
+#    candidateM - list of the indexes of the lines which may have a label or
+#                 a VAR declaration
+class MappedLines:
+    # Function: __init__
+    # Parameters:
+    #    data - the mmap of the file
+    def __init__(self, data):
+        self.data = data
+        self.offsetM = array.array('Q', [0])
+        self.candidateM = []
+        start = 0
+        size = scanChunkSize
+        while start < len(data):
+            chunk = data[start:start + size]
+            if start + size < len(data):
+                # End the chunk with the last line ending in it, which must
+                # not be a "\r" that the next chunk may follow with "\n"
+                end = max(chunk.rfind(b"\n"), chunk.rfind(b"\r", 0, len(chunk) - 1)) + 1
+                if end == 0:
+                    # A line longer than the chunk
+                    size = size * 2
+                    continue
+                chunk = chunk[:end]
+            self.scanChunk(chunk, start)
+            start = start + len(chunk)
+            size = scanChunkSize
+
+    # Function: scanChunk
+    # Purpose:
+    #    Record the lines of a chunk of the file and the ones which may have a
+    #    label or a VAR declaration
+    # Parameters:
+    #    chunk - whole lines of the file, with their line endings
+    #    start - offset of the chunk in the file
+    def scanChunk(self, chunk, start):
+        # bytes.splitlines ends lines exactly as universal newlines do
+        startM = list(itertools.accumulate(map(len, chunk.splitlines(True)), initial=start))
+        first = len(self.offsetM) - 1
+        self.offsetM.extend(startM[1:])
+        for match in candidateRe.finditer(chunk):
+            index = first + bisect.bisect_right(startM, start + match.start()) - 1
+            if self.candidateM == [] or self.candidateM[-1] != index:
+                self.candidateM.append(index)
+
+    def __len__(self):
+        return len(self.offsetM) - 1
+
+    # Function: __getitem__
+    # Purpose:
+    #    Decode a line
+    # Parameters:
+    #    index - index of the line
+    # Returns:
+    #    Text of the line without its newline
+    def __getitem__(self, index):
+        if index < 0:
+            index = index + len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("line index out of range")
+        line = self.data[self.offsetM[index]:self.offsetM[index + 1]]
+        if line.endswith(b"\n"):
+            line = line[:-1]
+        if line.endswith(b"\r"):
+            line = line[:-1]
+        return line.decode('latin-1')
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+# Class: MappedProgram
+# Purpose:
+#    A Program whose lines stay in a memory mapped file and are decoded as
+#    they are executed.
+# Attributes:
+#    See Program; lineM is a MappedLines and file is the open file.
+class MappedProgram(Program):
+    lazy = True
+
+    # Function: __init__
+    # Parameters:
+    #    fileName - name of the file
+    def __init__(self, fileName):
+        super().__init__(fileName)
+        self.file = open(fileName, "rb")
+        try:
+            data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # An empty file cannot be mapped
+            data = b""
+        self.lineM = MappedLines(data)
+        # Record the labels and declarations in the order of their lines
+        for index in self.lineM.candidateM:
+            self.scanLine(self.lineM[index], index + 1)
+
+    # Function: decode
+    # Purpose:
+    #    Lines of a MappedProgram are decoded by execute when they run
+    # Returns:
+    #    The program
+    def decode(self):
+        return self
+
+    # Function: close
+    # Purpose:
+    #    Unmap and close the file
+    def close(self):
+        if isinstance(self.lineM.data, mmap.mmap):
+            self.lineM.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, tb):
+        self.close()
+
+# Function: loadMapped
+# Purpose:
+#    Load a program from a file by memory mapping it
+# Parameters:
+#    fileName - name of the file
+# Returns:
+#    MappedProgram
+def loadMapped(fileName):
+    return MappedProgram(fileName)
@@ -0,0 +1,211 @@
+#! /usr/bin/python
+
+# Filename: beepLoops.py by Geoffrey Sessums
+# Purpose:
+#     Finds counted loops in a folded BEEP program (see foldProgram in
+#     beepCompile.py) and runs many of their iterations at once. A counted
+#     loop is a cycle of instructions with a single IF, which is the only way
+#     out of it, e.g.
+#         LOOP: ASSIGN i + i 1
+#               ASSIGN total + total step
+#               IF > n i LOOP
+#     Every other line of the cycle must add to or subtract from a variable
+#     an int constant or a variable the cycle does not change, and the IF
+#     must compare two such variables or constants with > or >=. Each
+#     iteration then adds the same amount to every variable it changes, so
+#     the number of iterations before the IF leaves the loop and the values
+#     of the variables after any of them can be found directly. execute calls
+#     advance each time the IF stays in the loop; advance adds the iterations
+#     which are certain to stay in the loop to the variables and to the line
+#     count, and leaves the last iteration to be executed line by line, so
+#     the lines printed, the errors and the line limit are as if every
+#     iteration had been executed. A program with a Trace of the lines
+#     executed (see beepTrace.py) keeps enough iterations in hand to fill it.
+
+from beepCompile import OP_NOP, OP_ASSIGN, OP_IF, OP_INC
+
+# Most instructions in the cycle of a counted loop
+maxLoopLength = 64
+
+# Class: CountedLoop
+# Purpose:
+#    A counted loop, found at its IF.
+# Attributes:
+#    onJump - True if the loop goes around when the IF jumps, False if it
+#             goes around when the IF does not jump
+#    expr - decoded condition of the IF
+#    updateM - list of (slot, constant, termM) for each variable the cycle
+#              changes, where an iteration adds constant plus the sum of
+#              sign * value for each (sign, slot) in termM
+#    slotM - slots of every variable the cycle reads, which must hold ints
+#    lines - number of lines executed by one iteration
+class CountedLoop:
+    __slots__ = ("onJump", "expr", "updateM", "slotM", "lines")
+
+    def __init__(self, onJump, expr, updateM, slotM, lines):
+        self.onJump = onJump
+        self.expr = expr
+        self.updateM = updateM
+        self.slotM = slotM
+        self.lines = lines
+
+    # Function: advance
+    # Purpose:
+    #    Run the iterations which follow the IF of the loop and are certain to
+    #    reach it and go around again, as long as they stay within the line
+    #    count at which execute must stop
+    # Parameters:
+    #    values - list of variable values indexed by slot
+    #    counter - number of lines executed, once the IF was executed
+    #    stopAt - line count at which execute must stop (see nextStop in
+    #             beepBudget.py)
+    #    jumped - True if the IF jumped
+    #    keep - iterations which must be left to be executed line by line
+    #           before the loop ends or execute stops
+    # Returns:
+    #    Number of lines executed, once the iterations are run
+    def advance(self, values, counter, stopAt, jumped, keep=0):
+        if jumped != self.onJump:
+            return counter
+        for slot in self.slotM:
+            if not isinstance(values[slot], int):
+                # Left for the lines to convert or report
+                return counter
+        deltaD = {}
+        for slot, constant, termM in self.updateM:
+            for sign, source in termM:
+                constant = constant + sign * values[source]
+            deltaD[slot] = constant
+        operator, (slot1, value1), (slot2, value2) = self.expr
+        if slot1 is not None:
+            value1 = values[slot1]
+        if slot2 is not None:
+            value2 = values[slot2]
+        # After t more iterations the loop goes around again while
+        # rest + t * step > 0
+        rest = value1 - value2
+        if operator == '>=':
+            rest = rest + 1
+        step = deltaD.get(slot1, 0) - deltaD.get(slot2, 0)
+        if not self.onJump:
+            rest = 1 - rest
+            step = -step
+        # One iteration is kept in hand for the lines between the IF and the
+        # end of the iteration
+        count = (stopAt - 1 - counter) // self.lines - 1
+        if step < 0:
+            count = min(count, (rest - 1) // -step)
+        elif rest + step <= 0:
+            count = 0
+        count = count - keep
+        if count <= 0:
+            return counter
+        for slot, delta in deltaD.items():
+            values[slot] = values[slot] + count * delta
+        return counter + count * self.lines
+
+# Function: linearUpdate
+# Purpose:
+#    Find what an instruction adds to the variable it assigns
+# Parameters:
+#    instr - ASSIGN or INC instruction
+# Returns:
+#    (slot, constant, termM) as in CountedLoop.updateM, or None if the
+#    instruction does not add to its variable
+def linearUpdate(instr):
+    if instr.op == OP_INC:
+        return (instr.args[0], instr.args[2], [])
+    slot, (operator, operand1, operand2) = instr.args
+    if operator == '+' and operand1[0] == slot:
+        sign, operand = 1, operand2
+    elif operator == '+' and operand2 is not None and operand2[0] == slot:
+        sign, operand = 1, operand1
+    elif operator == '-' and operand1[0] == slot:
+        sign, operand = -1, operand2
+    else:
+        return None
+    source, value = operand
+    if source is None:
+        if type(value) is not int:
+            return None
+        return (slot, sign * value, [])
+    if source == slot:
+        return None
+    return (slot, 0, [(sign, source)])
+
+# Function: findLoop
+# Purpose:
+#    Find the counted loop of an IF, if it has one
+# Parameters:
+#    codeM - array of folded Instr
+#    index - index of the IF
+#    onJump - True to follow the cycle from the target of the IF, False to
+#             follow it from the next instruction
+# Returns:
+#    CountedLoop, or None
+def findLoop(codeM, index, onJump):
+    instr = codeM[index]
+    expr = instr.args[0]
+    operator = expr[0]
+    if operator != '>' and operator != '>=':
+        return None
+    for source, value in expr[1:]:
+        if source is None and type(value) is not int:
+            return None
+    if onJump:
+        lines = 1 + instr.jumpSkip
+        pos = instr.target
+    else:
+        lines = 1 + instr.skip
+        pos = instr.next
+    updateD = {}
+    readS = set()
+    seenS = set()
+    while pos != index:
+        # The cycle must come back to the IF without leaving the program
+        if pos >= len(codeM) or pos in seenS or len(seenS) == maxLoopLength:
+            return None
+        seenS.add(pos)
+        step = codeM[pos]
+        if step.op == OP_ASSIGN or step.op == OP_INC:
+            update = linearUpdate(step)
+            if update is None:
+                return None
+            slot, constant, termM = update
+            if slot in updateD:
+                updateD[slot][1] = updateD[slot][1] + constant
+                updateD[slot][2].extend(termM)
+            else:
+                updateD[slot] = [slot, constant, list(termM)]
+            readS.update(source for sign, source in termM)
+        elif step.op != OP_NOP:
+            return None
+        lines = lines + 1 + step.skip
+        pos = step.next
+    # The amounts added must not change while the loop runs
+    if any(source in updateD for source in readS):
+        return None
+    readS.update(updateD)
+    readS.update(source for source, value in expr[1:] if source is not None)
+    updateM = [tuple(update) for update in updateD.values()]
+    return CountedLoop(onJump, expr, updateM, sorted(readS), lines)
+
+# Function: findLoops
+# Purpose:
+#    Find the counted loops of a folded program
+# Parameters:
+#    codeM - array of folded Instr
+# Returns:
+#    List indexed like codeM of the CountedLoop of each IF which has one and
+#    None elsewhere, or None if the program has no counted loops
+def findLoops(codeM):
+    loopM = [None] * len(codeM)
+    found = False
+    for index, instr in enumerate(codeM):
+        if instr.op != OP_IF or instr.target is None:
+            continue
+        loop = findLoop(codeM, index, True) or findLoop(codeM, index, False)
+        if loop is not None:
+            loopM[index] = loop
+            found = True
+    return loopM if found else None
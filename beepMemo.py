@@ -0,0 +1,427 @@
+#! /usr/bin/python
+
+# Filename: beepMemo.py by Geoffrey Sessums
+# Purpose:
+#     Remembers the results of BEEP programs. A BEEP program has no input, so
+#     what a run prints, the values its variables end with, the number of
+#     lines it executes and the error which stops it depend only on its
+#     source code, the values its variables start with and the settings of
+#     the Interpreter (see beepInterp.py). A ResultCache keeps the results of
+#     runs under a hash of all of these and of the interpreter version (see
+#     beepCache.py), and an Interpreter given one returns the result of a run
+#     it has seen before, printing exactly the same output, without
+#     executing a line.
+#         - The most recently used results are kept in memory, up to
+#           maxEntries results and maxChars characters of output.
+#         - If the cache has a directory, every result is written to it as
+#           well, and a result which is not in memory is looked for there, so
+#           later runs and other processes find it. Entries are written
+#           atomically (see writeAtomically in beepCheckpoint.py). Once they
+#           take more than maxBytes, the least recently used are removed.
+#         - A run is only cached if it cannot depend on anything else: runs
+#           which are profiled, traced, saved to snapshots or resumed from
+#           one are never cached, and neither are runs stopped by their time
+#           limit, by their memory limit or by any error which is not one of
+#           the BEEP program (e.g. MemoryError, OverflowError), as these
+#           depend on the host. Runs which print more than maxOutput
+#           characters are not stored.
+# File format:
+#     The magic bytes followed by a zlib compressed marshal of a dictionary
+#     holding the format, the key, the output, the line count, the error,
+#     its line, its kind and the final values of the variables (see encodeValues in
+#     beepCheckpoint.py).
+# Usage:
+#     interpreter = Interpreter(cache=ResultCache("results"))
+#     interpreter.run(program)    # runs the program
+#     interpreter.run(program)    # returns the same result at once
+
+import collections
+import copy
+import hashlib
+import json
+import marshal
+import os
+import zlib
+
+from beepInterp import RunResult
+from beepOutput import MemorySink, TeeSink
+from beepBudget import timeLimitMessage
+from beepCache import interpreterVersion
+from beepCheckpoint import programHash, encodeValues, decodeValues, writeAtomically
+
+# First bytes of an entry
+resultMagic = b"BEEPMEMO"
+
+# Suffix of entries
+resultSuffix = ".beepr"
+
+# Changed whenever the layout of an entry or of its key changes
+resultFormat = 2
+
+# Modules whose source determines the result of a run
+resultModuleM = ["beepBudget", "beepCheck", "beepCompile", "beepDict", "beepErrors",
+                 "beepEval", "beepExec", "beepInterp", "beepJit", "beepLoops", "beepMemo",
+                 "beepOptimize", "beepOutput", "beepRegs", "beepRope", "beepTranspile"]
+
+version = interpreterVersion(resultFormat, resultModuleM)
+
+# Errors of BEEP programs, which stop a run the same way on every host (see
+# beepErrors.py), and the IndexError of a GOTO or IF missing its label;
+# MemoryLimitExceeded is left out as it depends on -m
+programErrorS = {"InvalidValueType", "TooFewOperands", "VarNotDefined", "LabelNotDefined",
+                 "InvalidExpression", "IndexError"}
+
+# Defaults of a ResultCache
+defaultMaxEntries = 1024
+defaultMaxChars = 1 << 26
+defaultMaxOutput = 1 << 22
+defaultMaxBytes = 1 << 28
+
+# ResultCaches of this process, by directory (see sharedCache)
+sharedCacheD = {}
+
+# Function: resultKey
+# Purpose:
+#    Get the key of the result of a run
+# Parameters:
+#    interpreter - Interpreter running the program
+#    program - Program
+#    valueD - dictionary containing names of variables (keys) and the values
+#             they start with instead of their declared values (values), or
+#             None
+# Returns:
+#    Hexadecimal hash of the program, the values its variables start with,
+#    the settings of the interpreter and the interpreter version
+def resultKey(interpreter, program, valueD):
+    startD = dict(program.varValueD)
+    if valueD is not None:
+        startD.update(valueD)
+    # Equal values of different types (1, True and a Numeral 1) behave
+    # differently, so the types are part of the key
+    startM = [(name, type(value).__name__, None if value is None else str(value))
+              for name, value in sorted(startD.items())]
+    settingM = [interpreter.listing, interpreter.tables, interpreter.verbose,
+                # The name of the program is only printed in the listing
+                program.name if interpreter.listing else None, program.lazy,
+                sorted(interpreter.optionD.items())]
+    digest = hashlib.sha256(version)
+    digest.update(programHash(program.lineM).encode())
+    digest.update(json.dumps([settingM, startM]).encode())
+    return digest.hexdigest()
+
+# Function: entryBytes
+# Purpose:
+#    Encode a result
+# Parameters:
+#    key - key of the result
+#    entry - (output, lines, error, errorLine, errorKind, variables)
+# Returns:
+#    Contents of an entry
+def entryBytes(key, entry):
+    output, lines, error, errorLine, errorKind, variables = entry
+    stateD = {"format": resultFormat, "key": key, "output": output, "lines": lines,
+              "error": error, "errorLine": errorLine, "errorKind": errorKind}
+    stateD.update(encodeValues(variables))
+    return resultMagic + zlib.compress(marshal.dumps(stateD))
+
+# Function: entryFromBytes
+# Purpose:
+#    Decode a result
+# Parameters:
+#    data - contents of an entry
+#    key - key the entry must hold
+# Returns:
+#    (output, lines, error, errorLine, errorKind, variables)
+# Raises:
+#    ValueError if data is not an entry of this version holding key
+def entryFromBytes(data, key):
+    if not data.startswith(resultMagic):
+        raise ValueError("not a BEEP result")
+    try:
+        stateD = marshal.loads(zlib.decompress(data[len(resultMagic):]))
+    except (zlib.error, EOFError, TypeError, ValueError) as e:
+        raise ValueError("damaged result: %s" % (e))
+    if not isinstance(stateD, dict) or stateD.get("format") != resultFormat or \
+            stateD.get("key") != key:
+        raise ValueError("result format is not supported")
+    return (stateD["output"], stateD["lines"], stateD["error"], stateD["errorLine"],
+            stateD["errorKind"], decodeValues(stateD))
+
+# Class: ResultCache
+# Purpose:
+#    The results of runs, in memory and optionally in a directory.
+# Attributes:
+#    cacheDir - directory the results are written to, or None
+#    maxEntries - most results kept in memory
+#    maxChars - most characters of output kept in memory
+#    maxOutput - most characters a run may print to be stored
+#    maxBytes - most bytes the entries in cacheDir may take
+#    memoryD - OrderedDict of the keys (keys) and results (values) kept in
+#              memory, least recently used first; a result is (output, lines,
+#              error, errorLine, errorKind, variables)
+#    memoryChars - characters of output kept in memory
+#    diskBytes - bytes taken by the entries in cacheDir, as far as this
+#                process knows, or None until they are counted
+#    hits - number of runs whose result was found in memory
+#    diskHits - number of runs whose result was found in cacheDir
+#    misses - number of cacheable runs whose result was not found
+#    stores - number of results stored
+#    evictions - number of results removed from memory
+#    diskEvictions - number of entries removed from cacheDir
+class ResultCache:
+    # Function: __init__
+    # Parameters:
+    #    cacheDir - directory the results are written to, or None to keep
+    #               them only in memory
+    #    maxEntries - most results kept in memory
+    #    maxChars - most characters of output kept in memory
+    #    maxOutput - most characters a run may print to be stored
+    #    maxBytes - most bytes the entries in cacheDir may take
+    def __init__(self, cacheDir=None, maxEntries=defaultMaxEntries, maxChars=defaultMaxChars,
+                 maxOutput=defaultMaxOutput, maxBytes=defaultMaxBytes):
+        self.cacheDir = cacheDir
+        self.maxEntries = maxEntries
+        self.maxChars = maxChars
+        self.maxOutput = maxOutput
+        self.maxBytes = maxBytes
+        self.memoryD = collections.OrderedDict()
+        self.memoryChars = 0
+        self.diskBytes = None
+        self.hits = 0
+        self.diskHits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.diskEvictions = 0
+
+    # Function: stats
+    # Purpose:
+    #    Describe the use of the cache
+    # Returns:
+    #    Dictionary of the statistics
+    def stats(self):
+        return {"hits": self.hits, "diskHits": self.diskHits, "misses": self.misses,
+                "stores": self.stores, "evictions": self.evictions,
+                "diskEvictions": self.diskEvictions, "entries": len(self.memoryD),
+                "chars": self.memoryChars}
+
+    # Function: run
+    # Purpose:
+    #    Run a program through the cache (see Interpreter.run)
+    # Parameters:
+    #    interpreter - Interpreter running the program
+    #    program - Program
+    #    valueD - see resultKey
+    # Returns:
+    #    RunResult; cached is True if it was found in the cache
+    def run(self, interpreter, program, valueD):
+        key = resultKey(interpreter, program, valueD)
+        entry = self.lookup(key)
+        if entry is not None:
+            output, lines, error, errorLine, errorKind, variables = entry
+            if interpreter.out is not None:
+                interpreter.out.write(output)
+                interpreter.out.flush()
+                output = None
+            result = RunResult(dict(variables), lines, error, errorLine, output,
+                               errorKind=errorKind)
+            result.cached = True
+            return result
+        self.misses = self.misses + 1
+
+        # The output is recorded while it is printed
+        runner = copy.copy(interpreter)
+        runner.cache = None
+        if interpreter.out is None:
+            runner.out = MemorySink()
+        else:
+            runner.out = TeeSink(interpreter.out, self.maxOutput)
+        result = runner.run(program, valueD)
+        output = runner.out.getvalue()
+        if interpreter.out is None:
+            result.output = output
+        if output is not None and len(output) <= self.maxOutput and \
+                self.deterministic(interpreter, result):
+            self.store(key, (output, result.lines, result.error, result.errorLine,
+                             result.errorKind,
+                             dict(result.variables)))
+        return result
+
+    # Function: deterministic
+    # Purpose:
+    #    Decide whether a run would end the same way every time
+    # Parameters:
+    #    interpreter - Interpreter which ran the program
+    #    result - RunResult
+    # Returns:
+    #    True if the run ended normally, by an error of the BEEP program or by
+    #    its line limit; False if it was stopped by its time limit, its memory
+    #    limit or any error of the interpreter or of the host (e.g. MemoryError,
+    #    OverflowError or RecursionError), which depend on the resources of
+    #    the run rather than on the program
+    def deterministic(self, interpreter, result):
+        if result.error is None:
+            return True
+        if result.errorKind == "BudgetExceeded":
+            maxSeconds = interpreter.optionD["maxSeconds"]
+            return maxSeconds is None or result.error != timeLimitMessage % (maxSeconds)
+        return result.errorKind in programErrorS
+
+    # Function: lookup
+    # Purpose:
+    #    Find a result in memory, then in cacheDir
+    # Parameters:
+    #    key - key of the result
+    # Returns:
+    #    The result, or None if it is not in the cache
+    def lookup(self, key):
+        entry = self.memoryD.get(key)
+        if entry is not None:
+            self.memoryD.move_to_end(key)
+            self.hits = self.hits + 1
+            return entry
+        if self.cacheDir is None:
+            return None
+        entryName = self.entryName(key)
+        try:
+            with open(entryName, "rb") as file:
+                entry = entryFromBytes(file.read(), key)
+        except OSError:
+            return None
+        except ValueError:
+            # An entry which cannot be read is removed and written again
+            self.removeEntry(entryName)
+            return None
+        # The time an entry was last modified is the time it was last used
+        try:
+            os.utime(entryName)
+        except OSError:
+            pass
+        self.diskHits = self.diskHits + 1
+        self.remember(key, entry)
+        return entry
+
+    # Function: store
+    # Purpose:
+    #    Add a result to the cache
+    # Parameters:
+    #    key - key of the result
+    #    entry - the result
+    # Returns:
+    #    N/A
+    def store(self, key, entry):
+        self.stores = self.stores + 1
+        self.remember(key, entry)
+        if self.cacheDir is None:
+            return
+        data = entryBytes(key, entry)
+        # If the directory cannot be written, results are only kept in memory
+        try:
+            os.makedirs(self.cacheDir, exist_ok=True)
+            writeAtomically(self.entryName(key), data)
+        except OSError:
+            return
+        if self.diskBytes is None:
+            self.diskBytes = sum(size for size, time, name in self.diskEntries())
+        else:
+            self.diskBytes = self.diskBytes + len(data)
+        if self.diskBytes > self.maxBytes:
+            self.evictDisk()
+
+    # Function: remember
+    # Purpose:
+    #    Keep a result in memory, removing the least recently used results
+    #    once there are too many
+    # Parameters:
+    #    key - key of the result
+    #    entry - the result
+    # Returns:
+    #    N/A
+    def remember(self, key, entry):
+        if key in self.memoryD:
+            self.memoryChars = self.memoryChars - len(self.memoryD.pop(key)[0])
+        self.memoryD[key] = entry
+        self.memoryChars = self.memoryChars + len(entry[0])
+        while len(self.memoryD) > self.maxEntries or self.memoryChars > self.maxChars:
+            oldKey, oldEntry = self.memoryD.popitem(last=False)
+            self.memoryChars = self.memoryChars - len(oldEntry[0])
+            self.evictions = self.evictions + 1
+
+    # Function: entryName
+    # Purpose:
+    #    Get the file name of an entry
+    # Parameters:
+    #    key - key of the result
+    # Returns:
+    #    File name of the entry in cacheDir
+    def entryName(self, key):
+        return os.path.join(self.cacheDir, key + resultSuffix)
+
+    # Function: diskEntries
+    # Purpose:
+    #    Find the entries in cacheDir
+    # Returns:
+    #    List of (size, time last used, file name) of the entries
+    def diskEntries(self):
+        entryM = []
+        try:
+            with os.scandir(self.cacheDir) as dirIter:
+                for dirEntry in dirIter:
+                    if not dirEntry.name.endswith(resultSuffix):
+                        continue
+                    try:
+                        stat = dirEntry.stat()
+                    except OSError:
+                        continue
+                    entryM.append((stat.st_size, stat.st_mtime, dirEntry.path))
+        except OSError:
+            pass
+        return entryM
+
+    # Function: evictDisk
+    # Purpose:
+    #    Remove the least recently used entries from cacheDir until they take
+    #    three quarters of maxBytes, so that it is not scanned again at once
+    # Returns:
+    #    N/A
+    def evictDisk(self):
+        # The entries are counted again, since other processes share them
+        entryM = self.diskEntries()
+        entryM.sort(key=lambda entry: entry[1])
+        total = sum(size for size, time, name in entryM)
+        for size, time, name in entryM:
+            if total <= self.maxBytes * 3 // 4:
+                break
+            if self.removeEntry(name):
+                self.diskEvictions = self.diskEvictions + 1
+            total = total - size
+        self.diskBytes = total
+
+    # Function: removeEntry
+    # Purpose:
+    #    Remove an entry from cacheDir
+    # Parameters:
+    #    entryName - file name of the entry
+    # Returns:
+    #    True if it was removed
+    def removeEntry(self, entryName):
+        try:
+            os.remove(entryName)
+        except OSError:
+            return False
+        return True
+
+# Function: sharedCache
+# Purpose:
+#    Get the ResultCache this process keeps for a directory, so that the runs
+#    of a worker process share its memory (see beepBatch.py and beepServer.py)
+# Parameters:
+#    cacheDir - directory of the cache
+# Returns:
+#    ResultCache
+def sharedCache(cacheDir):
+    cache = sharedCacheD.get(cacheDir)
+    if cache is None:
+        cache = ResultCache(cacheDir)
+        sharedCacheD[cacheDir] = cache
+    return cache
@@ -0,0 +1,115 @@
+#! /usr/bin/python
+
+# Filename: beepOptimize.py by Geoffrey Sessums
+# Purpose:
+#     Rewrites decoded BEEP instructions (see beepCompile.py) into cheaper
+#     ones before they are folded and executed:
+#         - an expression whose operands are all literals is evaluated once,
+#           e.g. "+ 3 4" becomes the constant 7
+#         - an IF whose condition is constant becomes a GOTO or does nothing
+#         - "ASSIGN x + x 1", "ASSIGN x + 1 x" and "ASSIGN x - x 1" (for any
+#           numeric constant) become an OP_INC instruction
+#         - "ASSIGN x x" does nothing when x is known to have a value
+#     Every rewritten instruction keeps its line number and still counts as an
+#     executed line, and an expression which would raise an error is left
+#     alone so that the error is reported when the line executes.
+
+from beepCompile import Instr, OP_NOP, OP_ASSIGN, OP_IF, OP_GOTO, OP_INC
+from beepEval import evalExpr
+
+# Constant strings longer than this are built when the line executes rather
+# than when the program is compiled
+maxFoldedLength = 4096
+
+# Function: foldExpr
+# Purpose:
+#    Evaluate an expression whose operands are all literals
+# Parameters:
+#    expr - decoded expression
+# Returns:
+#    (None, (None, value), None) if the expression could be evaluated
+#    expr itself otherwise
+def foldExpr(expr):
+    operator, operand1, operand2 = expr
+    if operator is None or operand1[0] is not None or operand2[0] is not None:
+        return expr
+    try:
+        value = evalExpr(expr, [])
+    except Exception:
+        return expr
+    # Long strings are Ropes, which are left to be built when the line executes
+    if type(value) is not str and type(value) is not int and type(value) is not bool:
+        return expr
+    if type(value) is str and len(value) > maxFoldedLength:
+        return expr
+    return (None, (None, value), None)
+
+# Function: increment
+# Purpose:
+#    Find the amount added by an expression of the form "+ x 1", "+ 1 x" or
+#    "- x 1"
+# Parameters:
+#    slot - slot of the variable being assigned
+#    expr - decoded expression
+# Returns:
+#    Amount added to the variable, or None if the expression is not an
+#    increment of it
+def increment(slot, expr):
+    operator, operand1, operand2 = expr
+    if operator == '+':
+        if operand1[0] == slot and operand2[0] is None:
+            amount = operand2[1]
+        elif operand2[0] == slot and operand1[0] is None:
+            amount = operand1[1]
+        else:
+            return None
+    elif operator == '-' and operand1[0] == slot and operand2[0] is None:
+        amount = operand2[1]
+        if type(amount) is int:
+            amount = -amount
+    else:
+        return None
+    if type(amount) is not int:
+        return None
+    return amount
+
+# Function: optimizeInstr
+# Purpose:
+#    Rewrite a single instruction
+# Parameters:
+#    instr - decoded instruction
+#    regs - RegisterFile of the program
+# Returns:
+#    Optimized instruction, which may be instr itself
+def optimizeInstr(instr, regs):
+    if instr.op == OP_ASSIGN:
+        slot, expr = instr.args
+        expr = foldExpr(expr)
+        amount = increment(slot, expr)
+        if amount is not None:
+            return Instr(OP_INC, (slot, regs.nameM[slot], amount), instr.line)
+        # Copying a variable to itself only matters if it has no value
+        if expr[0] is None and expr[1][0] == slot and regs.values[slot] is not None:
+            return Instr(OP_NOP, (), instr.line)
+        return Instr(OP_ASSIGN, (slot, expr), instr.line)
+
+    if instr.op == OP_IF:
+        expr, label = instr.args
+        expr = foldExpr(expr)
+        if expr[0] is None and expr[1][0] is None:
+            if expr[1][1] == True:
+                return Instr(OP_GOTO, (label,), instr.line, instr.target)
+            return Instr(OP_NOP, (), instr.line)
+        return Instr(OP_IF, (expr, label), instr.line, instr.target)
+    return instr
+
+# Function: optimizeProgram
+# Purpose:
+#    Rewrite every instruction of a decoded program
+# Parameters:
+#    codeM - array of Instr returned by decodeProgram
+#    regs - RegisterFile of the program
+# Returns:
+#    Array of optimized Instr, one per instruction of codeM
+def optimizeProgram(codeM, regs):
+    return [optimizeInstr(instr, regs) for instr in codeM]
@@ -0,0 +1,229 @@
+#! /usr/bin/python
+
+# Filename: beepOutput.py by Geoffrey Sessums
+# Purpose:
+#     Provides the output sinks which everything printed while loading and
+#     executing a BEEP program is written to: the source listing, the variable
+#     and label tables, the output of PRINT statements, and the verbose trace.
+#     Calling print for every token and every line costs a write to the stream
+#     each time, which dominates the run time when stdout is a pipe. A sink
+#     collects the text in a buffer instead and writes it to its stream in one
+#     piece once flushSize characters have been collected, when it is flushed,
+#     and when it is closed. Sinks have the write and flush methods of a file,
+#     so they can also be passed to print as its file.
+#         - OutputSink writes to a stream, sys.stdout by default
+#         - MemorySink keeps the output in memory (see getvalue)
+#         - FileSink writes to a file which it opens and closes itself
+#         - AsyncSink keeps the output until a coroutine drains it to an
+#           asynchronous writer (see beepAsync.py)
+#         - TeeSink passes the output on to another sink and keeps a copy of
+#           it (see beepMemo.py)
+
+import io
+import sys
+
+# Characters collected before a sink writes them to its stream
+defaultFlushSize = 65536
+
+# Class: OutputSink
+# Purpose:
+#    A buffered writer of text to a stream.
+# Attributes:
+#    stream - file object the text is written to
+#    flushSize - characters collected before they are written; 0 writes
+#                every piece of text at once
+#    partM - list of the pieces of text which have not been written
+#    size - number of characters in partM
+class OutputSink:
+    # Function: __init__
+    # Parameters:
+    #    stream - file object the text is written to, or None for sys.stdout
+    #    flushSize - characters collected before they are written
+    def __init__(self, stream=None, flushSize=defaultFlushSize):
+        if stream is None:
+            stream = sys.stdout
+        self.stream = stream
+        self.flushSize = flushSize
+        self.partM = []
+        self.size = 0
+
+    # Function: write
+    # Purpose:
+    #    Add text to the buffer, writing the buffer once it is full
+    # Parameters:
+    #    text - text to write
+    # Returns:
+    #    Number of characters written
+    def write(self, text):
+        self.partM.append(text)
+        self.size = self.size + len(text)
+        if self.size >= self.flushSize:
+            self.flush()
+        return len(text)
+
+    # Function: flush
+    # Purpose:
+    #    Write the buffer to the stream and flush the stream
+    # Returns:
+    #    N/A
+    def flush(self):
+        if self.partM:
+            self.stream.write("".join(self.partM))
+            self.partM = []
+            self.size = 0
+        self.stream.flush()
+
+    # Function: close
+    # Purpose:
+    #    Write whatever is left in the buffer
+    # Returns:
+    #    N/A
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, tb):
+        self.close()
+
+# Class: MemorySink
+# Purpose:
+#    A sink which keeps its output in memory.
+class MemorySink(OutputSink):
+    def __init__(self, flushSize=defaultFlushSize):
+        super().__init__(io.StringIO(), flushSize)
+
+    # Function: getvalue
+    # Purpose:
+    #    Get everything written to the sink
+    # Returns:
+    #    The text written
+    def getvalue(self):
+        self.flush()
+        return self.stream.getvalue()
+
+# Class: FileSink
+# Purpose:
+#    A sink which writes to a file. The file is written as latin-1, the
+#    encoding programs are read in (see Program.fromFile), so that every
+#    character a program prints can be written.
+class FileSink(OutputSink):
+    # Function: __init__
+    # Parameters:
+    #    fileName - name of the file
+    #    flushSize - characters collected before they are written
+    #    mode - "w" to replace the file or "a" to append to it
+    def __init__(self, fileName, flushSize=defaultFlushSize, mode="w"):
+        super().__init__(open(fileName, mode, encoding="latin-1"), flushSize)
+
+    # Function: close
+    # Purpose:
+    #    Write whatever is left in the buffer and close the file
+    # Returns:
+    #    N/A
+    def close(self):
+        if not self.stream.closed:
+            self.flush()
+            self.stream.close()
+
+# Class: AsyncSink
+# Purpose:
+#    A sink whose output is written by a coroutine. A program writes to it
+#    without waiting, and whatever runs the program awaits drain between its
+#    slices, so a slow writer holds back only the program writing to it.
+# Attributes:
+#    writer - coroutine function called with each piece of text drained, or
+#             a stream writer with write and a coroutine drain method (e.g.
+#             an asyncio.StreamWriter), which is given the text as UTF-8
+class AsyncSink(OutputSink):
+    def __init__(self, writer):
+        super().__init__(io.StringIO(), 0)
+        self.writer = writer
+
+    # Function: write
+    # Purpose:
+    #    Add text to the buffer; it is only written by drain
+    # Parameters:
+    #    text - text to write
+    # Returns:
+    #    Number of characters written
+    def write(self, text):
+        self.partM.append(text)
+        self.size = self.size + len(text)
+        return len(text)
+
+    # Function: flush
+    # Purpose:
+    #    Do nothing: the buffer can only be written by awaiting drain
+    # Returns:
+    #    N/A
+    def flush(self):
+        pass
+
+    # Function: drain
+    # Purpose:
+    #    Write the buffer to the writer
+    # Returns:
+    #    N/A
+    async def drain(self):
+        if not self.partM:
+            return
+        text = "".join(self.partM)
+        self.partM = []
+        self.size = 0
+        if hasattr(self.writer, "drain"):
+            self.writer.write(text.encode("utf-8"))
+            await self.writer.drain()
+        else:
+            await self.writer(text)
+
+# Class: TeeSink
+# Purpose:
+#    A sink which passes its output on to another sink at once and keeps a
+#    copy of it, so the output of a run can be recorded as it is printed.
+# Attributes:
+#    stream - sink the output is passed on to
+#    limit - most characters copied; once more are written the copy is
+#            dropped (see getvalue)
+class TeeSink(OutputSink):
+    # Function: __init__
+    # Parameters:
+    #    sink - sink the output is passed on to
+    #    limit - most characters copied, or None for no limit
+    def __init__(self, sink, limit=None):
+        super().__init__(sink, 0)
+        self.limit = limit
+
+    # Function: write
+    # Purpose:
+    #    Pass text on to the sink and copy it
+    # Parameters:
+    #    text - text to write
+    # Returns:
+    #    Number of characters written
+    def write(self, text):
+        if self.partM is not None:
+            self.partM.append(text)
+            self.size = self.size + len(text)
+            if self.limit is not None and self.size > self.limit:
+                self.partM = None
+        return self.stream.write(text)
+
+    # Function: flush
+    # Purpose:
+    #    Flush the sink; the copy is kept
+    # Returns:
+    #    N/A
+    def flush(self):
+        self.stream.flush()
+
+    # Function: getvalue
+    # Purpose:
+    #    Get everything written to the sink
+    # Returns:
+    #    The text written, or None if it was longer than the limit
+    def getvalue(self):
+        if self.partM is None:
+            return None
+        return "".join(self.partM)
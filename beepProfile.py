@@ -0,0 +1,178 @@
+#! /usr/bin/python
+
+# Filename: beepProfile.py by Geoffrey Sessums
+# Purpose:
+#     Provides the Profile class, which records where a BEEP program spends
+#     its time. execute calls the profile's observe method before every line
+#     it executes (see the observer parameter of execute), which records:
+#         - the number of times each line is executed and the time until the
+#           next line begins
+#         - the number of times each opcode and each operator is executed
+#         - the loops, found as jumps back to the same or an earlier line,
+#           and the number of times each one goes around
+#     Observed programs are interpreted without folding, so every line which
+#     executes is seen. The report lists the hottest lines and loops in
+#     tables, or as JSON.
+
+import json
+import time
+
+from beepCompile import opNameM, OP_ASSIGN, OP_IF, OP_INC
+
+# Number of lines and loops listed in the report by default
+defaultTop = 20
+
+# Class: Profile
+# Purpose:
+#    The profile of one run of a program.
+# Attributes:
+#    lineM - array of lines of BEEP source code
+#    countM - number of times each line was executed, indexed by line number
+#    timeM - nanoseconds spent in each line, indexed by line number
+#    opCountM - number of times each opcode was executed, indexed by opcode
+#    operatorD - dictionary of operators (keys) and the number of times they
+#                were evaluated (values)
+#    loopD - dictionary of (first line, last line) of loops (keys) and the
+#            number of times the jump back was taken (values)
+#    lastLine - line number of the line being executed, or 0
+#    last - time the line being executed began
+class Profile:
+    def __init__(self, lineM):
+        self.lineM = lineM
+        self.countM = [0] * (len(lineM) + 1)
+        self.timeM = [0] * (len(lineM) + 1)
+        self.opCountM = [0] * len(opNameM)
+        self.operatorD = {}
+        self.loopD = {}
+        self.lastLine = 0
+        self.last = 0
+
+    # Function: observe
+    # Purpose:
+    #    Record that a line is about to be executed
+    # Parameters:
+    #    instr - Instr of the line
+    #    regs - RegisterFile of the program
+    def observe(self, instr, regs):
+        now = time.perf_counter_ns()
+        line = instr.line
+        lastLine = self.lastLine
+        if lastLine:
+            self.timeM[lastLine] += now - self.last
+            if line <= lastLine:
+                key = (line, lastLine)
+                self.loopD[key] = self.loopD.get(key, 0) + 1
+        self.countM[line] += 1
+        op = instr.op
+        self.opCountM[op] += 1
+        operator = None
+        if op == OP_ASSIGN:
+            operator = instr.args[1][0]
+        elif op == OP_IF:
+            operator = instr.args[0][0]
+        elif op == OP_INC:
+            operator = '+' if instr.args[2] >= 0 else '-'
+        if operator is not None:
+            self.operatorD[operator] = self.operatorD.get(operator, 0) + 1
+        self.lastLine = line
+        self.last = now
+
+    # Function: finish
+    # Purpose:
+    #    Record the time of the last line once execution ends
+    def finish(self):
+        if self.lastLine:
+            self.timeM[self.lastLine] += time.perf_counter_ns() - self.last
+            self.lastLine = 0
+
+    # Function: hotLines
+    # Purpose:
+    #    Find the lines which took the most time
+    # Parameters:
+    #    top - number of lines
+    # Returns:
+    #    List of (line number, count, nanoseconds), the most time first
+    def hotLines(self, top=defaultTop):
+        lineM = [(line, self.countM[line], self.timeM[line])
+                 for line in range(1, len(self.countM)) if self.countM[line]]
+        lineM.sort(key=lambda entry: (-entry[2], entry[0]))
+        return lineM[:top]
+
+    # Function: hotLoops
+    # Purpose:
+    #    Find the loops which took the most time
+    # Parameters:
+    #    top - number of loops
+    # Returns:
+    #    List of (first line, last line, iterations, lines executed,
+    #    nanoseconds), the most time first
+    def hotLoops(self, top=defaultTop):
+        loopM = []
+        for (first, last), iterations in self.loopD.items():
+            loopM.append((first, last, iterations, sum(self.countM[first:last + 1]),
+                          sum(self.timeM[first:last + 1])))
+        loopM.sort(key=lambda entry: (-entry[4], entry[0]))
+        return loopM[:top]
+
+    # Function: toDict
+    # Purpose:
+    #    Get the profile as a dictionary which can be written as JSON
+    # Parameters:
+    #    top - number of lines and loops listed
+    # Returns:
+    #    Dictionary of the profile
+    def toDict(self, top=defaultTop):
+        return {
+            "lines": sum(self.countM),
+            "seconds": sum(self.timeM) / 1e9,
+            "hotLines": [{"line": line, "count": count, "seconds": ns / 1e9,
+                          "source": self.lineM[line - 1]}
+                         for line, count, ns in self.hotLines(top)],
+            "hotLoops": [{"first": first, "last": last, "iterations": iterations,
+                          "lines": lines, "seconds": ns / 1e9}
+                         for first, last, iterations, lines, ns in self.hotLoops(top)],
+            "opcodes": {opNameM[op]: count for op, count in enumerate(self.opCountM) if count},
+            "operators": {("none" if operator is None else operator): count
+                          for operator, count in self.operatorD.items()},
+        }
+
+    # Function: writeJson
+    # Purpose:
+    #    Write the profile as JSON
+    # Parameters:
+    #    file - file object the JSON is written to
+    #    top - number of lines and loops listed
+    def writeJson(self, file, top=defaultTop):
+        json.dump(self.toDict(top), file, indent=2)
+        file.write("\n")
+
+    # Function: printReport
+    # Purpose:
+    #    Print the hottest lines and loops and the instruction mix in tables
+    # Parameters:
+    #    out - output sink (see beepOutput.py) or file object
+    #    top - number of lines and loops listed
+    def printReport(self, out, top=defaultTop):
+        total = sum(self.timeM) or 1
+        print("Profile: %d lines executed in %.6f seconds" % (sum(self.countM), total / 1e9),
+              file=out)
+        print("Hot lines:", file=out)
+        print("    %6s %10s %12s %6s  %s" % ("Line", "Count", "Seconds", "Time", "Statement"),
+              file=out)
+        for line, count, ns in self.hotLines(top):
+            print("    %6d %10d %12.6f %5.1f%%  %s" % (line, count, ns / 1e9, 100.0 * ns / total,
+                                                     self.lineM[line - 1].strip()), file=out)
+        print("Hot loops:", file=out)
+        print("    %13s %10s %10s %12s %6s" % ("Lines", "Iterations", "Executed", "Seconds", "Time"),
+              file=out)
+        for first, last, iterations, lines, ns in self.hotLoops(top):
+            print("    %13s %10d %10d %12.6f %5.1f%%" % ("%d-%d" % (first, last), iterations,
+                                                       lines, ns / 1e9, 100.0 * ns / total),
+                  file=out)
+        print("Opcodes:", file=out)
+        for op, count in sorted(enumerate(self.opCountM), key=lambda entry: -entry[1]):
+            if count:
+                print("    %-12s %d" % (opNameM[op], count), file=out)
+        print("Operators:", file=out)
+        for operator, count in sorted(self.operatorD.items(), key=lambda entry: -entry[1]):
+            print("    %-12s %d" % ("none" if operator is None else operator, count), file=out)
@@ -0,0 +1,80 @@
+#! /usr/bin/python
+
+# Filename: beepRegs.py by Geoffrey Sessums
+# Purpose:
+#     Provides the RegisterFile class which holds the values of BEEP variables
+#     while a program executes. Every variable is given a fixed slot index when
+#     the program is compiled, so reading or assigning a variable is a list
+#     index instead of a dictionary lookup.
+
+# Class: RegisterFile
+# Purpose:
+#    Slot indexed storage for BEEP variables. A slot whose value is None has
+#    not been assigned a value. A slot whose type is None belongs to a name
+#    which is referenced by the program but was never declared with VAR.
+# Attributes:
+#    nameM - list of variable names indexed by slot
+#    typeM - list of variable types indexed by slot
+#    values - list of variable values indexed by slot
+#    slotD - dictionary containing variable names (keys) and slots (values)
+class RegisterFile:
+    __slots__ = ("nameM", "typeM", "values", "slotD")
+
+    # Function: __init__
+    # Purpose:
+    #    Give each declared variable a slot and load its initial value
+    # Parameters:
+    #    varTypeD - dictionary containing variable names (keys) and types (values)
+    #    varValueD - dictionary containing variable names (keys) and values (values)
+    def __init__(self, varTypeD, varValueD):
+        self.nameM = []
+        self.typeM = []
+        self.values = []
+        self.slotD = {}
+        for name in varTypeD:
+            slot = self.slot(name)
+            self.typeM[slot] = varTypeD[name]
+            self.values[slot] = varValueD.get(name)
+
+    # Function: slot
+    # Purpose:
+    #    Find the slot of a variable, adding an undeclared slot for a name
+    #    which has not been seen before
+    # Parameters:
+    #    name - variable name
+    # Returns:
+    #    Slot index of the variable
+    def slot(self, name):
+        slot = self.slotD.get(name)
+        if slot is None:
+            slot = len(self.nameM)
+            self.slotD[name] = slot
+            self.nameM.append(name)
+            self.typeM.append(None)
+            self.values.append(None)
+        return slot
+
+    # Function: isDeclared
+    # Purpose:
+    #    Check if the variable in a slot was declared with VAR
+    # Parameters:
+    #    slot - slot index
+    # Returns:
+    #    True if the variable was declared
+    def isDeclared(self, slot):
+        return self.typeM[slot] is not None
+
+    # Function: toDict
+    # Purpose:
+    #    Copy the values of the variables which have a value into a dictionary
+    # Parameters:
+    #    varValueD - dictionary to update, or None to create a new one
+    # Returns:
+    #    Dictionary containing variable names (keys) and values (values)
+    def toDict(self, varValueD=None):
+        if varValueD is None:
+            varValueD = {}
+        for slot, value in enumerate(self.values):
+            if value is not None:
+                varValueD[self.nameM[slot]] = value
+        return varValueD
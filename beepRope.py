@@ -0,0 +1,278 @@
+#! /usr/bin/python
+
+# Filename: beepRope.py by Geoffrey Sessums
+# Purpose:
+#     Provides the Rope class, a lazy representation of long BEEP strings, and
+#     the StringHeap class, which accounts for the characters held by the
+#     variables of a program and enforces a limit on them.
+#     "ASSIGN s & s "x"" in a loop would copy the whole string on every trip
+#     and "* "ab" 1000000" would build a huge string even if it is only
+#     printed once. A Rope records the concatenation or replication instead,
+#     and only builds the flat string when it is printed or converted to an
+#     int. A string longer than sys.maxsize raises OverflowError where it is
+#     made, as the str it stands for would.
+
+import sys
+
+from beepErrors import MemoryLimitExceeded
+
+# Results shorter than this are built as plain strings
+minRopeLength = 256
+
+# Pieces shorter than this are merged when one is appended to a Rope, so that
+# appending one character at a time does not build one node per character
+chunkLength = 256
+
+# Ropes longer than this are not built by flatValue
+maxFlatLength = 1 << 30
+
+# Class: Rope
+# Purpose:
+#    An immutable string which has not been built yet. A concatenation has a
+#    left and a right piece; a replication has a left piece, no right piece,
+#    and a count. Pieces are strs or Ropes. Once built, the string is kept in
+#    flat and the pieces are released.
+# Attributes:
+#    left - first piece, or the piece which is replicated
+#    right - second piece, or None for a replication
+#    count - number of times left is replicated
+#    length - length of the string
+#    flat - the built string, or None
+class Rope:
+    __slots__ = ("left", "right", "count", "length", "flat")
+
+    def __init__(self, left, right, count, length):
+        self.left = left
+        self.right = right
+        self.count = count
+        self.length = length
+        self.flat = None
+
+    # concat and replicate keep lengths within sys.maxsize, but the functions
+    # below use textLength, which never raises
+    def __len__(self):
+        return self.length
+
+    # Function: __str__
+    # Purpose:
+    #    Build the string. Concatenations are walked with a stack rather than
+    #    by recursion since a string built in a loop is a very deep rope.
+    # Returns:
+    #    The string
+    def __str__(self):
+        if self.flat is None:
+            partM = []
+            stackM = [self]
+            while stackM:
+                node = stackM.pop()
+                if type(node) is str:
+                    partM.append(node)
+                elif node.flat is not None:
+                    partM.append(node.flat)
+                elif node.right is None:
+                    partM.append(str(node.left) * node.count)
+                else:
+                    stackM.append(node.right)
+                    stackM.append(node.left)
+            self.flat = "".join(partM)
+            self.left = None
+            self.right = None
+        return self.flat
+
+    def __int__(self):
+        return int(str(self))
+
+    # Strings of different lengths differ without being built
+    def __eq__(self, other):
+        if type(other) is str or type(other) is Rope:
+            return textLength(self) == textLength(other) and str(self) == str(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        if type(other) is str or type(other) is Rope:
+            return textLength(self) != textLength(other) or str(self) != str(other)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def __repr__(self):
+        return "Rope(%d)" % (self.length)
+
+# Function: toText
+# Purpose:
+#    Convert an operand to a str or Rope without building a Rope
+# Parameters:
+#    op - operand
+# Returns:
+#    op itself if it is a str or Rope, otherwise str(op)
+def toText(op):
+    if type(op) is str or type(op) is Rope:
+        return op
+    return str(op)
+
+# Function: textLength
+# Purpose:
+#    Get the length of a string as a Python int of any size
+# Parameters:
+#    text - str or Rope
+# Returns:
+#    Number of characters in text
+def textLength(text):
+    if type(text) is Rope:
+        return text.length
+    return len(text)
+
+# Function: textPrefix
+# Purpose:
+#    Get the start of a string without building a Rope
+# Parameters:
+#    text - str or Rope
+#    length - most characters to get
+# Returns:
+#    str of the first length characters of text, or all of it if it is
+#    shorter
+def textPrefix(text, length):
+    partM = []
+    stackM = [text]
+    while stackM and length > 0:
+        node = stackM.pop()
+        if type(node) is str:
+            part = node[:length]
+        elif node.flat is not None:
+            part = node.flat[:length]
+        else:
+            if node.right is None:
+                # Only the copies which reach length are needed
+                if textLength(node.left) > 0:
+                    stackM.extend([node.left] * min(node.count, length))
+            else:
+                stackM.append(node.right)
+                stackM.append(node.left)
+            continue
+        partM.append(part)
+        length = length - len(part)
+    return "".join(partM)
+
+# Function: concat
+# Purpose:
+#    Concatenate two strings
+# Parameters:
+#    str1 - first str or Rope
+#    str2 - second str or Rope
+# Returns:
+#    A str if the result is short, otherwise a Rope
+# Raises:
+#    OverflowError if the result would be longer than sys.maxsize
+def concat(str1, str2):
+    length = textLength(str1) + textLength(str2)
+    if length > sys.maxsize:
+        raise OverflowError("strings are too large to concat")
+    if length < minRopeLength:
+        return str(str1) + str(str2)
+    # Merge a short piece into the short last piece of a Rope
+    if type(str1) is Rope and str1.flat is None and type(str2) is str and \
+            type(str1.right) is str and len(str1.right) + len(str2) < chunkLength:
+        return Rope(str1.left, str1.right + str2, 1, length)
+    return Rope(str1, str2, 1, length)
+
+# Function: replicate
+# Purpose:
+#    Replicate a string
+# Parameters:
+#    str1 - str or Rope
+#    count - number of times to replicate it
+# Returns:
+#    A str if the result is short, otherwise a Rope
+# Raises:
+#    OverflowError, as str * int would, if count does not fit in an index or
+#    the result would be longer than sys.maxsize
+def replicate(str1, count):
+    if count > sys.maxsize or count < -sys.maxsize - 1:
+        raise OverflowError("cannot fit 'int' into an index-sized integer")
+    length = textLength(str1) * max(count, 0)
+    if length > sys.maxsize:
+        raise OverflowError("repeated string is too long")
+    if length < minRopeLength:
+        return str(str1) * count
+    return Rope(str1, None, count, length)
+
+# Function: flatValue
+# Purpose:
+#    Get a value as it is given to the callers of the interpreter: a Rope is
+#    built into its string, unless it is longer than maxFlatLength or there
+#    is not enough memory to build it
+# Parameters:
+#    value - value of a variable
+# Returns:
+#    The value, with a Rope replaced by its string
+def flatValue(value):
+    if type(value) is Rope and value.length <= maxFlatLength:
+        try:
+            return str(value)
+        except MemoryError:
+            return value
+    return value
+
+# Class: StringHeap
+# Purpose:
+#    Accounts for the characters of the strings held by the variables of a
+#    program.
+# Attributes:
+#    limit - most characters the variables may hold
+#    used - characters the variables hold
+#    lengthD - dictionary containing slots (keys) and the length of the
+#              string held in the slot (values)
+class StringHeap:
+    __slots__ = ("limit", "used", "lengthD")
+
+    # Function: __init__
+    # Purpose:
+    #    Create a heap holding the initial values of the variables
+    # Parameters:
+    #    limit - most characters the variables may hold
+    #    values - list of variable values indexed by slot
+    def __init__(self, limit, values):
+        self.limit = limit
+        self.used = 0
+        self.lengthD = {}
+        for slot, value in enumerate(values):
+            self.fits(slot, value)
+
+    # Function: fits
+    # Purpose:
+    #    Account for a value stored in a slot, if it fits within the limit
+    # Parameters:
+    #    slot - slot index
+    #    value - value stored in the slot
+    # Returns:
+    #    True if the value fits and was accounted for
+    #    False if it would exceed the limit, in which case nothing changes
+    def fits(self, slot, value):
+        length = 0
+        if type(value) is str or type(value) is Rope:
+            length = textLength(value)
+        used = self.used + length - self.lengthD.get(slot, 0)
+        if used > self.limit:
+            return False
+        self.used = used
+        self.lengthD[slot] = length
+        return True
+
+    # Function: store
+    # Purpose:
+    #    Account for a value stored in a slot
+    # Parameters:
+    #    slot - slot index
+    #    value - value stored in the slot
+    # Returns:
+    #    value
+    # Raises:
+    #    MemoryLimitExceeded if the value does not fit within the limit
+    def store(self, slot, value):
+        if not self.fits(slot, value):
+            raise MemoryLimitExceeded("strings would use %d characters, more than the limit of %d"
+                                      % (self.used + textLength(value) -
+                                         self.lengthD.get(slot, 0),
+                                         self.limit))
+        return value
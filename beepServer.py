@@ -0,0 +1,601 @@
+#! /usr/bin/python
+
+# Filename: beepServer.py by Geoffrey Sessums
+# Purpose:
+#     Runs BEEP programs for beepClient.py. Starting python3 beepDriver.py
+#     for every program means starting Python, importing the interpreter and
+#     loading the program each time, which takes far longer than running a
+#     short program. The server instead keeps a pool of worker processes
+#     which have imported the interpreter and run a small program with each
+#     backend once, and listens on a Unix socket or a TCP port of this host
+#     (never on another interface) for requests (see Protocol in
+#     beepClient.py):
+#         - each request is run by the first idle worker, with the flags of
+#           beepDriver.py, and its output is streamed back as it is flushed
+#           followed by a structured result
+#         - requests wait for a worker in the order they arrive; once
+#           maxQueued requests are waiting, further requests are refused
+#           with a failure until a worker is free, so a flood of requests
+#           cannot grow the queue without limit
+#         - the output is only sent as fast as the client reads it; if the
+#           client goes away, its worker is stopped and replaced
+#         - a worker which dies is replaced, and its request fails
+#         - a worker keeps the results of the requests with -C in memory as
+#           well as in their directory (see beepMemo.py), so that it answers
+#           a request it has run before without running it again
+#     Only the user who started the server may use it: a Unix socket can
+#     only be opened by that user, and a server on a TCP port, which any
+#     user of the host can reach, writes a random token to a file only that
+#     user can read (see tokenFileName in beepClient.py) and refuses
+#     requests without it. Every file a request names (the program and the
+#     files of -S, -R and -C) must be inside rootDir.
+# Usage:
+#     python3 beepServer.py [address] [-j workers] [-Q maxQueued] [-r rootDir]
+#         address - port number to listen on at 127.0.0.1, or path of a Unix
+#                   socket (defaultAddress in beepClient.py by default)
+#         -j workers - number of worker processes (the number of CPUs by
+#                      default)
+#         -Q maxQueued - most requests waiting for a worker (64 by default)
+#         -r rootDir - directory the files of the requests must be in (the
+#                      current directory by default)
+#         Example: python3 beepServer.py 7777 -j 4 -r ~/beep
+#     The server runs until it is interrupted or sent SIGTERM.
+
+import asyncio
+import concurrent.futures
+import hmac
+import io
+import json
+import multiprocessing
+import os
+import secrets
+import signal
+import sys
+import time
+
+from beepClient import defaultAddress, connect, tokenFileName
+from beepDriver import parseFlags
+from beepInterp import Program, Interpreter
+from beepOutput import OutputSink, MemorySink
+from beepCache import loadProgram
+from beepLoader import loadMapped
+from beepCheck import printProblems
+from beepCheckpoint import Checkpointer, readSnapshot
+from beepMemo import sharedCache
+
+# Most requests waiting for a worker by default
+defaultMaxQueued = 64
+
+# Characters of output a worker collects before sending them to the server
+streamFlushSize = 4096
+
+# Longest request line, which holds the source code of a program sent as text
+maxRequestSize = 1 << 26
+
+# Program run once with each backend by a new worker
+warmSource = ('VAR INT i 0\nVAR STRING s "x"\n'
+              'LOOP: ASSIGN i + i 1\nASSIGN s & s "y"\nIF > 3 i LOOP\nPRINT i s\n')
+
+# Class: PipeStream
+# Purpose:
+#    A stream which sends the text written to it from a worker to the server
+#    (see OutputSink in beepOutput.py, which collects the text first).
+# Attributes:
+#    conn - multiprocessing Connection to the server
+class PipeStream:
+    def __init__(self, conn):
+        self.conn = conn
+
+    # Function: write
+    # Purpose:
+    #    Send text to the server
+    # Parameters:
+    #    text - text to send
+    # Returns:
+    #    Number of characters sent
+    def write(self, text):
+        self.conn.send(("output", text))
+        return len(text)
+
+    # Function: flush
+    # Purpose:
+    #    Nothing is kept, so there is nothing to flush
+    # Returns:
+    #    N/A
+    def flush(self):
+        pass
+
+# Function: jsonValue
+# Purpose:
+#    Convert the value of a variable into a value JSON can hold
+# Parameters:
+#    value - value of a variable, or None
+# Returns:
+#    The int, None, or the value as a string
+def jsonValue(value):
+    if value is None or isinstance(value, int):
+        return value
+    return str(value)
+
+# Function: confinePath
+# Purpose:
+#    Find the file a request names, which must be inside rootDir
+# Parameters:
+#    name - file name given by the request
+#    requestD - request (see Protocol in beepClient.py)
+#    rootDir - real path of the directory the file must be in
+# Returns:
+#    Real path of the file
+# Raises:
+#    PermissionError if the file is outside rootDir
+def confinePath(name, requestD, rootDir):
+    cwd = requestD.get("cwd")
+    if not isinstance(cwd, str):
+        cwd = rootDir
+    path = os.path.realpath(os.path.join(cwd, name))
+    if os.path.commonpath([path, rootDir]) != rootDir:
+        raise PermissionError("%s is outside %s" % (name, rootDir))
+    return path
+
+# Function: runRequest
+# Purpose:
+#    Run the program of a request as beepDriver.py would, sending its output
+#    to the server. This runs in a worker process.
+# Parameters:
+#    requestD - request (see Protocol in beepClient.py)
+#    settingD - settings parsed from the flags of the request (see
+#               parseFlags in beepDriver.py)
+#    conn - multiprocessing Connection to the server
+#    rootDir - real path of the directory the files of the request must be in
+# Returns:
+#    Dictionary of the result
+# Raises:
+#    PermissionError if a file of the request is outside rootDir
+def runRequest(requestD, settingD, conn, rootDir):
+    start = time.perf_counter()
+    for key in ("snapshotFile", "resumeFile", "resultCacheDir"):
+        if settingD[key] is not None:
+            settingD[key] = confinePath(settingD[key], requestD, rootDir)
+    mapped = False
+    if "source" in requestD:
+        program = Program.fromString(requestD["source"], requestD.get("name", "<string>"))
+    else:
+        path = confinePath(requestD["path"], requestD, rootDir)
+        if settingD["mapped"] and not settingD["checkOnly"]:
+            # A mapped program is only decoded as it runs, so it cannot be
+            # checked
+            mapped = True
+            program = loadMapped(path)
+        elif settingD["useCache"]:
+            program = loadProgram(path)
+        else:
+            program = Program.fromFile(path)
+        # The listing names the file as the client was given it
+        program.name = requestD["path"]
+
+    out = OutputSink(PipeStream(conn), streamFlushSize)
+    resultD = {"status": 0, "lines": 0, "error": None, "errorLine": None}
+    try:
+        if settingD["checkOnly"]:
+            problemM = program.check()
+            printProblems(problemM, out)
+            resultD["status"] = 0 if problemM == [] else 1
+            resultD["problems"] = problemM
+        else:
+            full = settingD["full"]
+            profileJson = requestD.get("profileJson", False)
+            # A worker is not signalled, so snapshots are only saved
+            # periodically and when a limit stops the program
+            checkpointer = None
+            if settingD["snapshotFile"] is not None:
+                checkpointer = Checkpointer(settingD["snapshotFile"], settingD["everyLines"],
+                                            settingD["everySeconds"])
+            snapshot = None
+            if settingD["resumeFile"] is not None:
+                snapshot = readSnapshot(settingD["resumeFile"])
+            cache = None
+            if settingD["resultCacheDir"] is not None:
+                cache = sharedCache(settingD["resultCacheDir"])
+            interpreter = Interpreter(out, listing=full, tables=full,
+                                      verbose=settingD["verbose"],
+                                      profile=settingD["report"] or profileJson,
+                                      traceSize=settingD["traceSize"], cache=cache,
+                                      **settingD["optionD"])
+            result = interpreter.run(program, checkpointer=checkpointer, snapshot=snapshot)
+            if settingD["report"]:
+                result.profile.printReport(out)
+            resultD["lines"] = result.lines
+            resultD["error"] = result.error
+            resultD["errorLine"] = result.errorLine
+            if cache is not None:
+                resultD["cached"] = result.cached
+            if profileJson:
+                file = io.StringIO()
+                result.profile.writeJson(file)
+                resultD["profile"] = file.getvalue()
+            if requestD.get("variables", False):
+                resultD["variables"] = {name: jsonValue(value)
+                                        for name, value in result.variables.items()}
+    finally:
+        out.close()
+        if mapped:
+            program.close()
+    resultD["seconds"] = time.perf_counter() - start
+    return resultD
+
+# Function: warmUp
+# Purpose:
+#    Run a small program with each backend so that the first request a
+#    worker runs does not pay for anything done once
+# Returns:
+#    N/A
+def warmUp():
+    program = Program.fromString(warmSource)
+    for backend in ("interp", "python", "jit"):
+        Interpreter(MemorySink(), listing=True, tables=True, backend=backend).run(program)
+
+# Function: workerMain
+# Purpose:
+#    Run requests sent by the server until it sends None. This is the main
+#    function of a worker process.
+# Parameters:
+#    conn - multiprocessing Connection to the server
+#    rootDir - real path of the directory the files of the requests must be
+#              in
+# Returns:
+#    N/A
+def workerMain(conn, rootDir):
+    # The server stops the workers itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    warmUp()
+    conn.send(("ready", None))
+    while True:
+        try:
+            requestD = conn.recv()
+        except EOFError:
+            break
+        if requestD is None:
+            break
+        try:
+            settingD = parseFlags(requestD.get("flags", []), localFiles=False)
+        except ValueError as e:
+            conn.send(("failure", str(e)))
+            continue
+        try:
+            resultD = runRequest(requestD, settingD, conn, rootDir)
+        except Exception as e:
+            conn.send(("failure", "%s: %s" % (type(e).__name__, e)))
+            continue
+        conn.send(("result", resultD))
+
+# Class: Worker
+# Purpose:
+#    A worker process as seen by the server.
+# Attributes:
+#    process - multiprocessing Process
+#    conn - multiprocessing Connection to the process
+class Worker:
+    __slots__ = ("process", "conn")
+
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+
+# Class: WorkerPool
+# Purpose:
+#    The worker processes of the server and the requests waiting for them.
+# Attributes:
+#    size - number of workers
+#    rootDir - real path of the directory the files of the requests must be
+#              in
+#    context - multiprocessing context the workers are started with
+#    workerM - list of every Worker
+#    idleQ - asyncio.Queue of the idle Workers
+#    executor - ThreadPoolExecutor whose threads wait for the answers of the
+#               workers
+#    busy - number of workers running a request
+#    waiting - number of requests waiting for a worker
+#    taskS - set of the asyncio.Tasks replacing workers
+class WorkerPool:
+    # Function: __init__
+    # Purpose:
+    #    Start the workers and wait until each has warmed up
+    # Parameters:
+    #    size - number of workers
+    #    rootDir - see above
+    def __init__(self, size, rootDir):
+        self.size = size
+        self.rootDir = rootDir
+        # Workers started while the server's threads run must not be forked
+        self.context = multiprocessing.get_context("spawn")
+        self.workerM = [self.startWorker() for i in range(size)]
+        self.idleQ = asyncio.Queue()
+        for worker in self.workerM:
+            worker.conn.recv()
+            self.idleQ.put_nowait(worker)
+        self.executor = concurrent.futures.ThreadPoolExecutor(size)
+        self.busy = 0
+        self.waiting = 0
+        self.taskS = set()
+
+    # Function: startWorker
+    # Purpose:
+    #    Start a worker process
+    # Returns:
+    #    Worker
+    def startWorker(self):
+        conn, childConn = self.context.Pipe()
+        process = self.context.Process(target=workerMain, args=(childConn, self.rootDir),
+                                       daemon=True)
+        process.start()
+        childConn.close()
+        return Worker(process, conn)
+
+    # Function: replaceWorker
+    # Purpose:
+    #    Stop a worker and start another in its place
+    # Parameters:
+    #    worker - Worker to replace
+    # Returns:
+    #    N/A
+    async def replaceWorker(self, worker):
+        worker.process.kill()
+        worker.conn.close()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, worker.process.join)
+        newWorker = await loop.run_in_executor(self.executor, self.startWorker)
+        await loop.run_in_executor(self.executor, newWorker.conn.recv)
+        self.workerM[self.workerM.index(worker)] = newWorker
+        self.idleQ.put_nowait(newWorker)
+
+    # Function: run
+    # Purpose:
+    #    Run a request on the first idle worker
+    # Parameters:
+    #    requestD - request (see Protocol in beepClient.py)
+    #    emit - coroutine function called with each piece of output
+    # Returns:
+    #    ("result", dictionary of the result), or ("failure", message)
+    async def run(self, requestD, emit):
+        loop = asyncio.get_running_loop()
+        self.waiting = self.waiting + 1
+        try:
+            worker = await self.idleQ.get()
+        finally:
+            self.waiting = self.waiting - 1
+        self.busy = self.busy + 1
+        done = False
+        try:
+            worker.conn.send(requestD)
+            while True:
+                kind, value = await loop.run_in_executor(self.executor, worker.conn.recv)
+                if kind != "output":
+                    done = True
+                    return kind, value
+                await emit(value)
+        except (EOFError, OSError):
+            return "failure", "worker stopped with exit code %s" % (worker.process.exitcode)
+        finally:
+            self.busy = self.busy - 1
+            if done:
+                self.idleQ.put_nowait(worker)
+            else:
+                # The worker died, or is still running a program whose client
+                # has gone
+                task = loop.create_task(self.replaceWorker(worker))
+                self.taskS.add(task)
+                task.add_done_callback(self.taskS.discard)
+
+    # Function: close
+    # Purpose:
+    #    Stop every worker
+    # Returns:
+    #    N/A
+    def close(self):
+        for worker in self.workerM:
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+        for worker in self.workerM:
+            worker.process.join(1)
+            if worker.process.is_alive():
+                worker.process.kill()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+# Class: Server
+# Purpose:
+#    Accepts the connections of clients and runs their requests.
+# Attributes:
+#    pool - WorkerPool
+#    maxQueued - most requests waiting for a worker
+#    completed - number of requests which were run
+#    refused - number of requests refused because too many were waiting
+#    cacheHits - number of requests answered from a result cache
+#    cacheMisses - number of requests with a result cache which were run
+#    start - time the server started
+#    token - token every request must carry, or None
+class Server:
+    # Function: __init__
+    # Parameters:
+    #    pool - WorkerPool
+    #    maxQueued - most requests waiting for a worker
+    #    token - token every request must carry, or None
+    def __init__(self, pool, maxQueued=defaultMaxQueued, token=None):
+        self.pool = pool
+        self.maxQueued = maxQueued
+        self.token = token
+        self.completed = 0
+        self.refused = 0
+        self.cacheHits = 0
+        self.cacheMisses = 0
+        self.start = time.monotonic()
+
+    # Function: stats
+    # Purpose:
+    #    Describe the state of the server
+    # Returns:
+    #    Dictionary of the statistics
+    def stats(self):
+        return {"workers": self.pool.size, "busy": self.pool.busy,
+                "waiting": self.pool.waiting, "completed": self.completed,
+                "refused": self.refused, "cacheHits": self.cacheHits,
+                "cacheMisses": self.cacheMisses, "seconds": time.monotonic() - self.start}
+
+    # Function: handle
+    # Purpose:
+    #    Run the requests of a client until it closes the connection
+    # Parameters:
+    #    reader, writer - asyncio streams of the connection
+    # Returns:
+    #    N/A
+    async def handle(self, reader, writer):
+
+        # Function: send
+        # Purpose:
+        #    Send an answer to the client once it has read the earlier ones
+        async def send(answerD):
+            writer.write(json.dumps(answerD).encode("utf-8") + b"\n")
+            await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    requestD = json.loads(line)
+                    if not isinstance(requestD, dict):
+                        raise ValueError("a request must be an object")
+                    ident = requestD.get("id")
+                    if not requestD.get("stats") and not (
+                            isinstance(requestD.get("path"), str) or
+                            isinstance(requestD.get("source"), str)):
+                        raise ValueError("a request needs a path or source")
+                except ValueError as e:
+                    await send({"id": None, "failure": "bad request: %s" % (e)})
+                    continue
+                if self.token is not None:
+                    token = requestD.get("token")
+                    if not isinstance(token, str) or \
+                            not hmac.compare_digest(token.encode(), self.token.encode()):
+                        # Whoever sent it may not use the server at all
+                        await send({"id": ident, "failure": "bad request: wrong token"})
+                        break
+                if requestD.get("stats"):
+                    await send({"id": ident, "stats": self.stats()})
+                    continue
+                if self.pool.busy == self.pool.size and self.pool.waiting >= self.maxQueued:
+                    self.refused = self.refused + 1
+                    await send({"id": ident, "failure": "server busy: %d requests waiting"
+                                % (self.pool.waiting)})
+                    continue
+
+                # Function: emit
+                # Purpose:
+                #    Send a piece of the program's output
+                async def emit(text, ident=ident):
+                    await send({"id": ident, "output": text})
+
+                kind, value = await self.pool.run(requestD, emit)
+                self.completed = self.completed + 1
+                if kind == "result" and "cached" in value:
+                    if value["cached"]:
+                        self.cacheHits = self.cacheHits + 1
+                    else:
+                        self.cacheMisses = self.cacheMisses + 1
+                await send({"id": ident, kind: value})
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+
+# Function: serve
+# Purpose:
+#    Listen for clients until the server is interrupted or sent SIGTERM
+# Parameters:
+#    server - Server
+#    address - port number on 127.0.0.1, or path of a Unix socket
+# Returns:
+#    N/A
+async def serve(server, address):
+    if address.isdecimal():
+        listener = await asyncio.start_server(server.handle, "127.0.0.1", int(address),
+                                              limit=maxRequestSize)
+    else:
+        listener = await asyncio.start_unix_server(server.handle, address,
+                                                   limit=maxRequestSize)
+        os.chmod(address, 0o600)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signalNum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signalNum, stop.set)
+    print("beepServer listening on %s with %d workers" % (address, server.pool.size),
+          flush=True)
+    async with listener:
+        await stop.wait()
+
+# Function: main
+# Purpose:
+#    Parse the command arguments, start the workers and serve clients
+# Parameters:
+#    argM - command arguments, starting with the name of this program
+# Returns:
+#    Exit status
+def main(argM):
+    address = None
+    workers = os.cpu_count() or 1
+    maxQueued = defaultMaxQueued
+    rootDir = os.getcwd()
+    flagM = argM[1:]
+    while flagM != []:
+        flag = flagM.pop(0)
+        if flag == "-j" and flagM != [] and flagM[0].isdecimal() and int(flagM[0]) > 0:
+            workers = int(flagM.pop(0))
+        elif flag == "-Q" and flagM != [] and flagM[0].isdecimal():
+            maxQueued = int(flagM.pop(0))
+        elif flag == "-r" and flagM != [] and os.path.isdir(flagM[0]):
+            rootDir = flagM.pop(0)
+        elif address is None and not flag.startswith("-"):
+            address = flag
+        else:
+            print("Unkown Flag: %s" % (flag))
+            return 1
+    if address is None:
+        address = defaultAddress()
+
+    # A socket left by a server which did not stop cleanly is removed, but
+    # not one a running server listens on
+    if not address.isdecimal() and os.path.exists(address):
+        try:
+            connect(address).close()
+        except OSError:
+            os.unlink(address)
+        else:
+            print("SERVER ERROR: a server is already running at %s" % (address))
+            return 1
+
+    # Any user of the host can reach a TCP port, so only the holders of the
+    # token, which is written where only this user can read it, are served
+    token = None
+    if address.isdecimal():
+        token = secrets.token_hex(32)
+        fd = os.open(tokenFileName(address), os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_NOFOLLOW,
+                     0o600)
+        os.fchmod(fd, 0o600)
+        with os.fdopen(fd, "w", encoding="ascii") as file:
+            file.write(token + "\n")
+
+    pool = WorkerPool(workers, os.path.realpath(rootDir))
+    try:
+        asyncio.run(serve(Server(pool, maxQueued, token), address))
+    finally:
+        pool.close()
+        if not address.isdecimal() and os.path.exists(address):
+            os.unlink(address)
+        if token is not None:
+            os.unlink(tokenFileName(address))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
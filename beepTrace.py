@@ -0,0 +1,162 @@
+#! /usr/bin/python
+
+# Filename: beepTrace.py by Geoffrey Sessums
+# Purpose:
+#     Provides the Trace class, which keeps the last lines executed by a BEEP
+#     program so that they can be printed after the program stops with an
+#     error or reaches a limit. It replaces re-running a failed program with
+#     -v: the trace is cheap enough to leave on, since each line executed
+#     only stores its instruction in a preallocated ring buffer, and the
+#     program still runs folded, on the fast path and with any backend (see
+#     the trace parameter of execute). The interpreter records a line with
+#     record before executing it and reads the value it assigns when the next
+#     line is recorded; the functions generated by the "python" and "jit"
+#     backends store the instruction and the value in the buffers
+#     themselves. The value of an IF is True if it jumped: record stores False
+#     and jumped marks it. Folded lines and the iterations skipped by counted
+#     loops (see beepLoops.py) are not recorded, but they are counted in the
+#     lines executed. A dump never builds a whole value: it prints the start
+#     of a long string and the number of digits of a long int.
+
+import math
+
+from beepCompile import opNameM, OP_ASSIGN, OP_IF, OP_INC
+from beepRope import Rope, textPrefix
+
+# Number of lines kept by default
+defaultTraceSize = 64
+
+# Longest text of a value printed in a dump
+maxValueLength = 40
+
+# Ints with more bits than this are printed as their number of digits, since
+# converting them to text is slow or raises ValueError
+maxIntBits = 4096
+
+# Class: Trace
+# Purpose:
+#    Ring buffer of the last lines executed.
+# Attributes:
+#    size - number of lines kept
+#    instrM - ring buffer of the Instr of the lines executed; its last entry
+#             is None until the buffer is full
+#    valueM - ring buffer of the values assigned by the lines, and for an IF
+#             True if it jumped
+#    pos - index in the buffers of the next line
+#    count - number of lines executed by the program
+#    regs - RegisterFile of the program
+class Trace:
+    def __init__(self, size=defaultTraceSize):
+        self.size = size
+        self.instrM = [None] * size
+        self.valueM = [None] * size
+        self.pos = 0
+        self.count = 0
+        self.regs = None
+
+    # Function: attach
+    # Purpose:
+    #    Start recording the lines of a program
+    # Parameters:
+    #    regs - RegisterFile of the program
+    def attach(self, regs):
+        self.regs = regs
+
+    # Function: record
+    # Purpose:
+    #    Record that a line is about to be executed
+    # Parameters:
+    #    instr - Instr of the line
+    #    values - list of variable values indexed by slot
+    def record(self, instr, values):
+        pos = self.pos
+        # pos - 1 is the last entry of the buffer when pos is 0
+        prev = self.instrM[pos - 1]
+        if prev is not None and (prev.op == OP_ASSIGN or prev.op == OP_INC):
+            self.valueM[pos - 1] = values[prev.args[0]]
+        self.instrM[pos] = instr
+        if instr.op == OP_IF:
+            self.valueM[pos] = False
+        pos = pos + 1
+        if pos == self.size:
+            pos = 0
+        self.pos = pos
+
+    # Function: jumped
+    # Purpose:
+    #    Record that the IF recorded last jumped
+    def jumped(self):
+        self.valueM[self.pos - 1] = True
+
+    # Function: settle
+    # Purpose:
+    #    Read the value assigned by the last line recorded, before generated
+    #    code records lines without reading it
+    # Parameters:
+    #    values - list of variable values indexed by slot
+    def settle(self, values):
+        prev = self.instrM[self.pos - 1]
+        if prev is not None and (prev.op == OP_ASSIGN or prev.op == OP_INC):
+            self.valueM[self.pos - 1] = values[prev.args[0]]
+
+    # Function: events
+    # Purpose:
+    #    Get the lines in the buffer
+    # Parameters:
+    #    errorLine - line number of the line which raised an error, or None
+    # Returns:
+    #    List of (line, opcode name, variable, value) from the oldest line to
+    #    the newest; variable and value are "" when the line assigns nothing
+    def events(self, errorLine=None):
+        kept = self.size if self.instrM[-1] is not None else self.pos
+        start = (self.pos - kept) % self.size
+        instrM = [self.instrM[(start + i) % self.size] for i in range(kept)]
+        valueM = [self.valueM[(start + i) % self.size] for i in range(kept)]
+        eventM = []
+        for i, instr in enumerate(instrM):
+            name = ""
+            text = ""
+            last = i == len(instrM) - 1
+            if last and instr.line == errorLine:
+                text = "(error)"
+            elif instr.op == OP_ASSIGN or instr.op == OP_INC:
+                name = self.regs.nameM[instr.args[0]]
+                # The newest line finished, so its value is the current one
+                value = self.regs.values[instr.args[0]] if last else valueM[i]
+                text = valueText(value)
+            elif instr.op == OP_IF:
+                text = "jump" if valueM[i] else "no jump"
+            eventM.append((instr.line, opNameM[instr.op], name, text))
+        return eventM
+
+    # Function: dump
+    # Purpose:
+    #    Print the lines in the buffer
+    # Parameters:
+    #    out - output sink (see beepOutput.py) or file object
+    #    errorLine - line number of the line which raised an error, or None
+    def dump(self, out, errorLine=None):
+        eventM = self.events(errorLine)
+        print("***Trace of the last %d lines recorded of %d lines executed (folded lines are not"
+              " recorded):" % (len(eventM), self.count), file=out)
+        print("    %6s %-7s %-12s %s" % ("Line", "Opcode", "Variable", "Value"), file=out)
+        for line, opName, name, text in eventM:
+            print("    %6d %-7s %-12s %s" % (line, opName, name, text), file=out)
+
+# Function: valueText
+# Purpose:
+#    Get the text of a value printed in a dump, without building all of it
+# Parameters:
+#    value - value of a variable
+# Returns:
+#    The text, at most maxValueLength characters long
+def valueText(value):
+    if type(value) is str or type(value) is Rope:
+        text = '"%s"' % (textPrefix(value, maxValueLength))
+    elif isinstance(value, int) and value.bit_length() > maxIntBits:
+        return "(int of about %d digits)" % (value.bit_length() * math.log10(2) + 1)
+    else:
+        text = str(value)
+    if len(text) > maxValueLength:
+        text = text[:maxValueLength - 3] + "..."
+    return text
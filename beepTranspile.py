@@ -0,0 +1,438 @@
+#! /usr/bin/python
+
+# Filename: beepTranspile.py by Geoffrey Sessums
+# Purpose:
+#     Translates a compiled BEEP program (see beepCompile.py) into the source
+#     of a single Python function, which is compiled once with compile() and
+#     then executed in place of the interpreter loop of execute.
+#         - each basic block of instructions becomes straight line Python code
+#         - GOTO and IF set the index of the next block, which is dispatched by
+#           a tree of if statements inside a while loop
+#         - each variable becomes a local which is copied back to the
+#           RegisterFile when the function returns or raises an exception
+#         - if the program has a StringHeap, every assignment is accounted
+#           for by it
+#         - each PRINT writes its line to the output sink in one call
+#         - if the program has a Trace, each line stores its instruction and
+#           the value it assigns in the Trace's buffers (see beepTrace.py)
+#     The function counts executed lines exactly like execute. When a block
+#     could reach the line limit it returns instead of running the block, so
+#     that execute can finish the program one line at a time. When a line
+#     raises an exception, Transpiled.locate finds the instruction and the
+#     line count from the traceback, so errors are reported exactly as the
+#     interpreter reports them.
+
+import sys
+
+from beepCompile import OP_NOP, OP_ASSIGN, OP_IF, OP_GOTO, OP_PRINT, OP_RAISE, \
+    OP_INC
+from beepErrors import VarNotDefined, LabelNotDefined, InvalidExpression
+from beepEval import evalGreater, evalGreaterEq, evalCat, evalRep, evalAdd, \
+    evalSub
+
+# File name given to the generated code so its frames can be found in a traceback
+fileName = "<beep>"
+
+# Python operators (values) which implement BEEP int operators (keys), and the
+# evalX functions (by their names in the generated code) used when an operand
+# is not an int
+intOpD = {'+': ('+', "_add"), '-': ('-', "_sub"), '>': ('>', "_gt"), '>=': ('>=', "_ge")}
+strOpD = {'&': "_cat", '*': "_rep"}
+
+# Function: undefinedVar
+# Purpose:
+#    Raise the error for a variable which has no value
+# Parameters:
+#    name - variable name
+# Returns:
+#    Never returns
+def undefinedVar(name):
+    raise VarNotDefined("variable %s not defined" % (name))
+
+# Function: unknownOperator
+# Purpose:
+#    Raise the error for an unknown operator, once both operands were evaluated
+# Parameters:
+#    op1 - first operand
+#    op2 - second operand
+#    operator - the unknown operator
+# Returns:
+#    Never returns
+def unknownOperator(op1, op2, operator):
+    raise InvalidExpression("unknown operator: %s " % (operator))
+
+# Class: Transpiled
+# Purpose:
+#    A BEEP program translated into a Python function.
+# Attributes:
+#    run - the function run(values, pc, counter, limit) which executes the
+#          program from instruction pc with counter lines already executed and
+#          returns (pc, counter) when the program ends (pc is len(codeM)) or
+#          when the block at pc could reach limit lines
+#    codeM - array of Instr the function was generated from
+#    leaderS - set of the instruction indexes at which run may begin: the
+#              first instruction of each basic block
+#    lineMapM - the (instruction index, lines counted in the block up to and
+#               including that instruction) of each line of source
+#    source - the generated Python source
+class Transpiled:
+    __slots__ = ("run", "codeM", "leaderS", "lineMapM", "source")
+
+    # Function: locate
+    # Purpose:
+    #    Find where an exception raised by run occurred
+    # Parameters:
+    #    e - exception raised by run
+    # Returns:
+    #    (instr, counter) where instr is the Instr being executed and counter
+    #    is the number of lines executed, including that one
+    def locate(self, e):
+        found = None
+        tb = e.__traceback__
+        while tb is not None:
+            if tb.tb_frame.f_code.co_filename == fileName:
+                found = tb
+            tb = tb.tb_next
+        pc, offset = self.lineMapM[found.tb_lineno - 1]
+        return self.codeM[pc], found.tb_frame.f_locals["counter"] + offset
+
+# Class: Generator
+# Purpose:
+#    Builds the Python source of a Transpiled program.
+# Attributes:
+#    codeM - array of Instr being translated
+#    regs - RegisterFile of the program
+#    lineM - lines of generated Python source
+#    lineMapM - see Transpiled
+#    constD - dictionary of global names (keys) and values (values) for the
+#             generated code
+#    location - (instruction index, count) recorded for each line emitted
+#    definedS - set of slots which have a value when execution begins
+#    heap - StringHeap of the program, or None
+#    trace - Trace of the program, or None
+class Generator:
+    def __init__(self, codeM, regs, heap, out, trace=None):
+        self.codeM = codeM
+        self.regs = regs
+        self.heap = heap
+        self.trace = trace
+        self.lineM = []
+        self.lineMapM = []
+        self.definedS = set()
+        self.constD = {
+            "_add": evalAdd, "_sub": evalSub, "_gt": evalGreater,
+            "_ge": evalGreaterEq, "_cat": evalCat, "_rep": evalRep,
+            "_undef": undefinedVar, "_badop": unknownOperator,
+            "_LabelNotDefined": LabelNotDefined, "_write": out.write,
+        }
+        if heap is not None:
+            self.constD["_store"] = heap.store
+        if trace is not None:
+            self.constD.update({"_trace": trace, "_ri": trace.instrM, "_rv": trace.valueM})
+        self.location = (0, 0)
+
+    # Function: emit
+    # Purpose:
+    #    Add a line of Python source
+    # Parameters:
+    #    indent - indentation level
+    #    text - text of the line
+    def emit(self, indent, text):
+        self.lineM.append("    " * indent + text)
+        self.lineMapM.append(self.location)
+
+    # Function: record
+    # Purpose:
+    #    Emit the code which stores an instruction in the buffer of the
+    #    Trace; p is the index of the next entry and q that of this one
+    # Parameters:
+    #    indent - indentation level
+    #    instr - Instr about to be executed
+    def record(self, indent, instr):
+        self.emit(indent, "_ri[p] = %s" % (self.constant(instr)))
+        if instr.op == OP_ASSIGN or instr.op == OP_INC:
+            self.emit(indent, "q = p")
+        elif instr.op == OP_IF:
+            # True is stored if it jumps
+            self.emit(indent, "_rv[p] = False")
+            self.emit(indent, "q = p")
+        self.emit(indent, "p = p + 1 if p < %d else 0" % (self.trace.size - 1))
+
+    # Function: constant
+    # Purpose:
+    #    Get the Python source for a literal value. Values whose repr would
+    #    not recreate them exactly (e.g. Numerals) are stored as globals.
+    # Parameters:
+    #    value - literal value
+    # Returns:
+    #    Python source of the value
+    def constant(self, value):
+        if type(value) is str or type(value) is int:
+            return repr(value)
+        name = "_k%d" % (len(self.constD))
+        self.constD[name] = value
+        return name
+
+    # Function: operand
+    # Purpose:
+    #    Get the Python source for a decoded operand, emitting the check that
+    #    a variable has a value unless it is already known to have one
+    # Parameters:
+    #    indent - indentation level
+    #    operand - (None, value) or (slot, name)
+    #    definedS - set of slots known to have a value
+    # Returns:
+    #    Python source of the operand
+    def operand(self, indent, operand, definedS):
+        slot, value = operand
+        if slot is None:
+            return self.constant(value)
+        if slot not in definedS:
+            self.emit(indent, "if v%d is None: _undef(%r)" % (slot, value))
+            definedS.add(slot)
+        return "v%d" % (slot)
+
+    # Function: expr
+    # Purpose:
+    #    Get the Python source for a decoded expression
+    # Parameters:
+    #    indent - indentation level
+    #    expr - decoded expression
+    #    definedS - set of slots known to have a value
+    # Returns:
+    #    Python source of the expression
+    def expr(self, indent, expr, definedS):
+        operator, operand1, operand2 = expr
+        op1 = self.operand(indent, operand1, definedS)
+        if operator is None:
+            return op1
+        op2 = self.operand(indent, operand2, definedS)
+        if operator in intOpD:
+            pyOp, func = intOpD[operator]
+            testM = ["type(%s) is int" % (op) for op, operand in
+                     ((op1, operand1), (op2, operand2))
+                     if operand[0] is not None or type(operand[1]) is not int]
+            if testM == []:
+                return "(%s %s %s)" % (op1, pyOp, op2)
+            return "(%s %s %s if %s else %s(%s, %s))" % (
+                op1, pyOp, op2, " and ".join(testM), func, op1, op2)
+        if operator in strOpD:
+            return "%s(%s, %s)" % (strOpD[operator], op1, op2)
+        return "_badop(%s, %s, %r)" % (op1, op2, operator)
+
+    # Function: write
+    # Purpose:
+    #    Emit the code of a PRINT. The values are formatted into one string,
+    #    except that the values before a variable which may have no value are
+    #    written first, since they are printed even if it has none.
+    # Parameters:
+    #    indent - indentation level
+    #    operandM - tuple of decoded operands
+    #    definedS - set of slots known to have a value
+    def write(self, indent, operandM, definedS):
+        codeM = []
+        for operand in operandM:
+            if operand[0] is not None and operand[0] not in definedS and codeM:
+                self.emit(indent, "_write(%r %% (%s,))" % ("%s " * len(codeM), ", ".join(codeM)))
+                codeM = []
+            codeM.append(self.operand(indent, operand, definedS))
+        if codeM:
+            self.emit(indent, "_write(%r %% (%s,))" % ("%s " * len(codeM) + "\n",
+                                                      ", ".join(codeM)))
+        else:
+            self.emit(indent, "_write(\"\\n\")")
+
+    # Function: jump
+    # Purpose:
+    #    Emit the code which continues at another instruction
+    # Parameters:
+    #    indent - indentation level
+    #    count - lines counted from the start of the block
+    #    pc - index of the next instruction
+    def jump(self, indent, count, pc):
+        if pc == len(self.codeM):
+            self.emit(indent, "return %d, counter + %d" % (pc, count))
+        else:
+            self.emit(indent, "counter += %d" % (count))
+            self.emit(indent, "b = %d" % (pc))
+            self.emit(indent, "continue")
+
+    # Function: block
+    # Purpose:
+    #    Emit the code of a basic block
+    # Parameters:
+    #    indent - indentation level
+    #    leader - index of the first instruction of the block
+    #    pcM - indexes of the instructions of the block
+    def block(self, indent, leader, pcM):
+        # Lines executed by the block on its longest path
+        last = self.codeM[pcM[-1]]
+        total = sum(1 + self.codeM[pc].skip for pc in pcM[:-1]) + 1 + \
+            max(last.skip, last.jumpSkip)
+        self.location = (leader, 0)
+        self.emit(indent, "if counter + %d > lim: return %d, counter" % (total, leader))
+
+        definedS = set(self.definedS)
+        count = 0
+        for pc in pcM:
+            instr = self.codeM[pc]
+            count = count + 1
+            self.location = (pc, count)
+            if self.trace is not None:
+                self.record(indent, instr)
+            op = instr.op
+            if op == OP_ASSIGN:
+                slot, expr = instr.args
+                code = self.expr(indent, expr, definedS)
+                if self.heap is not None:
+                    code = "_store(%d, %s)" % (slot, code)
+                self.emit(indent, "v%d = %s" % (slot, code))
+                definedS.add(slot)
+                if self.trace is not None:
+                    self.emit(indent, "_rv[q] = v%d" % (slot))
+            elif op == OP_INC:
+                slot, name, amount = instr.args
+                var = self.operand(indent, (slot, name), definedS)
+                if self.heap is not None:
+                    self.emit(indent, "if type(%s) is not int: _store(%d, 0)" % (var, slot))
+                self.emit(indent, "%s = %s + %d if type(%s) is int else _add(%s, %d)" % (
+                    var, var, amount, var, var, amount))
+                if self.trace is not None:
+                    self.emit(indent, "_rv[q] = %s" % (var))
+            elif op == OP_PRINT:
+                self.write(indent, instr.args, definedS)
+            elif op == OP_IF:
+                expr, label = instr.args
+                cond = self.expr(indent, expr, definedS)
+                if expr[0] == '>' or expr[0] == '>=':
+                    self.emit(indent, "if %s:" % (cond))
+                else:
+                    self.emit(indent, "if %s == True:" % (cond))
+                if self.trace is not None:
+                    self.emit(indent + 1, "_rv[q] = True")
+                if instr.target is None:
+                    self.emit(indent + 1, "raise _LabelNotDefined(%r)" % (
+                        "label '%s' is not defined" % (label)))
+                else:
+                    self.jump(indent + 1, count + instr.jumpSkip, instr.target)
+            elif op == OP_GOTO:
+                if instr.target is None:
+                    self.emit(indent, "raise _LabelNotDefined(%r)" % (
+                        "label '%s' is not defined" % (instr.args[0])))
+                else:
+                    self.jump(indent, count + instr.jumpSkip, instr.target)
+                return
+            elif op == OP_RAISE:
+                self.emit(indent, "raise %s(%s)" % (
+                    self.constant(instr.args[0]), self.constant(instr.args[1])))
+                return
+            count = count + instr.skip
+        self.jump(indent, count, self.codeM[pcM[-1]].next)
+
+    # Function: dispatch
+    # Purpose:
+    #    Emit a balanced tree of if statements which selects the block to run
+    # Parameters:
+    #    indent - indentation level
+    #    leaderM - sorted indexes of the blocks to select from
+    #    blockD - dictionary of leaders (keys) and block instructions (values)
+    def dispatch(self, indent, leaderM, blockD):
+        if len(leaderM) == 1:
+            self.block(indent, leaderM[0], blockD[leaderM[0]])
+            return
+        mid = len(leaderM) // 2
+        self.emit(indent, "if b < %d:" % (leaderM[mid]))
+        self.dispatch(indent + 1, leaderM[:mid], blockD)
+        self.emit(indent, "else:")
+        self.dispatch(indent + 1, leaderM[mid:], blockD)
+
+# Function: basicBlocks
+# Purpose:
+#    Split a compiled program into basic blocks: runs of instructions which are
+#    only entered at the first and only left after the last
+# Parameters:
+#    codeM - array of Instr
+#    entry - index of the first instruction executed
+# Returns:
+#    Dictionary of leaders (keys) and lists of instruction indexes (values)
+def basicBlocks(codeM, entry):
+    end = len(codeM)
+    entryCountM = [0] * (end + 1)
+    leaderS = {entry}
+    for pc, instr in enumerate(codeM):
+        if instr.op != OP_GOTO and instr.op != OP_RAISE:
+            entryCountM[instr.next] += 1
+        if instr.target is not None:
+            entryCountM[instr.target] += 1
+            leaderS.add(instr.target)
+        if instr.op == OP_IF:
+            leaderS.add(instr.next)
+    for pc in range(end):
+        if entryCountM[pc] > 1:
+            leaderS.add(pc)
+    leaderS.discard(end)
+
+    blockD = {}
+    for leader in leaderS:
+        pcM = [leader]
+        instr = codeM[leader]
+        while instr.op in (OP_NOP, OP_ASSIGN, OP_INC, OP_PRINT) and \
+                instr.next != end and instr.next not in leaderS:
+            pcM.append(instr.next)
+            instr = codeM[instr.next]
+        blockD[leader] = pcM
+    return blockD
+
+# Function: transpile
+# Purpose:
+#    Translate a compiled program into a Python function
+# Parameters:
+#    codeM - array of Instr (normally folded, see foldProgram)
+#    entry - index of the first instruction executed
+#    regs - RegisterFile of the program
+#    heap - StringHeap of the program, or None
+#    out - output sink PRINT writes to (see beepOutput.py), or None for
+#          sys.stdout
+#    trace - Trace the lines executed are recorded in, or None
+# Returns:
+#    Transpiled
+def transpile(codeM, entry, regs, heap=None, out=None, trace=None):
+    if out is None:
+        out = sys.stdout
+    gen = Generator(codeM, regs, heap, out, trace)
+    # Variables which have a value when execution begins always have one
+    gen.definedS = {slot for slot, value in enumerate(regs.values) if value is not None}
+    slotM = range(len(regs.values))
+
+    gen.emit(0, "def run(values, b, counter, limit):")
+    for slot in slotM:
+        gen.emit(1, "v%d = values[%d]" % (slot, slot))
+    gen.emit(1, "lim = limit - 1")
+    if trace is not None:
+        gen.emit(1, "_trace.settle(values)")
+        gen.emit(1, "p = _trace.pos")
+    gen.emit(1, "try:")
+    gen.emit(2, "while True:")
+    blockD = basicBlocks(codeM, entry)
+    if blockD:
+        gen.dispatch(3, sorted(blockD), blockD)
+    else:
+        gen.emit(3, "return b, counter")
+    gen.location = (0, 0)
+    gen.emit(1, "finally:")
+    for slot in slotM:
+        gen.emit(2, "values[%d] = v%d" % (slot, slot))
+    if trace is not None:
+        gen.emit(2, "_trace.pos = p")
+    elif not slotM:
+        gen.emit(2, "pass")
+
+    transpiled = Transpiled()
+    transpiled.codeM = codeM
+    transpiled.leaderS = frozenset(blockD)
+    transpiled.lineMapM = gen.lineMapM
+    transpiled.source = "\n".join(gen.lineM) + "\n"
+    namespaceD = dict(gen.constD)
+    exec(compile(transpiled.source, fileName, "exec"), namespaceD)
+    transpiled.run = namespaceD["run"]
+    return transpiled
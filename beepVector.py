@@ -0,0 +1,706 @@
+#! /usr/bin/python
+
+# Filename: beepVector.py by Geoffrey Sessums
+# Purpose:
+#     Runs one BEEP program many times, each time with different values for
+#     its declared variables (a table of bindings), and gives the output,
+#     line count and error of every run exactly as separate runs with an
+#     Interpreter would. With NumPy the runs are executed together as lanes:
+#         - INT variables become arrays of int64 with one element per lane,
+#           so +, -, >, >= and INC execute once for all the lanes at a line
+#         - other variables become arrays of the Python values
+#         - each lane has its own instruction and line count; every step runs
+#           the earliest instruction any lane is waiting at for all the lanes
+#           waiting there, so lanes which took different IF branches run
+#           apart under a mask and meet again where the branches join
+#     Only programs which the checker verified (see beepCheck.py) are
+#     vectorized, since they cannot stop with an error other than the line
+#     limit. The bindings are grouped by the kinds of their values and each
+#     group is checked once; lanes of a group which is not verified, lanes
+#     whose ints would not fit in an int64 or whose strings grow long, and
+#     every lane when NumPy is not installed are run one at a time by an
+#     Interpreter instead.
+# Usage:
+#     python3 beepVector.py inputFile bindingsFile [-o outputDir] [-s] [execution flags]
+#         bindingsFile - CSV file with a header row of variable names and a row
+#                        of values per run, or a JSON list of objects; an empty
+#                        cell keeps the declared value
+#         -o outputDir - write the output of each run to its own file
+#         -s - run every binding on its own, without NumPy
+#     The execution flags are those of beepDriver.py (-O0, -b, -m, -l, -t and
+#     -d). Lanes are only vectorized without -m, -t and -d.
+#         Example: python3 beepVector.py p1.txt inputs.csv -o out
+
+import csv
+import json
+import os
+import sys
+import time
+
+try:
+    import numpy
+except ImportError:
+    # Every binding is run on its own where there is no NumPy
+    numpy = None
+
+from beepCompile import foldProgram, OP_ASSIGN, OP_IF, OP_GOTO, OP_PRINT, OP_INC
+from beepCheck import checkProgram, valueKind, variableKinds, KIND_INT
+from beepDict import Numeral, toNative
+from beepDriver import parseFlag
+from beepInterp import Program, Interpreter, RunResult
+from beepOptimize import optimizeProgram
+from beepRegs import RegisterFile
+from beepRope import toText
+
+# Ints up to this size are vectorized: the sum or difference of two of them
+# still fits in an int64, and a lane whose int grows past it is run on its own
+maxVectorInt = 1 << 62
+
+# Longest string built by a vectorized lane; longer strings are left to the
+# Ropes of a lane run on its own
+maxVectorText = 1 << 16
+
+# Forms of the value held by an element of an INT array
+FORM_INT = 0        # an int computed by + or -
+FORM_NUMERAL = 1    # a Numeral, which is never equal to True
+FORM_BOOL = 2       # a boolean stored by > or >=
+FORM_NONE = 3       # no value
+
+# Function: bindValue
+# Purpose:
+#    Convert a value of a binding into the value a variable is declared with,
+#    as declareVar would convert the text of a VAR statement
+# Parameters:
+#    varType - type of the variable ("INT" or "STRING")
+#    value - text of the value, or an int
+# Returns:
+#    Value of the variable
+def bindValue(varType, value):
+    if isinstance(value, str):
+        if value[:1] == '"':
+            value = value.strip('"')
+        return toNative(value) if varType == "INT" else value
+    if varType == "INT" and type(value) is int:
+        return Numeral(value)
+    return str(value)
+
+# Function: readBindings
+# Purpose:
+#    Read a table of bindings from a CSV or JSON file
+# Parameters:
+#    fileName - name of the file; a name ending in .json is read as a JSON
+#               list of objects, any other as CSV with a header row
+# Returns:
+#    List of dictionaries containing variable names (keys) and values
+#    (values); empty CSV cells are left out
+# Raises:
+#    ValueError if the file is not a table of bindings
+def readBindings(fileName):
+    with open(fileName, "r", encoding="utf-8", newline="") as file:
+        if fileName.endswith(".json"):
+            bindingM = json.load(file)
+            if not isinstance(bindingM, list) or \
+                    not all(isinstance(binding, dict) for binding in bindingM):
+                raise ValueError("%s is not a list of objects" % (fileName))
+            return bindingM
+        return [{name: value for name, value in row.items() if value not in ("", None)}
+                for row in csv.DictReader(file)]
+
+# Function: bindProgram
+# Purpose:
+#    Convert the bindings of a program into the initial values of its
+#    variables
+# Parameters:
+#    program - Program
+#    bindingM - list of dictionaries containing variable names (keys) and
+#               values (values)
+# Returns:
+#    List of dictionaries containing variable names (keys) and the values
+#    they start with instead of their declared values (values)
+# Raises:
+#    ValueError if a binding names a variable which is not declared
+def bindProgram(program, bindingM):
+    valueDM = []
+    for binding in bindingM:
+        valueD = {}
+        for name, value in binding.items():
+            if name not in program.varTypeD:
+                raise ValueError("variable %s is not declared" % (name))
+            valueD[name] = bindValue(program.varTypeD[name], value)
+        valueDM.append(valueD)
+    return valueDM
+
+# Function: formOf
+# Purpose:
+#    Find the form of an int value (see FORM_INT)
+# Parameters:
+#    value - int, Numeral, boolean or None
+# Returns:
+#    Form of the value
+def formOf(value):
+    if value is None:
+        return FORM_NONE
+    if type(value) is bool:
+        return FORM_BOOL
+    if isinstance(value, Numeral):
+        return FORM_NUMERAL
+    return FORM_INT
+
+# Function: fromForm
+# Purpose:
+#    Rebuild the Python value of an element of an INT array
+# Parameters:
+#    value - int
+#    form - form of the value
+# Returns:
+#    int, Numeral, boolean or None
+def fromForm(value, form):
+    if form == FORM_INT:
+        return value
+    if form == FORM_NUMERAL:
+        return Numeral(value)
+    if form == FORM_BOOL:
+        return bool(value)
+    return None
+
+# Function: fitsVector
+# Purpose:
+#    Check that the int literals of an instruction fit the vectorized lanes
+# Parameters:
+#    instr - decoded instruction
+# Returns:
+#    True if every int literal is smaller than maxVectorInt
+def fitsVector(instr):
+    literalM = []
+    if instr.op == OP_ASSIGN or instr.op == OP_IF:
+        expr = instr.args[1] if instr.op == OP_ASSIGN else instr.args[0]
+        literalM = [operand[1] for operand in expr[1:] if operand is not None and
+                    operand[0] is None]
+    elif instr.op == OP_INC:
+        literalM = [instr.args[2]]
+    return all(not isinstance(value, int) or abs(value) < maxVectorInt
+               for value in literalM)
+
+# Class: VectorRun
+# Purpose:
+#    Executes a verified program for many lanes at once.
+# Attributes:
+#    codeM - array of folded Instr
+#    nameM - list of variable names indexed by slot
+#    maxLines - most lines a lane may execute
+#    intD - dictionary of the slots of INT variables (keys) and the int64
+#           array of their values (values)
+#    formD - dictionary of the slots of INT variables (keys) and the int8
+#            array of the forms of their values (values)
+#    objD - dictionary of the slots of other variables (keys) and the object
+#           array of their values (values)
+#    pcA - index of the next instruction of each lane; stopped lanes are
+#          past the end of codeM
+#    countA - number of lines executed by each lane
+#    outputM - list of the lines printed by each lane
+#    errorM - message of the limit each lane reached, or None
+#    spillM - True for the lanes which must be run on their own
+class VectorRun:
+    # Function: __init__
+    # Parameters:
+    #    codeM - array of folded Instr
+    #    entry - index of the first instruction
+    #    entrySkip - number of lines folded before the first instruction
+    #    regs - RegisterFile of the program
+    #    kindM - kinds of value each variable may hold (see variableKinds)
+    #    valuesM - list of the initial values of the variables of each lane,
+    #              indexed by slot
+    #    maxLines - most lines a lane may execute, or None for no limit
+    def __init__(self, codeM, entry, entrySkip, regs, kindM, valuesM, maxLines):
+        lanes = len(valuesM)
+        self.codeM = codeM
+        self.nameM = regs.nameM
+        self.maxLines = sys.maxsize if maxLines is None else maxLines
+        self.intD = {}
+        self.formD = {}
+        self.objD = {}
+        self.pcA = numpy.full(lanes, entry, dtype=numpy.int64)
+        self.countA = numpy.full(lanes, entrySkip, dtype=numpy.int64)
+        self.outputM = [[] for lane in range(lanes)]
+        self.errorM = [None] * lanes
+        self.spillM = [False] * lanes
+        for slot in range(len(regs.nameM)):
+            columnM = [values[slot] for values in valuesM]
+            if kindM[slot] == KIND_INT:
+                self.formD[slot] = numpy.array([formOf(value) for value in columnM],
+                                               dtype=numpy.int8)
+                for lane, value in enumerate(columnM):
+                    if value is not None and abs(value) >= maxVectorInt:
+                        self.spill(numpy.array([lane]))
+                        columnM[lane] = 0
+                self.intD[slot] = numpy.array([0 if value is None else int(value)
+                                               for value in columnM], dtype=numpy.int64)
+            else:
+                self.objD[slot] = numpy.empty(lanes, dtype=object)
+                self.objD[slot][:] = columnM
+
+    # Function: spill
+    # Purpose:
+    #    Stop lanes which must be run on their own
+    # Parameters:
+    #    laneA - array of lane numbers
+    def spill(self, laneA):
+        for lane in laneA.tolist():
+            self.spillM[lane] = True
+        self.pcA[laneA] = len(self.codeM) + 1
+
+    # Function: load
+    # Purpose:
+    #    Get the values of an operand in some lanes
+    # Parameters:
+    #    operand - (None, value) for a literal or (slot, name) for a variable
+    #    laneA - array of lane numbers
+    # Returns:
+    #    ("lit", value), ("int", values, forms) or ("obj", values)
+    def load(self, operand, laneA):
+        slot, value = operand
+        if slot is None:
+            return ("lit", value)
+        if slot in self.intD:
+            return ("int", self.intD[slot][laneA], self.formD[slot][laneA])
+        return ("obj", self.objD[slot][laneA])
+
+    # Function: number
+    # Purpose:
+    #    Get the values of a numeric operand in some lanes
+    # Parameters:
+    #    operand - (None, value) for a literal or (slot, name) for a variable
+    #    laneA - array of lane numbers
+    # Returns:
+    #    int, or int64 array
+    def number(self, operand, laneA):
+        slot, value = operand
+        if slot is None:
+            return int(value)
+        return self.intD[slot][laneA]
+
+    # Function: text
+    # Purpose:
+    #    Get the text of an operand in some lanes, as str would give it
+    # Parameters:
+    #    operand - (None, value) for a literal or (slot, name) for a variable
+    #    laneA - array of lane numbers
+    # Returns:
+    #    str for a literal, otherwise list of str
+    def text(self, operand, laneA):
+        column = self.load(operand, laneA)
+        if column[0] == "lit":
+            return toText(column[1])
+        if column[0] == "obj":
+            return [toText(value) for value in column[1]]
+        values, forms = column[1], column[2]
+        if not (forms == FORM_BOOL).any():
+            return [str(value) for value in values.tolist()]
+        return [str(bool(value)) if form == FORM_BOOL else str(value)
+                for value, form in zip(values.tolist(), forms.tolist())]
+
+    # Function: evaluate
+    # Purpose:
+    #    Evaluate an expression in some lanes
+    # Parameters:
+    #    expr - decoded expression
+    #    laneA - array of lane numbers
+    # Returns:
+    #    (column, spill) where column is as returned by load, with "int"
+    #    columns holding an array or an int of values and of forms, and spill
+    #    is a bool array of the lanes whose result does not fit, or None
+    def evaluate(self, expr, laneA):
+        operator, operand1, operand2 = expr
+        if operator is None:
+            return self.load(operand1, laneA), None
+        if operator == '&' or operator == '*':
+            text1 = self.text(operand1, laneA)
+            if type(text1) is str:
+                text1 = [text1] * len(laneA)
+            if operator == '&':
+                text2 = self.text(operand2, laneA)
+                if type(text2) is str:
+                    textM = [text + text2 for text in text1]
+                else:
+                    textM = [text + other for text, other in zip(text1, text2)]
+            else:
+                count = self.number(operand2, laneA)
+                if type(count) is int:
+                    count = [count] * len(laneA)
+                else:
+                    count = count.tolist()
+                # Long strings are left to the lanes run on their own, before
+                # they are built
+                spill = numpy.array([len(text) * number > maxVectorText
+                                     for text, number in zip(text1, count)])
+                textM = ["" if over else text * number
+                         for text, number, over in zip(text1, count, spill.tolist())]
+                return ("obj", textM), spill
+            spill = numpy.array([len(text) > maxVectorText for text in textM])
+            return ("obj", textM), spill
+        value1 = self.number(operand1, laneA)
+        value2 = self.number(operand2, laneA)
+        if operator == '+' or operator == '-':
+            values = value1 + value2 if operator == '+' else value1 - value2
+            if type(values) is int:
+                # Both operands are literals when the program is not optimized
+                values = numpy.full(len(laneA), values, dtype=numpy.int64)
+            return ("int", values, FORM_INT), numpy.abs(values) >= maxVectorInt
+        if operator == '>':
+            return ("int", numpy.greater(value1, value2).astype(numpy.int64), FORM_BOOL), None
+        return ("int", numpy.greater_equal(value1, value2).astype(numpy.int64), FORM_BOOL), None
+
+    # Function: store
+    # Purpose:
+    #    Assign the values of an expression to a variable in some lanes
+    # Parameters:
+    #    slot - slot of the variable
+    #    column - values as returned by evaluate
+    #    laneA - array of lane numbers
+    def store(self, slot, column, laneA):
+        if slot in self.intD:
+            if column[0] == "lit":
+                self.intD[slot][laneA] = int(column[1])
+                self.formD[slot][laneA] = formOf(column[1])
+            else:
+                self.intD[slot][laneA] = column[1]
+                self.formD[slot][laneA] = column[2]
+            return
+        if column[0] == "lit":
+            self.objD[slot][laneA] = column[1]
+        elif column[0] == "obj":
+            values = numpy.empty(len(laneA), dtype=object)
+            values[:] = column[1]
+            self.objD[slot][laneA] = values
+        else:
+            values = numpy.broadcast_to(column[1], laneA.shape).tolist()
+            forms = numpy.broadcast_to(column[2], laneA.shape).tolist()
+            objects = numpy.empty(len(laneA), dtype=object)
+            objects[:] = [fromForm(value, form) for value, form in zip(values, forms)]
+            self.objD[slot][laneA] = objects
+
+    # Function: condition
+    # Purpose:
+    #    Evaluate the condition of an IF in some lanes
+    # Parameters:
+    #    expr - decoded expression
+    #    laneA - array of lane numbers
+    # Returns:
+    #    bool array of the lanes which jump
+    def condition(self, expr, laneA):
+        column, spill = self.evaluate(expr, laneA)
+        if column[0] == "lit":
+            return numpy.full(len(laneA), column[1] == True)
+        if column[0] == "obj":
+            return numpy.array([value == True for value in column[1]], dtype=bool)
+        # A Numeral is never equal to True; ints and booleans are when they
+        # are 1
+        jump = (column[1] == 1) & (column[2] != FORM_NUMERAL)
+        return numpy.broadcast_to(jump, laneA.shape)
+
+    # Function: run
+    # Purpose:
+    #    Execute every lane until it ends, reaches the line limit or must be
+    #    run on its own
+    def run(self):
+        codeM = self.codeM
+        end = len(codeM)
+        maxLines = self.maxLines
+        pcA = self.pcA
+        countA = self.countA
+        liveA = numpy.arange(len(pcA))
+        liveA = liveA[pcA[liveA] <= end]
+        while len(liveA):
+            pcs = pcA[liveA]
+            pc = int(pcs.min())
+            waiting = pcs == pc
+            laneA = liveA[waiting]
+            if pc == end:
+                # Folded lines at the end of the program may reach the limit too
+                self.limit(laneA[countA[laneA] >= maxLines])
+                pcA[laneA] = end + 1
+                liveA = liveA[~waiting]
+                continue
+
+            counts = countA[laneA] + 1
+            over = counts >= maxLines
+            if over.any():
+                self.limit(laneA[over])
+                laneA = laneA[~over]
+                counts = counts[~over]
+            countA[laneA] = counts
+            instr = codeM[pc]
+            op = instr.op
+            jump = None
+            if op == OP_ASSIGN:
+                column, spill = self.evaluate(instr.args[1], laneA)
+                if spill is not None and spill.any():
+                    self.spill(laneA[spill])
+                    laneA = laneA[~spill]
+                    if column[0] == "int":
+                        column = ("int", column[1][~spill], column[2])
+                    else:
+                        column = ("obj", [value for value, over in
+                                          zip(column[1], spill.tolist()) if not over])
+                self.store(instr.args[0], column, laneA)
+            elif op == OP_INC:
+                slot = instr.args[0]
+                values = self.intD[slot][laneA] + instr.args[2]
+                spill = numpy.abs(values) >= maxVectorInt
+                if spill.any():
+                    self.spill(laneA[spill])
+                    laneA = laneA[~spill]
+                    values = values[~spill]
+                self.intD[slot][laneA] = values
+                self.formD[slot][laneA] = FORM_INT
+            elif op == OP_IF:
+                jump = self.condition(instr.args[0], laneA)
+            elif op == OP_GOTO:
+                jump = numpy.ones(len(laneA), dtype=bool)
+            elif op == OP_PRINT:
+                self.print(instr.args, laneA)
+
+            if jump is None:
+                pcA[laneA] = instr.next
+                countA[laneA] += instr.skip
+            else:
+                jumpA = laneA[jump]
+                stayA = laneA[~jump]
+                pcA[jumpA] = instr.target
+                countA[jumpA] += instr.jumpSkip
+                pcA[stayA] = instr.next
+                countA[stayA] += instr.skip
+            liveA = liveA[pcA[liveA] <= end]
+
+    # Function: limit
+    # Purpose:
+    #    Stop lanes which reached the line limit
+    # Parameters:
+    #    laneA - array of lane numbers
+    def limit(self, laneA):
+        for lane in laneA.tolist():
+            self.errorM[lane] = "an infinite loop was most likely encountered"
+        self.countA[laneA] = self.maxLines
+        self.pcA[laneA] = len(self.codeM) + 1
+
+    # Function: print
+    # Purpose:
+    #    Execute a PRINT in some lanes
+    # Parameters:
+    #    operandM - list of decoded operands
+    #    laneA - array of lane numbers
+    def print(self, operandM, laneA):
+        columnM = []
+        for operand in operandM:
+            text = self.text(operand, laneA)
+            columnM.append([text + " "] * len(laneA) if type(text) is str else
+                           [each + " " for each in text])
+        outputM = self.outputM
+        for lane, textM in zip(laneA.tolist(), zip(*columnM) if columnM else
+                               [()] * len(laneA)):
+            outputM[lane].append("".join(textM) + "\n")
+
+    # Function: results
+    # Purpose:
+    #    Get the results of the lanes which were not spilled
+    # Parameters:
+    #    valueDM - list of the initial values of the variables of each lane,
+    #              as dictionaries containing names (keys) and values (values)
+    # Returns:
+    #    List of RunResult, with None for the lanes which must be run on their
+    #    own
+    def results(self, valueDM):
+        resultM = []
+        for lane, varValueD in enumerate(valueDM):
+            if self.spillM[lane]:
+                resultM.append(None)
+                continue
+            varValueD = dict(varValueD)
+            for slot, values in self.intD.items():
+                value = fromForm(int(values[lane]), int(self.formD[slot][lane]))
+                if value is not None:
+                    varValueD[self.nameM[slot]] = value
+            for slot, values in self.objD.items():
+                if values[lane] is not None:
+                    varValueD[self.nameM[slot]] = values[lane]
+            textM = ["execution begins...\n"]
+            textM.extend(self.outputM[lane])
+            error = self.errorM[lane]
+            if error is not None:
+                textM.append("***Error: %s\n" % (error))
+            textM.append("execution ends, %d lines executed\n" % (self.countA[lane]))
+            resultM.append(RunResult(varValueD, int(self.countA[lane]), error, None,
+                                     "".join(textM),
+                                     errorKind=None if error is None else "BudgetExceeded"))
+        return resultM
+
+# Function: vectorGroup
+# Purpose:
+#    Run the lanes of one group of bindings together, if the program is
+#    verified for them
+# Parameters:
+#    program - decoded Program
+#    valueDM - list of dictionaries of the initial values of each lane, all
+#              of whose values have the same kinds
+#    optionD - dictionary of Interpreter keyword arguments (keys) and values
+#              (values)
+# Returns:
+#    List of RunResult, with None for the lanes which must be run on their own
+def vectorGroup(program, valueDM, optionD):
+    codeM, nameM = program.decoded
+    varValueD = dict(program.varValueD)
+    varValueD.update(valueDM[0])
+    regs = RegisterFile(program.varTypeD, varValueD)
+    for name in nameM:
+        regs.slot(name)
+    if not checkProgram(codeM, regs)[1]:
+        return [None] * len(valueDM)
+    kindM = variableKinds(codeM, regs)
+    if optionD.get("optimize", True):
+        codeM = optimizeProgram(codeM, regs)
+    codeM, entry, entrySkip = foldProgram(codeM)
+    if not all(fitsVector(instr) for instr in codeM):
+        return [None] * len(valueDM)
+
+    valuesM = []
+    for valueD in valueDM:
+        values = list(regs.values)
+        for name, value in valueD.items():
+            values[regs.slotD[name]] = value
+        valuesM.append(values)
+    lanes = VectorRun(codeM, entry, entrySkip, regs, kindM, valuesM,
+                      optionD.get("maxLines", 5000))
+    lanes.run()
+    declaredD = program.varValueD
+    return lanes.results([dict(declaredD, **valueD) for valueD in valueDM])
+
+# Function: runBindings
+# Purpose:
+#    Run a program once for each of a table of bindings
+# Parameters:
+#    program - Program
+#    bindingM - list of dictionaries containing variable names (keys) and
+#               values (values), which are converted as VAR statements convert
+#               them (see bindValue)
+#    optionD - dictionary of Interpreter keyword arguments (keys) and values
+#              (values)
+#    vectorize - False to run every binding on its own
+# Returns:
+#    List of RunResult in the order of bindingM, as Interpreter(**optionD).run
+#    would give for each binding
+# Raises:
+#    ValueError if a binding names a variable which is not declared
+def runBindings(program, bindingM, optionD=None, vectorize=True):
+    if optionD is None:
+        optionD = {}
+    valueDM = bindProgram(program, bindingM)
+    resultM = [None] * len(valueDM)
+    # The vectorized lanes have no memory or time limits and do not look for
+    # repeated states
+    if vectorize and numpy is not None and program.decode().decoded is not None and \
+            optionD.get("memoryLimit") is None and optionD.get("maxSeconds") is None and \
+            not optionD.get("detectLoops", False):
+        # Lanes whose values have the same kinds pass or fail the check alike
+        groupD = {}
+        for lane, valueD in enumerate(valueDM):
+            key = tuple(sorted((name, valueKind(value)) for name, value in valueD.items()))
+            groupD.setdefault(key, []).append(lane)
+        for laneM in groupD.values():
+            groupResultM = vectorGroup(program, [valueDM[lane] for lane in laneM], optionD)
+            for lane, result in zip(laneM, groupResultM):
+                resultM[lane] = result
+
+    interpreter = Interpreter(**optionD)
+    for lane, valueD in enumerate(valueDM):
+        if resultM[lane] is None:
+            resultM[lane] = interpreter.run(program, valueD)
+    return resultM
+
+# Function: writeOutputs
+# Purpose:
+#    Write the output of each run to its own file
+# Parameters:
+#    resultM - list of RunResult
+#    outputDir - directory the files are written to
+# Returns:
+#    N/A
+def writeOutputs(resultM, outputDir):
+    os.makedirs(outputDir, exist_ok=True)
+    for number, result in enumerate(resultM, 1):
+        # Written in the encoding the program is read in; a bound string
+        # may hold characters latin-1 does not have, which are escaped
+        with open(os.path.join(outputDir, "binding-%d.out" % (number)), "w",
+                  encoding="latin-1", errors="backslashreplace") as file:
+            file.write(result.output)
+
+# Function: writeSummary
+# Purpose:
+#    Write the result of each run and the totals
+# Parameters:
+#    resultM - list of RunResult
+#    wallTime - seconds taken by all the runs
+#    out - file object the summary is written to
+# Returns:
+#    N/A
+def writeSummary(resultM, wallTime, out):
+    print("%-8s %-6s %10s  %s" % ("Binding", "Status", "Lines", "Error"), file=out)
+    for number, result in enumerate(resultM, 1):
+        print("%-8d %-6s %10d  %s" % (number, "PASS" if result.error is None else "FAIL",
+                                      result.lines, result.error or ""), file=out)
+    passed = sum(1 for result in resultM if result.error is None)
+    print("bindings: %d  passed: %d  failed: %d  lines: %d  wall time: %.3f seconds" %
+          (len(resultM), passed, len(resultM) - passed,
+           sum(result.lines for result in resultM), wallTime), file=out)
+
+# Function: main
+# Purpose:
+#    Parse the command arguments and run the program for every binding
+# Parameters:
+#    argM - command arguments, starting with the name of this program
+# Returns:
+#    Exit status: 0 if every run ended without an error, 1 otherwise
+def main(argM):
+    if len(argM) < 3:
+        print("Usage: python3 beepVector.py inputFile bindingsFile [-o outputDir] [-s]"
+              " [execution flags]")
+        return 1
+    outputDir = None
+    vectorize = True
+    optionD = {}
+    flagM = argM[3:]
+    while flagM != []:
+        flag = flagM.pop(0)
+        if flag == "-o" and flagM != []:
+            outputDir = flagM.pop(0)
+        elif flag == "-s":
+            vectorize = False
+        elif parseFlag(flag, flagM, optionD):
+            pass
+        else:
+            print("Unkown Flag: %s" % (flag))
+            return 1
+
+    try:
+        program = Program.fromFile(argM[1])
+        bindingM = readBindings(argM[2])
+    except OSError as e:
+        print("FILE EXISTENCE ERROR: %s" % (e))
+        return 1
+    except ValueError as e:
+        print("BINDINGS ERROR: %s" % (e))
+        return 1
+    start = time.perf_counter()
+    try:
+        resultM = runBindings(program, bindingM, optionD, vectorize)
+    except ValueError as e:
+        print("BINDINGS ERROR: %s" % (e))
+        return 1
+    wallTime = time.perf_counter() - start
+
+    if outputDir is not None:
+        writeOutputs(resultM, outputDir)
+    writeSummary(resultM, wallTime, sys.stdout)
+    return 0 if all(result.error is None for result in resultM) else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
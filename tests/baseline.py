@@ -0,0 +1,126 @@
+# Filename: baseline.py by Geoffrey Sessums
+# Purpose:
+#     Provides the programs the tests run and the output the original
+#     interpreter (beepDriver.py and beepExec.py before they were split into
+#     the modules of the Interpreter) printed for them, which every backend
+#     and feature must print exactly.
+#         - programs holds the BEEP programs, and expected holds name.out,
+#           what python3 beepDriver.py name.txt printed in the programs
+#           directory, and name.verbose.out, what it printed with -v
+#         - gen-workload-size.out is what it printed for the program
+#           beepGen.py generates for the workload and size, run as
+#           gen-workload-size.txt
+#     The original interpreter has a limit of 5000 lines, the default of the
+#     Interpreter.
+
+import os
+
+from beepGen import generate
+from beepInterp import Program, Interpreter
+from beepCache import loadProgram
+from beepLoader import loadMapped
+
+testDir = os.path.dirname(os.path.abspath(__file__))
+programDir = os.path.join(testDir, "programs")
+expectedDir = os.path.join(testDir, "expected")
+
+# Workloads of beepGen.py (keys) and the sizes they were run with (values)
+genSizeD = {"loop": (3, 400), "branch": (3, 400), "string": (3, 400), "print": (3, 400),
+            "huge": (3, 400)}
+
+# Settings of the Interpreter (values) which must print the same output,
+# by name (keys)
+backendD = {
+    "interp": {},
+    "interp -O0": {"optimize": False},
+    "python": {"backend": "python"},
+    "python -O0": {"backend": "python", "optimize": False},
+    "jit": {"backend": "jit"},
+    "jit -O0": {"backend": "jit", "optimize": False},
+}
+
+# Function: programNames
+# Purpose:
+#    Find the names of the programs
+# Returns:
+#    Sorted list of the names of the programs, without .txt
+def programNames():
+    return sorted(name[:-4] for name in os.listdir(programDir) if name.endswith(".txt"))
+
+# Function: programPath
+# Parameters:
+#    name - name of a program, without .txt
+# Returns:
+#    Path of the program's file
+def programPath(name):
+    return os.path.join(programDir, name + ".txt")
+
+# Function: expectedOutput
+# Purpose:
+#    Read what the original interpreter printed for a program
+# Parameters:
+#    name - name of the program, without .txt
+#    verbose - True for the output with -v
+# Returns:
+#    The output, or None if there is none
+def expectedOutput(name, verbose=False):
+    fileName = os.path.join(expectedDir, name + (".verbose.out" if verbose else ".out"))
+    if not os.path.isfile(fileName):
+        return None
+    with open(fileName, "r", encoding="latin-1", newline="") as file:
+        return file.read()
+
+# Function: executionPart
+# Purpose:
+#    Cut the source listing and the tables off an output
+# Parameters:
+#    output - output with a listing
+# Returns:
+#    The output from "execution begins..." on
+def executionPart(output):
+    return output[output.index("execution begins...\n"):]
+
+# Function: genProgram
+# Purpose:
+#    Generate a workload the way it was run by the original interpreter
+# Parameters:
+#    workload - name of the workload (see beepGen.py)
+#    size - its size
+# Returns:
+#    (Program, name of its expected output)
+def genProgram(workload, size):
+    name = "gen-%s-%d" % (workload, size)
+    return Program.fromString(generate(workload, size), name + ".txt"), name
+
+# Function: loadAs
+# Purpose:
+#    Load a program in one of the ways beepDriver.py does; its listing names
+#    it as the original interpreter did
+# Parameters:
+#    name - name of the program, without .txt
+#    how - "file" for Program.fromFile, "mapped" for loadMapped, or a cache
+#          directory for loadProgram
+# Returns:
+#    Program; a mapped one must be closed
+def loadAs(name, how="file"):
+    if how == "file":
+        program = Program.fromFile(programPath(name))
+    elif how == "mapped":
+        program = loadMapped(programPath(name))
+    else:
+        program = loadProgram(programPath(name), how)
+    program.name = name + ".txt"
+    return program
+
+# Function: runFull
+# Purpose:
+#    Run a program printing everything beepDriver.py prints
+# Parameters:
+#    program - Program
+#    verbose - True to print every line executed
+#    optionD - Interpreter keyword arguments
+# Returns:
+#    RunResult holding the output
+def runFull(program, verbose=False, **optionD):
+    interpreter = Interpreter(listing=True, tables=True, verbose=verbose, **optionD)
+    return interpreter.run(program)
@@ -0,0 +1,80 @@
+# Filename: test_async.py by Geoffrey Sessums
+# Purpose:
+#     Checks that programs run in slices by the Scheduler (see beepAsync.py)
+#     print what the original interpreter printed, and that they take turns.
+
+import asyncio
+import unittest
+
+from beepAsync import Scheduler, runPrograms
+from beepInterp import Program, Interpreter
+from tests.baseline import programNames, programPath, expectedOutput, backendD, loadAs
+
+class AsyncTest(unittest.TestCase):
+    def testPrograms(self):
+        for backend, optionD in backendD.items():
+            async def runAll():
+                scheduler = Scheduler(Interpreter(listing=True, tables=True, **optionD),
+                                      sliceLines=7)
+                taskM = [scheduler.submit(loadAs(name)) for name in programNames()]
+                return await asyncio.gather(*taskM)
+
+            resultM = asyncio.run(runAll())
+            for name, result in zip(programNames(), resultM):
+                with self.subTest(program=name, backend=backend):
+                    self.assertEqual(result.output, expectedOutput(name))
+
+    def testWriter(self):
+        partM = []
+
+        async def writer(text):
+            partM.append(text)
+
+        async def runOne():
+            scheduler = Scheduler(Interpreter(listing=True, tables=True), sliceLines=100)
+            return await scheduler.submit(loadAs("loops"), writer)
+
+        result = asyncio.run(runOne())
+        self.assertIsNone(result.output)
+        self.assertGreater(len(partM), 1)
+        self.assertEqual("".join(partM), expectedOutput("loops"))
+
+    def testTurns(self):
+        # A program stops at its quota while the other one goes on, until it
+        # is cancelled
+        runningM = []
+
+        async def runTwo():
+            scheduler = Scheduler(Interpreter(maxLines=None), sliceLines=50)
+            taskM = [scheduler.submit("LOOP: GOTO LOOP\n", quota=quota)
+                     for quota in (1000, 3000)]
+            first = await taskM[0]
+            runningM.append(scheduler.running)
+            await asyncio.sleep(0)
+            taskM[1].cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await taskM[1]
+            return first, scheduler
+
+        first, scheduler = asyncio.run(runTwo())
+        self.assertEqual(first.lines, 1000)
+        self.assertEqual(first.error, "an infinite loop was most likely encountered")
+        self.assertEqual(runningM, [1])
+        self.assertEqual((scheduler.finished, scheduler.cancelled), (1, 1))
+
+    def testRunPrograms(self):
+        nameM = programNames()
+
+        async def runAll():
+            return await runPrograms([programPath(name) for name in nameM],
+                                     Scheduler(Interpreter(), sliceLines=13))
+
+        for name, result in zip(nameM, asyncio.run(runAll())):
+            with self.subTest(program=name):
+                expected = Interpreter().run(Program.fromFile(programPath(name)))
+                self.assertEqual(result.output, expected.output)
+                self.assertEqual(result.passed, expected.error is None)
+                self.assertEqual(result.lines, expected.lines)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+# Filename: test_backends.py by Geoffrey Sessums
+# Purpose:
+#     Checks that every backend, with and without the optimizer, and every
+#     way of loading a program prints exactly what the original interpreter
+#     printed (see baseline.py).
+
+import tempfile
+import unittest
+
+from beepInterp import Program, Interpreter
+from beepGen import generate
+from tests.baseline import programNames, expectedOutput, genSizeD, backendD, genProgram, \
+    loadAs, runFull
+
+class BackendTest(unittest.TestCase):
+    def testPrograms(self):
+        for name in programNames():
+            expected = expectedOutput(name)
+            for backend, optionD in backendD.items():
+                with self.subTest(program=name, backend=backend):
+                    result = runFull(loadAs(name), **optionD)
+                    self.assertEqual(result.output, expected)
+
+    def testVerbose(self):
+        for name in programNames():
+            expected = expectedOutput(name, verbose=True)
+            if expected is None:
+                continue
+            for backend, optionD in backendD.items():
+                with self.subTest(program=name, backend=backend):
+                    result = runFull(loadAs(name), verbose=True, **optionD)
+                    self.assertEqual(result.output, expected)
+
+    def testWorkloads(self):
+        for workload, sizeM in genSizeD.items():
+            for size in sizeM:
+                for backend, optionD in backendD.items():
+                    with self.subTest(workload=workload, size=size, backend=backend):
+                        program, name = genProgram(workload, size)
+                        result = runFull(program, **optionD)
+                        self.assertEqual(result.output, expectedOutput(name))
+
+    def testLoaders(self):
+        with tempfile.TemporaryDirectory() as cacheDir:
+            for name in programNames():
+                expected = expectedOutput(name)
+                for backend in ("interp", "jit"):
+                    optionD = backendD[backend]
+                    with self.subTest(program=name, backend=backend, loader="mapped"):
+                        with loadAs(name, "mapped") as program:
+                            self.assertEqual(runFull(program, **optionD).output, expected)
+                    # The second load finds the program in the cache
+                    for attempt in ("written", "read"):
+                        with self.subTest(program=name, backend=backend, loader=attempt):
+                            result = runFull(loadAs(name, cacheDir), **optionD)
+                            self.assertEqual(result.output, expected)
+
+    def testUnlimited(self):
+        # Without a line limit the workloads run to their end the same way
+        # in every backend
+        for workload in genSizeD:
+            source = generate(workload, 300)
+            reference = Interpreter(optimize=False, maxLines=None).run(source)
+            self.assertIsNone(reference.error)
+            for backend, optionD in backendD.items():
+                with self.subTest(workload=workload, backend=backend):
+                    result = Interpreter(maxLines=None, **optionD).run(source)
+                    self.assertEqual(result.output, reference.output)
+                    self.assertEqual(result.lines, reference.lines)
+                    self.assertEqual(result.variables, reference.variables)
+
+    def testNumeralOperands(self):
+        # A 1 written in the source is not True, but a computed 1 is, in
+        # every backend and in loops the jit compiles
+        source = "\n".join([
+            "VAR INT one 1",
+            "VAR INT c 0",
+            "VAR INT i 0",
+            "VAR INT n 0",
+            "LOOP: ASSIGN c one",
+            "IF c SKIP",
+            "ASSIGN n + n 1",
+            "SKIP: ASSIGN c - 2 one",
+            "IF c JUMP",
+            "ASSIGN n + n 100",
+            "JUMP: ASSIGN i + i 1",
+            "IF > 50 i LOOP",
+            "PRINT n i c"]) + "\n"
+        for backend, optionD in backendD.items():
+            with self.subTest(backend=backend):
+                result = Interpreter(**optionD).run(Program.fromString(source))
+                self.assertIsNone(result.error)
+                self.assertEqual(result.output.splitlines()[1], "50 50 1 ")
+
+if __name__ == "__main__":
+    unittest.main()
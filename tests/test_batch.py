@@ -0,0 +1,150 @@
+# Filename: test_batch.py by Geoffrey Sessums
+# Purpose:
+#     Checks that programs run by a pool of worker processes (see
+#     beepBatch.py) print what they print when run one at a time, that a
+#     worker which dies only fails the program which killed it, and that a
+#     worker stuck in one long operation is killed.
+
+import multiprocessing
+import os
+import signal
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import beepBatch
+from beepBatch import runBatch, expandPrograms, outputNames
+from beepInterp import Program, Interpreter
+from tests.baseline import programNames, programPath, programDir
+
+# runChunk of beepBatch.py, which crashingChunk replaces
+runChunk = beepBatch.runChunk
+
+# Function: crashingChunk
+# Purpose:
+#    Run a chunk as runChunk does, but kill the worker process if the chunk
+#    holds badType.txt
+# Parameters:
+#    fileNameM - list of program file names
+#    argM - the other arguments of runChunk
+# Returns:
+#    List of BatchResult in the order of fileNameM
+def crashingChunk(fileNameM, *argM):
+    if any(fileName.endswith("badType.txt") for fileName in fileNameM):
+        os._exit(1)
+    return runChunk(fileNameM, *argM)
+
+# Function: stuckLoad
+# Purpose:
+#    Load a program as loadProgram does, but first sleep in one call which
+#    does not return to the interpreter for a long time if it is endless.txt
+# Parameters:
+#    fileName - name of the program's file
+# Returns:
+#    The Program
+def stuckLoad(fileName):
+    if fileName.endswith("endless.txt"):
+        time.sleep(60)
+    return Program.fromFile(fileName)
+
+class BatchTest(unittest.TestCase):
+    # Function: assertSameResults
+    # Purpose:
+    #    Check batch results against runs of the programs one at a time
+    # Parameters:
+    #    resultM - list of BatchResult
+    #    optionD - Interpreter keyword arguments
+    def assertSameResults(self, resultM, **optionD):
+        interpreter = Interpreter(listing=True, tables=True, **optionD)
+        for result in resultM:
+            with self.subTest(program=result.fileName):
+                expected = interpreter.run(Program.fromFile(result.fileName))
+                self.assertEqual(result.output, expected.output)
+                self.assertEqual(result.lines, expected.lines)
+                self.assertEqual(result.error, expected.error)
+                self.assertEqual(result.passed, expected.error is None)
+
+    def testExpand(self):
+        fileNameM = [programPath(name) for name in programNames()]
+        self.assertEqual(expandPrograms(programDir), fileNameM)
+        self.assertEqual(expandPrograms(os.path.join(programDir, "*.txt")), fileNameM)
+        with tempfile.TemporaryDirectory() as tempDir:
+            manifest = os.path.join(tempDir, "manifest")
+            with open(manifest, "w", encoding="utf-8") as file:
+                file.write("# programs\n\nbasic.txt\n  loops.txt\n")
+            self.assertEqual(expandPrograms(manifest), [os.path.join(tempDir, "basic.txt"),
+                                                        os.path.join(tempDir, "loops.txt")])
+
+    def testWorkers(self):
+        fileNameM = expandPrograms(programDir)
+        for workers, chunkSize in ((1, None), (2, 1), (3, None)):
+            with self.subTest(workers=workers, chunkSize=chunkSize):
+                resultM = runBatch(fileNameM, workers, chunkSize, useCache=False)
+                self.assertEqual([result.fileName for result in resultM], fileNameM)
+                self.assertSameResults(resultM)
+        resultM = runBatch(fileNameM, 2, optionD={"backend": "jit", "maxLines": 100},
+                           useCache=False)
+        self.assertSameResults(resultM, backend="jit", maxLines=100)
+
+    def testResultCache(self):
+        fileNameM = expandPrograms(programDir)
+        with tempfile.TemporaryDirectory() as cacheDir:
+            firstM = runBatch(fileNameM, 2, useCache=False, resultCacheDir=cacheDir)
+            secondM = runBatch(fileNameM, 2, useCache=False, resultCacheDir=cacheDir)
+        self.assertSameResults(secondM)
+        self.assertFalse(any(result.cached for result in firstM))
+        self.assertTrue(any(result.cached for result in secondM))
+
+    def testOutputDir(self):
+        fileNameM = expandPrograms(programDir)
+        with tempfile.TemporaryDirectory() as tempDir:
+            # Output written to a file reads back as the program's source does
+            fileName = os.path.join(tempDir, "accents.txt")
+            with open(fileName, "w", encoding="latin-1") as file:
+                file.write('VAR STRING s "caf\xe9\xfc"\nPRINT s\n')
+            fileNameM.append(fileName)
+            outputDir = os.path.join(tempDir, "out")
+            for workers in (1, 2):
+                with self.subTest(workers=workers):
+                    resultM = runBatch(fileNameM, workers, useCache=False, outputDir=outputDir)
+                    interpreter = Interpreter(listing=True, tables=True)
+                    for result, name in zip(resultM, outputNames(fileNameM)):
+                        self.assertIsNone(result.output)
+                        with open(os.path.join(outputDir, name), encoding="latin-1") as file:
+                            output = file.read()
+                        expected = interpreter.run(Program.fromFile(result.fileName))
+                        self.assertEqual(output, expected.output)
+            self.assertIn("caf\xe9\xfc \n", output)
+
+    @unittest.skipUnless(hasattr(signal, "setitimer") and
+                         multiprocessing.get_start_method() == "fork",
+                         "workers are killed with SIGALRM and only run the patched"
+                         " loadProgram when they are forked")
+    def testKilledWorker(self):
+        fileNameM = [programPath("endless"), programPath("basic")]
+        start = time.perf_counter()
+        with mock.patch.object(beepBatch, "killGrace", 0.5), \
+                mock.patch.object(beepBatch, "loadProgram", stuckLoad):
+            resultM = runBatch(fileNameM, 1, optionD={"maxSeconds": 0.5})
+        self.assertLess(time.perf_counter() - start, 30)
+        self.assertFalse(resultM[0].passed)
+        self.assertEqual(resultM[0].error, "worker killed after 1 seconds")
+        self.assertSameResults(resultM[1:], maxSeconds=0.5)
+
+    @unittest.skipUnless(multiprocessing.get_start_method() == "fork",
+                         "workers only run the patched runChunk when they are forked")
+    def testDyingWorker(self):
+        fileNameM = expandPrograms(programDir)
+        with mock.patch.object(beepBatch, "runChunk", crashingChunk):
+            resultM = runBatch(fileNameM, 2, chunkSize=3, useCache=False)
+        self.assertEqual([result.fileName for result in resultM], fileNameM)
+        for result in resultM:
+            if result.fileName.endswith("badType.txt"):
+                self.assertFalse(result.passed)
+                self.assertEqual(result.error, "worker stopped")
+        self.assertSameResults([result for result in resultM
+                                if not result.fileName.endswith("badType.txt")])
+
+if __name__ == "__main__":
+    unittest.main()
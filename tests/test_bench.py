@@ -0,0 +1,61 @@
+# Filename: test_bench.py by Geoffrey Sessums
+# Purpose:
+#     Checks the workload generator (see beepGen.py) and the benchmark runner
+#     (see beepBench.py).
+
+import os
+import tempfile
+import unittest
+
+from beepGen import workloadD, generate
+from beepBench import runBench, saveBaseline, loadBaseline, compareResult
+from beepInterp import Interpreter
+
+class BenchTest(unittest.TestCase):
+    def testGenerate(self):
+        for name in workloadD:
+            with self.subTest(workload=name):
+                self.assertEqual(generate(name, 50), generate(name, 50))
+                self.assertEqual(generate(name, 50, 7), generate(name, 50, 7))
+                result = Interpreter(maxLines=None).run(generate(name, 50))
+                self.assertIsNone(result.error)
+                self.assertGreater(result.lines, 0)
+        # The seed chooses the constants of the workloads
+        self.assertNotEqual(generate("loop", 50, 1), generate("loop", 50, 2))
+        # The size sets the work done
+        small = Interpreter(maxLines=None).run(generate("loop", 10))
+        large = Interpreter(maxLines=None).run(generate("loop", 20))
+        self.assertGreater(large.lines, small.lines)
+
+    def testRunAndCompare(self):
+        resultD = runBench(["loop", "huge"], scale=0.001, repeats=1, optionD={"maxLines": None})
+        for name, result in resultD.items():
+            with self.subTest(workload=name):
+                self.assertIsNone(result["error"])
+                self.assertGreater(result["lines"], 0)
+                self.assertGreater(result["linesPerSecond"], 0)
+                self.assertEqual(compareResult(result, result, 10.0), [])
+        with tempfile.TemporaryDirectory() as tempDir:
+            fileName = os.path.join(tempDir, "base.json")
+            saveBaseline(fileName, resultD, {"maxLines": None})
+            baseline = loadBaseline(fileName)
+            self.assertEqual(baseline["workloads"], resultD)
+            with open(fileName, "w", encoding="utf-8") as file:
+                file.write("[]")
+            with self.assertRaises(ValueError):
+                loadBaseline(fileName)
+
+    def testFlags(self):
+        base = {"size": 10, "lines": 100, "linesPerSecond": 1000.0, "startup": 1.0,
+                "peakMemory": 100.0}
+        self.assertEqual(compareResult(dict(base, linesPerSecond=950.0), base, 10.0), [])
+        self.assertEqual(compareResult(dict(base, linesPerSecond=800.0), base, 10.0),
+                         ["SPEED"])
+        self.assertEqual(compareResult(dict(base, startup=2.0), base, 10.0), ["STARTUP"])
+        self.assertEqual(compareResult(dict(base, peakMemory=500.0), base, 10.0), ["MEMORY"])
+        self.assertEqual(compareResult(dict(base, peakMemory=None), base, 10.0), [])
+        self.assertEqual(compareResult(dict(base, lines=99, linesPerSecond=1.0), base, 10.0),
+                         ["CHANGED"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+# Filename: test_budget.py by Geoffrey Sessums
+# Purpose:
+#     Checks the detection of infinite loops (see beepBudget.py): a program
+#     which repeats a state is stopped in every backend, a program which
+#     ends is not, and strings held as Ropes are never built to compare
+#     states.
+
+import unittest
+from unittest import mock
+
+from beepInterp import Program, Interpreter
+from beepRope import Rope
+from tests.baseline import expectedOutput, executionPart, loadAs, backendD
+
+# Flips i forever while s holds a Rope which never changes
+flipSource = "\n".join([
+    'VAR STRING s "x"',
+    "VAR INT i 0",
+    "ASSIGN s * s 300",
+    "LOOP: ASSIGN i - 1 i",
+    "GOTO LOOP"]) + "\n"
+
+# Function: refuseComparison
+# Purpose:
+#    Stand in for the comparisons of Rope, which build both strings
+# Raises:
+#    AssertionError always
+def refuseComparison(*argM):
+    raise AssertionError("Ropes were compared")
+
+class BudgetTest(unittest.TestCase):
+    def testEndless(self):
+        # endless.txt counts forever, so no state repeats and the line limit
+        # stops it
+        for backend, optionD in backendD.items():
+            with self.subTest(backend=backend):
+                result = Interpreter(detectLoops=True, **optionD).run(loadAs("endless"))
+                self.assertEqual(result.lines, 5000)
+                self.assertEqual(result.error, "an infinite loop was most likely encountered")
+                result = Interpreter(detectLoops=True, **optionD).run(
+                    Program.fromString(flipSource))
+                self.assertEqual(result.errorKind, "BudgetExceeded")
+                self.assertEqual(result.error, "an infinite loop was detected at line 4")
+                self.assertLess(result.lines, 5000)
+
+    def testEnding(self):
+        for name in ("loops", "counted", "ropes"):
+            expected = executionPart(expectedOutput(name))
+            for backend, optionD in backendD.items():
+                with self.subTest(program=name, backend=backend):
+                    result = Interpreter(detectLoops=True, **optionD).run(loadAs(name))
+                    self.assertEqual(result.output, expected)
+
+    def testRopes(self):
+        # The same Rope is the same string; a Rope grown on every trip is a
+        # new state, found without building either
+        growSource = flipSource.replace("GOTO LOOP", 'ASSIGN s & s "y"\nGOTO LOOP')
+        with mock.patch.object(Rope, "__eq__", refuseComparison), \
+                mock.patch.object(Rope, "__ne__", refuseComparison):
+            for backend, optionD in backendD.items():
+                with self.subTest(backend=backend):
+                    result = Interpreter(detectLoops=True, **optionD).run(
+                        Program.fromString(flipSource))
+                    self.assertEqual(result.error, "an infinite loop was detected at line 4")
+                    result = Interpreter(detectLoops=True, maxLines=100000, **optionD).run(
+                        Program.fromString(growSource))
+                    self.assertEqual(result.lines, 100000)
+                    self.assertEqual(result.error,
+                                     "an infinite loop was most likely encountered")
+
+if __name__ == "__main__":
+    unittest.main()
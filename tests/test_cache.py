@@ -0,0 +1,155 @@
+# Filename: test_cache.py by Geoffrey Sessums
+# Purpose:
+#     Checks the cache of loaded programs (see beepCache.py): a program read
+#     from the cache runs as the program read from its file, the cache is
+#     kept out of the programs' directories and is pruned, and an entry
+#     cannot run code when it is read.
+
+import marshal
+import os
+import pickle
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import beepCache
+from beepCache import loadProgram, pruneCache, defaultCacheDir, cacheKey, cacheSuffix, \
+    cacheEnvName, cacheMagic, entryBytes, versionModuleM
+from beepInterp import Program, Interpreter
+from tests.baseline import programNames, programPath, programDir
+
+# Class: MakeDir
+# Purpose:
+#    An object whose pickle makes a directory when it is loaded.
+# Attributes:
+#    dirName - name of the directory
+class MakeDir:
+    def __init__(self, dirName):
+        self.dirName = dirName
+
+    def __reduce__(self):
+        return (os.mkdir, (self.dirName,))
+
+class CacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.cacheDir = self.tempDir.name
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    # Function: entries
+    # Returns:
+    #    Sorted list of the names of the files in the cache directory
+    def entries(self):
+        return sorted(os.listdir(self.cacheDir))
+
+    # Function: addFile
+    # Purpose:
+    #    Write a file to the cache directory
+    # Parameters:
+    #    name - name of the file
+    #    size - number of bytes
+    #    age - seconds since it was last used
+    def addFile(self, name, size, age):
+        fileName = os.path.join(self.cacheDir, name)
+        with open(fileName, "wb") as file:
+            file.write(b"x" * size)
+        then = time.time() - age
+        os.utime(fileName, (then, then))
+
+    def testSameRun(self):
+        interpreter = Interpreter(listing=True, tables=True)
+        for name in programNames():
+            with self.subTest(program=name):
+                expected = interpreter.run(Program.fromFile(programPath(name))).output
+                for attempt in ("written", "read"):
+                    program = loadProgram(programPath(name), self.cacheDir)
+                    self.assertEqual(program.name, programPath(name))
+                    self.assertEqual(interpreter.run(program).output, expected)
+        self.assertEqual(len(self.entries()), len(programNames()))
+        self.assertNotIn("__beepcache__", os.listdir(programDir))
+
+    def testChangedSource(self):
+        fileName = os.path.join(self.cacheDir, "program.txt")
+        cacheDir = os.path.join(self.cacheDir, "cache")
+        for value in ("1", "2"):
+            with open(fileName, "w", encoding="latin-1") as file:
+                file.write("VAR INT i %s\nPRINT i\n" % (value))
+            result = Interpreter().run(loadProgram(fileName, cacheDir))
+            self.assertEqual(result.output.splitlines()[1], "%s " % (value))
+
+    def testDamagedEntry(self):
+        with open(programPath("basic"), "rb") as file:
+            entryName = os.path.join(self.cacheDir, cacheKey(file.read()) + cacheSuffix)
+        with open(entryName, "wb") as file:
+            file.write(b"not a program")
+        program = loadProgram(programPath("basic"), self.cacheDir)
+        self.assertEqual(program.lineM, Program.fromFile(programPath("basic")).lineM)
+        self.assertIsNotNone(beepCache.readEntry(entryName))
+
+    def testUnsafeEntry(self):
+        # A pickle which would make a directory, and an entry holding code,
+        # are refused without running anything
+        madeDir = os.path.join(self.cacheDir, "made")
+        entryName = os.path.join(self.cacheDir, "entry" + cacheSuffix)
+        stateD = marshal.loads(entryBytes(loadProgram(programPath("basic"), None))
+                               [len(cacheMagic):])
+        stateD["values"] = {"i": compile("1", "entry", "eval")}
+        payload = pickle.dumps(MakeDir(madeDir))
+        for data in (payload, cacheMagic + payload, cacheMagic + marshal.dumps(stateD)):
+            with self.subTest(data=data[:20]):
+                with open(entryName, "wb") as file:
+                    file.write(data)
+                self.assertIsNone(beepCache.readEntry(entryName))
+        self.assertFalse(os.path.exists(madeDir))
+
+    def testVersion(self):
+        # Every module which decodes a program, or whose values the program
+        # holds, is part of the version
+        for name in ("beepCompile", "beepDict", "beepEval", "beepRope", "beepErrors"):
+            self.assertIn(name, versionModuleM)
+
+    def testEnvironment(self):
+        with mock.patch.dict(os.environ, {cacheEnvName: self.cacheDir}):
+            self.assertEqual(defaultCacheDir(), self.cacheDir)
+        with mock.patch.dict(os.environ, {cacheEnvName: ""}):
+            self.assertIsNone(defaultCacheDir())
+            loadProgram(programPath("basic"))
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": self.cacheDir}):
+            os.environ.pop(cacheEnvName, None)
+            self.assertEqual(defaultCacheDir(), os.path.join(self.cacheDir, "beep"))
+
+    def testPrune(self):
+        current = beepCache.versionPrefix
+        day = 24 * 60 * 60
+        self.addFile(current + "new" + cacheSuffix, 10, 0)
+        self.addFile(current + "old" + cacheSuffix, 10, beepCache.maxCacheAge + day)
+        self.addFile("0123456789abcdef-other" + cacheSuffix, 10, 0)
+        self.addFile("writing.tmp", 10, 0)
+        self.addFile("stopped.tmp", 10, 2 * day)
+        self.addFile("unrelated.txt", 10, 100 * day)
+        self.assertEqual(pruneCache(self.cacheDir), 3)
+        self.assertEqual(self.entries(), [current + "new" + cacheSuffix, "unrelated.txt",
+                                          "writing.tmp"])
+
+    def testPruneSize(self):
+        # The least recently used entries go until three quarters are left
+        current = beepCache.versionPrefix
+        with mock.patch.object(beepCache, "maxCacheBytes", 400):
+            for number in range(5):
+                self.addFile("%s%d%s" % (current, number, cacheSuffix), 100, 100 - number)
+            self.assertEqual(pruneCache(self.cacheDir), 2)
+        self.assertEqual(self.entries(), ["%s%d%s" % (current, number, cacheSuffix)
+                                          for number in (2, 3, 4)])
+
+    def testPruneOnWrite(self):
+        self.addFile("0123456789abcdef-other" + cacheSuffix, 10, 0)
+        with mock.patch.dict(beepCache.writtenD, clear=True):
+            loadProgram(programPath("basic"), self.cacheDir)
+        self.assertEqual(len(self.entries()), 1)
+        self.assertTrue(self.entries()[0].startswith(beepCache.versionPrefix))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+# Filename: test_checkpoint.py by Geoffrey Sessums
+# Purpose:
+#     Checks that a program resumed from a snapshot (see beepCheckpoint.py)
+#     ends exactly as the run which was never stopped, in every backend.
+
+import os
+import tempfile
+import unittest
+
+from beepInterp import Interpreter
+from beepCheckpoint import Checkpointer, Snapshot, readSnapshot, writeSnapshot
+from beepDict import Numeral
+from beepRope import Rope, replicate, concat, textLength
+from tests.baseline import backendD, loadAs
+
+# Programs which run long enough to be stopped, and the lines they run
+programLinesD = {"loops": 5000, "ropes": 5000, "countDown": 5000, "counted": 20000}
+
+class CheckpointTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.snapFile = os.path.join(self.tempDir.name, "run.snap")
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    # Function: resumedOutput
+    # Purpose:
+    #    Get what a resumed run printed after it resumed
+    # Parameters:
+    #    output - output of the resumed run
+    # Returns:
+    #    The output after the line which names the line it resumed at
+    def resumedOutput(self, output):
+        return output.split("execution resumes at line ", 1)[1].split("\n", 1)[1]
+
+    def testResumeAfterLimit(self):
+        for name, maxLines in programLinesD.items():
+            for backend, optionD in backendD.items():
+                full = Interpreter(maxLines=maxLines, **optionD).run(loadAs(name))
+                for stopAt in (1, 37, full.lines // 2, full.lines - 1):
+                    with self.subTest(program=name, backend=backend, stopAt=stopAt):
+                        checkpointer = Checkpointer(self.snapFile)
+                        first = Interpreter(maxLines=stopAt, **optionD).run(
+                            loadAs(name), checkpointer=checkpointer)
+                        self.assertEqual(first.lines, stopAt)
+                        self.assertEqual(checkpointer.saved, 1)
+                        snapshot = readSnapshot(self.snapFile)
+                        second = Interpreter(maxLines=maxLines, **optionD).run(
+                            loadAs(name), snapshot=snapshot)
+                        # The first run ends with the limit and the count
+                        combined = "\n".join(first.output.split("\n")[:-3]) + "\n" + \
+                            self.resumedOutput(second.output)
+                        self.assertEqual(combined, full.output)
+                        self.assertEqual(second.lines, full.lines)
+                        self.assertEqual(second.error, full.error)
+                        self.assertEqual(second.variables, full.variables)
+
+    def testResumePeriodic(self):
+        for backend, optionD in backendD.items():
+            with self.subTest(backend=backend):
+                full = Interpreter(maxLines=None, **optionD).run(loadAs("loops"))
+                checkpointer = Checkpointer(self.snapFile, everyLines=700)
+                Interpreter(maxLines=None, **optionD).run(loadAs("loops"),
+                                                          checkpointer=checkpointer)
+                self.assertGreater(checkpointer.saved, 1)
+                snapshot = readSnapshot(self.snapFile)
+                second = Interpreter(maxLines=None, **optionD).run(loadAs("loops"),
+                                                                   snapshot=snapshot)
+                self.assertTrue(full.output.endswith(self.resumedOutput(second.output)))
+                self.assertEqual(second.lines, full.lines)
+                self.assertEqual(second.variables, full.variables)
+
+    def testStopRequest(self):
+        checkpointer = Checkpointer(self.snapFile, everyLines=100)
+        checkpointer.request(stop=True)
+        first = Interpreter(maxLines=None).run(loadAs("loops"), checkpointer=checkpointer)
+        self.assertEqual(first.error, "stopped after saving a snapshot to %s" % (self.snapFile))
+        second = Interpreter(maxLines=None).run(loadAs("loops"),
+                                                snapshot=readSnapshot(self.snapFile))
+        full = Interpreter(maxLines=None).run(loadAs("loops"))
+        self.assertEqual(second.variables, full.variables)
+        self.assertEqual(second.lines, full.lines)
+
+    def testOtherProgram(self):
+        Interpreter(maxLines=10).run(loadAs("loops"), checkpointer=Checkpointer(self.snapFile))
+        snapshot = readSnapshot(self.snapFile)
+        with self.assertRaises(ValueError):
+            Interpreter().run(loadAs("ropes"), snapshot=snapshot)
+
+    def testValues(self):
+        # Numerals stay Numerals and shared Ropes stay shared and unbuilt
+        rope = replicate("abc", 10 ** 15)
+        valueD = {"n": Numeral(1), "i": 1, "b": True, "s": "text",
+                  "r": concat(rope, rope), "u": None}
+        writeSnapshot(self.snapFile, Snapshot("hash", 3, 10, valueD))
+        snapshot = readSnapshot(self.snapFile)
+        self.assertEqual((snapshot.programHash, snapshot.index, snapshot.counter),
+                         ("hash", 3, 10))
+        self.assertIs(type(snapshot.valueD["n"]), Numeral)
+        self.assertIs(type(snapshot.valueD["i"]), int)
+        self.assertIs(snapshot.valueD["b"], True)
+        self.assertEqual(snapshot.valueD["s"], "text")
+        self.assertIsNone(snapshot.valueD["u"])
+        restored = snapshot.valueD["r"]
+        self.assertIs(type(restored), Rope)
+        self.assertIs(restored.left, restored.right)
+        self.assertEqual(textLength(restored), 6 * 10 ** 15)
+
+    def testDamaged(self):
+        with open(self.snapFile, "wb") as file:
+            file.write(b"BEEPSNAP not a snapshot")
+        with self.assertRaises(ValueError):
+            readSnapshot(self.snapFile)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+# Filename: test_driver.py by Geoffrey Sessums
+# Purpose:
+#     Checks that beepDriver.py, and beepClient.py with a running
+#     beepServer.py, print exactly what the original beepDriver.py printed
+#     for every flag which does not add to the output.
+
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+from beepDriver import parseFlags
+from tests.baseline import programNames, expectedOutput, programDir, testDir
+
+packageDir = os.path.dirname(testDir)
+
+# Flags of beepDriver.py which must not change what it prints; 0 is no
+# limit for each of -m, -l and -t
+flagMM = [[], ["-O0"], ["-b", "python"], ["-b", "jit", "-O0"], ["-M"], ["-n"], ["-m", "100000"],
+          ["-m", "0"], ["-t", "60"], ["-t", "0"], ["-d"]]
+
+class DriverTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.env = dict(os.environ, BEEPCACHE=os.path.join(self.tempDir.name, "cache"),
+                        PYTHONIOENCODING="latin-1")
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    # Function: runCommand
+    # Purpose:
+    #    Run a program of the package
+    # Parameters:
+    #    argM - command arguments
+    #    cwd - directory to run it in
+    # Returns:
+    #    subprocess.CompletedProcess with the text of stdout
+    def runCommand(self, *argM, cwd=programDir):
+        return subprocess.run([sys.executable, os.path.join(packageDir, argM[0])] +
+                              list(argM[1:]), cwd=cwd, env=self.env,
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                              encoding="latin-1", timeout=120)
+
+    def testFlags(self):
+        for name in programNames():
+            for flagM in flagMM:
+                with self.subTest(program=name, flags=flagM):
+                    process = self.runCommand("beepDriver.py", name + ".txt", *flagM)
+                    self.assertEqual(process.stdout, expectedOutput(name))
+                    self.assertEqual(process.returncode, 0)
+
+    def testVerbose(self):
+        for name in programNames():
+            expected = expectedOutput(name, verbose=True)
+            if expected is not None:
+                with self.subTest(program=name):
+                    process = self.runCommand("beepDriver.py", name + ".txt", "-v", "-b",
+                                              "jit")
+                    self.assertEqual(process.stdout, expected)
+
+    def testOutputFile(self):
+        outputFile = os.path.join(self.tempDir.name, "output.txt")
+        process = self.runCommand("beepDriver.py", "basic.txt", "-o", outputFile)
+        self.assertEqual(process.stdout, "")
+        with open(outputFile, "r", encoding="latin-1") as file:
+            self.assertEqual(file.read(), expectedOutput("basic"))
+        # The output is written as latin-1, like the source
+        sourceFile = os.path.join(self.tempDir.name, "latin.txt")
+        with open(sourceFile, "w", encoding="latin-1") as file:
+            file.write('VAR STRING s "caf\xe9\xfc"\nPRINT s\n')
+        expected = self.runCommand("beepDriver.py", sourceFile).stdout
+        self.assertIn("caf\xe9\xfc \n", expected)
+        process = self.runCommand("beepDriver.py", sourceFile, "-o", outputFile)
+        self.assertEqual(process.stdout, "")
+        with open(outputFile, "r", encoding="latin-1") as file:
+            self.assertEqual(file.read(), expected)
+
+    def testProfile(self):
+        profileFile = os.path.join(self.tempDir.name, "profile.json")
+        process = self.runCommand("beepDriver.py", "loops.txt", "-p", "-P", profileFile)
+        self.assertTrue(process.stdout.startswith(expectedOutput("loops")))
+        with open(profileFile, "r", encoding="utf-8") as file:
+            self.assertIsInstance(json.load(file), dict)
+
+    def testCheck(self):
+        self.assertEqual(self.runCommand("beepDriver.py", "loops.txt", "-c").returncode, 0)
+        self.assertEqual(self.runCommand("beepDriver.py", "undeclared.txt", "-c").returncode,
+                         1)
+
+    def testResume(self):
+        snapFile = os.path.join(self.tempDir.name, "loops.snap")
+        first = self.runCommand("beepDriver.py", "loops.txt", "-q", "-l", "1000", "-S",
+                                snapFile)
+        self.assertIn("an infinite loop was most likely encountered", first.stdout)
+        second = self.runCommand("beepDriver.py", "loops.txt", "-q", "-l", "0", "-R",
+                                 snapFile)
+        full = self.runCommand("beepDriver.py", "loops.txt", "-q", "-l", "0")
+        self.assertIn("execution resumes at line ", second.stdout)
+        self.assertEqual(second.stdout.splitlines()[-3:], full.stdout.splitlines()[-3:])
+
+    def testErrors(self):
+        process = self.runCommand("beepDriver.py", "basic.txt", "-x")
+        self.assertEqual((process.stdout, process.returncode), ("Unkown Flag: -x\n", 1))
+        process = self.runCommand("beepDriver.py", "missing.txt")
+        self.assertEqual((process.stdout, process.returncode),
+                         ("FILE EXISTENCE ERROR: missing.txt\n", 1))
+
+    def testParseFlags(self):
+        # 0 is no limit for each of -m, -l and -t
+        settingD = parseFlags(["-v", "-b", "jit", "-m", "0", "-l", "0", "-t", "0", "-T", "8",
+                               "-q"])
+        self.assertTrue(settingD["verbose"])
+        self.assertFalse(settingD["full"])
+        self.assertEqual(settingD["traceSize"], 8)
+        self.assertEqual(settingD["optionD"], {"backend": "jit", "memoryLimit": None,
+                                               "maxLines": None, "maxSeconds": None})
+        self.assertEqual(parseFlags(["-m", "1000"])["optionD"], {"memoryLimit": 1000})
+        with self.assertRaises(ValueError):
+            parseFlags(["-o", "output.txt"], localFiles=False)
+
+    def testServer(self):
+        # The server may only use a copy of the programs, where the results
+        # of -C are written
+        rootDir = os.path.join(self.tempDir.name, "programs")
+        shutil.copytree(programDir, rootDir)
+        address = os.path.join(self.tempDir.name, "server.sock")
+        self.env["BEEP_SERVER"] = address
+        server = subprocess.Popen([sys.executable, os.path.join(packageDir, "beepServer.py"),
+                                   address, "-j", "2", "-r", rootDir],
+                                  cwd=rootDir, env=self.env, stdout=subprocess.DEVNULL,
+                                  stderr=subprocess.DEVNULL)
+        try:
+            deadline = time.monotonic() + 60
+            while True:
+                try:
+                    with socket.socket(socket.AF_UNIX) as sock:
+                        sock.connect(address)
+                    break
+                except OSError:
+                    if time.monotonic() > deadline or server.poll() is not None:
+                        self.fail("the server did not start")
+                    time.sleep(0.05)
+            for name in programNames():
+                for flagM in ([], ["-b", "jit"], ["-C", "results"]):
+                    with self.subTest(program=name, flags=flagM):
+                        process = self.runCommand("beepClient.py", name + ".txt", *flagM,
+                                                  cwd=rootDir)
+                        self.assertEqual(process.stdout, expectedOutput(name))
+                        self.assertEqual(process.returncode, 0)
+            # Files outside the root directory are refused
+            process = self.runCommand("beepClient.py", os.path.join(programDir, "basic.txt"),
+                                      cwd=rootDir)
+            self.assertEqual(process.returncode, 1)
+            self.assertNotIn("execution begins", process.stdout)
+        finally:
+            server.terminate()
+            server.wait(30)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+# Filename: test_loader.py by Geoffrey Sessums
+# Purpose:
+#     Checks that a memory mapped program (see beepLoader.py) has exactly the
+#     lines, labels and variables Program.fromFile finds, whatever its line
+#     endings and wherever the chunks it is scanned in end.
+
+import itertools
+import os
+import tempfile
+import unittest
+
+import beepLoader
+from beepInterp import Program, Interpreter
+from beepLoader import loadMapped
+from tests.baseline import programNames, programPath
+
+# Lines which do and do not hold labels and declarations
+lineM = ["VAR INT a 3", "X: PRINT a", "", "PRINT \"VAR\"", " L:", "VARx", "a:b", "\t",
+         "ASSIGN a + a 1", "IF > 9 a X"]
+
+# Line endings Program.fromFile accepts
+endingM = ["\n", "\r\n", "\r"]
+
+class LoaderTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.fileName = os.path.join(self.tempDir.name, "program.txt")
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    # Function: assertSameProgram
+    # Purpose:
+    #    Load a file both ways and compare what was loaded and how it runs
+    # Parameters:
+    #    data - contents of the file
+    def assertSameProgram(self, data):
+        with open(self.fileName, "wb") as file:
+            file.write(data)
+        expected = Program.fromFile(self.fileName)
+        with loadMapped(self.fileName) as program:
+            self.assertEqual(list(program.lineM), list(expected.lineM))
+            self.assertEqual(len(program.lineM), len(expected.lineM))
+            self.assertEqual(program.labelD, expected.labelD)
+            self.assertEqual(program.varTypeD, expected.varTypeD)
+            self.assertEqual(program.varValueD, expected.varValueD)
+            for index in range(-len(expected.lineM), len(expected.lineM)):
+                self.assertEqual(program.lineM[index], expected.lineM[index])
+            with self.assertRaises(IndexError):
+                program.lineM[len(expected.lineM)]
+            interpreter = Interpreter(listing=True, tables=True)
+            self.assertEqual(interpreter.run(program).output,
+                             interpreter.run(expected).output)
+
+    def testLineEndings(self):
+        for ending in endingM:
+            with self.subTest(ending=repr(ending)):
+                text = ending.join(lineM)
+                self.assertSameProgram(text.encode("latin-1"))
+                self.assertSameProgram((text + ending).encode("latin-1"))
+
+    def testMixedEndings(self):
+        # Every pair of endings, including "\r" followed by "\n" as two lines
+        for first, second in itertools.product(endingM + ["\r\r\n", "\n\r"], repeat=2):
+            with self.subTest(first=repr(first), second=repr(second)):
+                text = first.join(lineM[:5]) + second + second.join(lineM[5:]) + first
+                self.assertSameProgram(text.encode("latin-1"))
+
+    def testEmpty(self):
+        for data in (b"", b"\n", b"\r\n\r\n", b"\r"):
+            with self.subTest(data=data):
+                self.assertSameProgram(data)
+
+    def testLatin1(self):
+        self.assertSameProgram('VAR STRING s "caf\xe9"\nPRINT s "\xff"\r\n'.encode("latin-1"))
+
+    def testChunks(self):
+        # Chunks end inside lines, between "\r" and "\n", and before lines
+        # longer than a chunk
+        text = "\r\n".join(lineM) + "\r" + "\n".join(lineM) + "\r\n" + \
+            "PRINT \"" + "y" * 40 + "\"\r\n" + "\r".join(lineM)
+        saved = beepLoader.scanChunkSize
+        try:
+            for size in (1, 2, 3, 5, 7, 16, 31):
+                beepLoader.scanChunkSize = size
+                with self.subTest(size=size):
+                    self.assertSameProgram(text.encode("latin-1"))
+        finally:
+            beepLoader.scanChunkSize = saved
+
+    def testPrograms(self):
+        for name in programNames():
+            with self.subTest(program=name):
+                with open(programPath(name), "rb") as file:
+                    self.assertSameProgram(file.read())
+
+if __name__ == "__main__":
+    unittest.main()
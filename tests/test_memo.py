@@ -0,0 +1,151 @@
+# Filename: test_memo.py by Geoffrey Sessums
+# Purpose:
+#     Checks the result cache (see beepMemo.py): a cached run prints exactly
+#     what the run printed, and runs whose outcome depends on the host or on
+#     the time they took are never cached.
+
+import os
+import tempfile
+import unittest
+
+from beepInterp import Program, Interpreter, RunResult
+from beepMemo import ResultCache, resultSuffix
+from beepBudget import timeLimitMessage
+from tests.baseline import programNames, expectedOutput, loadAs
+from tests.test_rope import hugeSource
+
+# Replicates the text of an int until its length does not fit in an index
+overflowSource = "\n".join([
+    "VAR INT x 2",
+    "VAR INT i 0",
+    "LOOP: ASSIGN x * x x",
+    "ASSIGN i + i 1",
+    "IF > 14 i LOOP"]) + "\n"
+
+# Prints a string of 10**13 characters
+memorySource = "\n".join([
+    'VAR STRING s "abcdefghij"',
+    "ASSIGN s * s 1000000000000",
+    "PRINT s"]) + "\n"
+
+class MemoTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.cacheDir = self.tempDir.name
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def testCachedOutput(self):
+        for backend in ("interp", "jit", "python"):
+            cache = ResultCache(self.cacheDir)
+            for name in programNames():
+                with self.subTest(program=name, backend=backend):
+                    interpreter = Interpreter(listing=True, tables=True, backend=backend,
+                                              cache=cache)
+                    first = interpreter.run(loadAs(name))
+                    second = interpreter.run(loadAs(name))
+                    self.assertFalse(first.cached)
+                    # longInt.txt stops at a limit of the host, so it is
+                    # run again
+                    self.assertEqual(second.cached, name != "longInt")
+                    self.assertEqual(first.output, expectedOutput(name))
+                    self.assertEqual(second.output, first.output)
+                    self.assertEqual(second.lines, first.lines)
+                    self.assertEqual(second.error, first.error)
+                    self.assertEqual(second.errorLine, first.errorLine)
+                    self.assertEqual(second.errorKind, first.errorKind)
+                    self.assertEqual(second.variables, first.variables)
+
+    def testDisk(self):
+        first = Interpreter(cache=ResultCache(self.cacheDir)).run(loadAs("basic"))
+        cache = ResultCache(self.cacheDir)
+        second = Interpreter(cache=cache).run(loadAs("basic"))
+        self.assertTrue(second.cached)
+        self.assertEqual(cache.diskHits, 1)
+        self.assertEqual(second.output, first.output)
+        self.assertEqual({name: type(value) for name, value in second.variables.items()},
+                         {name: type(value) for name, value in first.variables.items()})
+
+    def testDamagedEntry(self):
+        Interpreter(cache=ResultCache(self.cacheDir)).run(loadAs("basic"))
+        nameM = [name for name in os.listdir(self.cacheDir) if name.endswith(resultSuffix)]
+        self.assertEqual(len(nameM), 1)
+        with open(os.path.join(self.cacheDir, nameM[0]), "wb") as file:
+            file.write(b"BEEPMEMO damaged")
+        result = Interpreter(cache=ResultCache(self.cacheDir)).run(loadAs("basic"))
+        self.assertFalse(result.cached)
+        self.assertEqual(result.output, Interpreter().run(loadAs("basic")).output)
+
+    def testKeys(self):
+        # The settings and the starting values are part of the key
+        cache = ResultCache()
+        Interpreter(cache=cache).run(loadAs("loops"))
+        self.assertFalse(Interpreter(maxLines=6000, cache=cache).run(loadAs("loops")).cached)
+        self.assertFalse(Interpreter(backend="jit", cache=cache).run(loadAs("loops")).cached)
+        self.assertFalse(Interpreter(cache=cache).run(loadAs("loops"), {"t": 3}).cached)
+        self.assertTrue(Interpreter(cache=cache).run(loadAs("loops"), {"t": 3}).cached)
+        self.assertTrue(Interpreter(cache=cache).run(loadAs("loops")).cached)
+
+    # Function: assertNotCached
+    # Purpose:
+    #    Check that a run is not stored, so that running it again runs it
+    # Parameters:
+    #    source - source code of the program
+    #    errorKind - kind of the error which stops the program
+    #    optionD - Interpreter keyword arguments
+    def assertNotCached(self, source, errorKind, **optionD):
+        cache = ResultCache(self.cacheDir)
+        interpreter = Interpreter(cache=cache, **optionD)
+        for attempt in range(2):
+            result = interpreter.run(Program.fromString(source))
+            self.assertEqual(result.errorKind, errorKind)
+            self.assertFalse(result.cached)
+        self.assertEqual(cache.stores, 0)
+        self.assertEqual(os.listdir(self.cacheDir), [])
+
+    def testExclusions(self):
+        with self.subTest("time limit"):
+            self.assertNotCached("LOOP: GOTO LOOP\n", "BudgetExceeded", maxLines=None,
+                                 maxSeconds=0.05)
+        with self.subTest("memory limit"):
+            self.assertNotCached(hugeSource, "MemoryLimitExceeded", memoryLimit=1000)
+        with self.subTest("OverflowError"):
+            self.assertNotCached(overflowSource, "OverflowError")
+        with self.subTest("MemoryError"):
+            self.assertNotCached(memorySource, "MemoryError")
+
+    def testBypassed(self):
+        # Profiled and traced runs never use the cache
+        cache = ResultCache()
+        for optionD in ({"profile": True}, {"traceSize": 8}):
+            interpreter = Interpreter(cache=cache, **optionD)
+            interpreter.run(loadAs("loops"))
+            self.assertFalse(interpreter.run(loadAs("loops")).cached)
+        self.assertEqual(cache.stores, 0)
+
+    def testDeterministic(self):
+        cache = ResultCache()
+        interpreter = Interpreter(maxSeconds=2.0)
+        for errorKind, error, expected in [
+                (None, None, True),
+                ("BudgetExceeded", "an infinite loop was most likely encountered", True),
+                ("BudgetExceeded", "an infinite loop was detected at line 3", True),
+                ("VarNotDefined", "variable x not defined", True),
+                ("InvalidValueType", "'ab' is not numeric", True),
+                ("MemoryLimitExceeded", "strings would use 9 characters", False),
+                ("MemoryError", "", False),
+                ("OverflowError", "int too large", False),
+                ("RecursionError", "maximum recursion depth exceeded", False),
+                ("ValueError", "Exceeds the limit for integer string conversion", False),
+                ("KeyError", "Traceback (most recent call last):", False)]:
+            with self.subTest(errorKind=errorKind):
+                result = RunResult({}, 10, error, None, "", errorKind=errorKind)
+                self.assertEqual(cache.deterministic(interpreter, result), expected)
+        # The time limit is a BudgetExceeded too
+        result = RunResult({}, 10, timeLimitMessage % (2.0), None, "",
+                           errorKind="BudgetExceeded")
+        self.assertFalse(cache.deterministic(interpreter, result))
+
+if __name__ == "__main__":
+    unittest.main()
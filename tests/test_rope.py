@@ -0,0 +1,128 @@
+# Filename: test_rope.py by Geoffrey Sessums
+# Purpose:
+#     Checks strings built as Ropes and the string memory limit (see
+#     beepRope.py), including lengths which do not fit in a Python index,
+#     which raise OverflowError where the string is made as a str would.
+
+import sys
+import unittest
+
+from beepInterp import Program, Interpreter
+from beepRope import Rope, StringHeap, concat, replicate, textLength, textPrefix
+from beepErrors import MemoryLimitExceeded
+from tests.baseline import backendD, loadAs, expectedOutput, executionPart
+
+# Replicates a string to 10**13 characters, then to 10**25, far past
+# sys.maxsize
+hugeSource = "\n".join([
+    'VAR STRING s "abcdefghij"',
+    "VAR INT n 1000000000000",
+    "ASSIGN s * s n",
+    "ASSIGN s * s n",
+    'PRINT "unreached"']) + "\n"
+
+# Doubles a string until it is longer than sys.maxsize
+doublingSource = "\n".join([
+    'VAR STRING s "abcdefghij"',
+    "VAR INT i 0",
+    "LOOP: ASSIGN s & s s",
+    "ASSIGN i + i 1",
+    "IF > 70 i LOOP",
+    "PRINT i"]) + "\n"
+
+class RopeTest(unittest.TestCase):
+    def testRopeText(self):
+        rope = concat(replicate("ab", 200), "c" * 300)
+        self.assertIs(type(rope), Rope)
+        self.assertEqual(len(rope), 700)
+        self.assertEqual(str(rope), "ab" * 200 + "c" * 300)
+        self.assertEqual(rope, "ab" * 200 + "c" * 300)
+        self.assertEqual(replicate("ab", 3), "ababab")
+        self.assertEqual(replicate("ab", -1), "")
+
+    def testHugeLength(self):
+        rope = replicate(replicate("abcdefghij", 10 ** 12), 10 ** 5)
+        self.assertEqual(textLength(rope), 10 ** 18)
+        self.assertEqual(len(concat(rope, rope)), 2 * 10 ** 18)
+        with self.assertRaisesRegex(OverflowError, "too large to concat"):
+            concat(replicate(rope, 9), rope)
+        with self.assertRaisesRegex(OverflowError, "repeated string is too long"):
+            replicate(rope, 10)
+        with self.assertRaisesRegex(OverflowError, "index-sized integer"):
+            replicate("", 2 ** 63)
+
+    def testTextPrefix(self):
+        rope = concat(replicate(concat("ab", replicate("c", 300)), 10 ** 15), "d" * 300)
+        self.assertEqual(textPrefix(rope, 5), "abccc")
+        self.assertEqual(textPrefix(rope, 310), (("ab" + "c" * 300) * 2)[:310])
+        self.assertEqual(textPrefix(concat("x" * 300, "y" * 300), 1000), "x" * 300 + "y" * 300)
+        self.assertEqual(textPrefix(replicate("", 10 ** 15), 10), "")
+        self.assertIsNone(rope.flat)
+
+    def testFlatVariables(self):
+        # The values of the variables are given as strs, except a Rope too
+        # long to build
+        result = Interpreter().run(Program.fromString(hugeSource))
+        self.assertIs(type(result.variables["s"]), Rope)
+        source = 'VAR STRING s "abcdefghij"\nASSIGN s * s 1000\n'
+        for backend, optionD in backendD.items():
+            with self.subTest(backend=backend):
+                result = Interpreter(**optionD).run(Program.fromString(source))
+                self.assertIs(type(result.variables["s"]), str)
+                self.assertEqual(result.variables["s"], "abcdefghij" * 1000)
+
+    def testHeap(self):
+        heap = StringHeap(10, ["abc", 5, "de"])
+        self.assertEqual(heap.used, 5)
+        self.assertTrue(heap.fits(1, "12345"))
+        self.assertFalse(heap.fits(0, "12345678"))
+        self.assertEqual(heap.used, 10)
+        with self.assertRaises(MemoryLimitExceeded):
+            heap.store(2, replicate("x", 10 ** 18))
+        self.assertEqual(heap.used, 10)
+
+    def testPastMaxsize(self):
+        # A limit past sys.maxsize is never reached
+        for backend, optionD in backendD.items():
+            for memoryLimit in (None, 10 ** 20):
+                with self.subTest(backend=backend, memoryLimit=memoryLimit):
+                    result = Interpreter(memoryLimit=memoryLimit, **optionD).run(
+                        Program.fromString(hugeSource))
+                    self.assertEqual(result.errorKind, "OverflowError")
+                    self.assertEqual(result.errorLine, 4)
+                    self.assertEqual(result.error, "repeated string is too long")
+                    self.assertNotIn("unreached", result.output)
+
+    def testDoublingPastMaxsize(self):
+        # The string is never built, so it grows until it would pass
+        # sys.maxsize, unless a limit stops it first
+        for backend, optionD in backendD.items():
+            with self.subTest(backend=backend):
+                result = Interpreter(memoryLimit=sys.maxsize, **optionD).run(
+                    Program.fromString(doublingSource))
+                self.assertEqual(result.errorKind, "OverflowError")
+                self.assertEqual(result.errorLine, 3)
+                self.assertEqual(result.variables["i"], 59)
+                self.assertEqual(textLength(result.variables["s"]), 10 * 2 ** 59)
+                result = Interpreter(memoryLimit=2 ** 60, **optionD).run(
+                    Program.fromString(doublingSource))
+                self.assertEqual(result.errorKind, "MemoryLimitExceeded")
+                self.assertEqual(result.errorLine, 3)
+                self.assertEqual(result.variables["i"], 56)
+
+    def testLimitedRopes(self):
+        # The same limit stops the program at the same line in every backend,
+        # and a limit it stays within changes nothing
+        expected = executionPart(expectedOutput("ropes"))
+        outputS = set()
+        for backend, optionD in backendD.items():
+            with self.subTest(backend=backend):
+                result = Interpreter(memoryLimit=1000, **optionD).run(loadAs("ropes"))
+                self.assertEqual(result.errorKind, "MemoryLimitExceeded")
+                outputS.add(result.output)
+                result = Interpreter(memoryLimit=10 ** 6, **optionD).run(loadAs("ropes"))
+                self.assertEqual(result.output, expected)
+        self.assertEqual(len(outputS), 1)
+
+if __name__ == "__main__":
+    unittest.main()
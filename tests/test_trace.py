@@ -0,0 +1,121 @@
+# Filename: test_trace.py by Geoffrey Sessums
+# Purpose:
+#     Checks that the trace of the last lines executed (see beepTrace.py) is
+#     the same whichever backend runs the program, and that it is printed
+#     after exactly what the original interpreter printed.
+
+import unittest
+
+from beepInterp import Program, Interpreter
+from beepGen import generate
+from beepRope import replicate
+from beepTrace import valueText
+from tests.baseline import programNames, expectedOutput, loadAs
+
+class TraceTest(unittest.TestCase):
+    def testDumps(self):
+        for name in programNames():
+            expected = expectedOutput(name)
+            for optimize in (True, False):
+                dumpS = set()
+                for backend in ("interp", "python", "jit"):
+                    with self.subTest(program=name, optimize=optimize, backend=backend):
+                        interpreter = Interpreter(listing=True, tables=True, traceSize=16,
+                                                  optimize=optimize, backend=backend)
+                        result = interpreter.run(loadAs(name))
+                        self.assertTrue(result.output.startswith(expected))
+                        dump = result.output[len(expected):]
+                        if result.error is None:
+                            self.assertEqual(dump, "")
+                        else:
+                            self.assertTrue(dump.startswith("***Trace of the last "))
+                        dumpS.add(dump)
+                self.assertEqual(len(dumpS), 1, name)
+
+    def testCountedLoops(self):
+        # The iterations a counted loop skips leave the values of its last
+        # iterations in the trace
+        longLoop = "VAR INT i 0\nVAR INT k 0\nLOOP: ASSIGN i + i 1\nASSIGN k + k 3\n" \
+            "IF > 100000 i LOOP\n"
+        for source in (generate("loop", 2000), longLoop):
+            for traceSize in (1, 5, 64):
+                eventsS = set()
+                for backend in ("interp", "python", "jit"):
+                    with self.subTest(traceSize=traceSize, backend=backend):
+                        result = Interpreter(traceSize=traceSize, backend=backend).run(source)
+                        self.assertEqual(result.lines, 5000)
+                        self.assertEqual(len(result.trace.events()), traceSize)
+                        eventsS.add(tuple(result.trace.events()))
+                self.assertEqual(len(eventsS), 1)
+
+    def testEvents(self):
+        source = "\n".join([
+            "VAR INT i 0",
+            'VAR STRING s "ab"',
+            "ASSIGN i + i 1",
+            "IF > i 0 NEXT",
+            "PRINT i",
+            "NEXT: ASSIGN s & s s",
+            "ASSIGN i + i s"]) + "\n"
+        for backend in ("interp", "python", "jit"):
+            with self.subTest(backend=backend):
+                result = Interpreter(traceSize=3, backend=backend).run(
+                    Program.fromString(source))
+                self.assertEqual(result.errorLine, 7)
+                self.assertEqual(result.trace.events(result.errorLine), [
+                    (4, "IF", "", "jump"),
+                    (6, "ASSIGN", "s", '"abab"'),
+                    (7, "ASSIGN", "", "(error)")])
+
+    def testBranches(self):
+        # The direction of an IF is the one it took, even when the line
+        # after it is folded away or is the line it jumps to
+        source = "\n".join([
+            "VAR INT i 0",
+            "VAR INT k 0",
+            "IF > i 0 SKIP",
+            "",
+            "SKIP: ASSIGN k 5",
+            "IF > 1 i NEXT",
+            "NEXT: ASSIGN i + i 1",
+            "IF > 0 i NEXT",
+            "ASSIGN i + i s"]) + "\n"
+        for optimize in (True, False):
+            for backend in ("interp", "python", "jit"):
+                with self.subTest(optimize=optimize, backend=backend):
+                    result = Interpreter(traceSize=16, optimize=optimize, backend=backend).run(
+                        Program.fromString(source))
+                    eventM = [event for event in result.trace.events(result.errorLine)
+                              if event[1] == "IF"]
+                    self.assertEqual(eventM, [(3, "IF", "", "no jump"), (6, "IF", "", "jump"),
+                                              (8, "IF", "", "no jump")])
+
+    def testValueText(self):
+        rope = replicate(replicate("abc", 10 ** 6), 10 ** 9)
+        self.assertEqual(valueText(rope), '"' + ("abc" * 13)[:36] + "...")
+        self.assertIsNone(rope.flat)
+        self.assertEqual(valueText("ab"), '"ab"')
+        self.assertEqual(valueText(2 ** 20000), "(int of about 6021 digits)")
+        self.assertEqual(valueText(-12), "-12")
+        source = "\n".join([
+            'VAR STRING s "abc"',
+            "VAR STRING t",
+            "VAR INT n 1",
+            "VAR INT i 0",
+            "ASSIGN s * s 1000000000",
+            "LOOP: ASSIGN t s",
+            "ASSIGN n + n n",
+            "ASSIGN i + i 1",
+            "IF > 20000 i LOOP",
+            "PRINT n"]) + "\n"
+        for backend in ("interp", "python", "jit"):
+            with self.subTest(backend=backend):
+                result = Interpreter(traceSize=64, maxLines=None, backend=backend).run(
+                    Program.fromString(source))
+                self.assertEqual(result.errorKind, "ValueError")
+                textS = {event[3] for event in result.trace.events()}
+                self.assertIn('"' + ("abc" * 13)[:36] + "...", textS)
+                self.assertIn("(int of about 6021 digits)", textS)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+# Filename: test_vector.py by Geoffrey Sessums
+# Purpose:
+#     Checks that running a program over many bindings (see beepVector.py)
+#     gives every run exactly as an Interpreter does, whether or not the
+#     runs are vectorized with NumPy.
+
+import unittest
+
+import beepVector
+from beepVector import runBindings
+from beepInterp import Interpreter
+from beepRope import Rope
+from tests.baseline import loadAs, expectedOutput, executionPart
+
+# Bindings of loops.txt: some lanes leave the loop early, some reach the
+# limit, and some have values NumPy cannot hold or which are strings
+loopBindingM = [{}, {"i": "390"}, {"i": 5, "t": "-7"}, {"t": "12345678901234567890123"},
+                {"s": '"abc"'}, {"i": "007"}, {"t": "x"}, {"i": "-1000"}]
+
+# Function: kindOf
+# Parameters:
+#    value - value of a variable
+# Returns:
+#    Its type, str for a Rope
+def kindOf(value):
+    return str if type(value) is Rope else type(value)
+
+class VectorTest(unittest.TestCase):
+    # Function: assertSameRuns
+    # Purpose:
+    #    Check that each binding runs as an Interpreter runs it
+    # Parameters:
+    #    name - name of the program
+    #    bindingM - list of bindings
+    #    optionD - Interpreter keyword arguments
+    def assertSameRuns(self, name, bindingM, **optionD):
+        program = loadAs(name)
+        interpreter = Interpreter(**optionD)
+        for vectorize in (True, False):
+            resultM = runBindings(program, bindingM, optionD, vectorize)
+            for binding, result in zip(bindingM, resultM):
+                with self.subTest(program=name, binding=binding, vectorize=vectorize):
+                    valueD = beepVector.bindProgram(program, [binding])[0]
+                    expected = interpreter.run(program, valueD)
+                    self.assertEqual(result.output, expected.output)
+                    self.assertEqual(result.lines, expected.lines)
+                    self.assertEqual(result.error, expected.error)
+                    self.assertEqual(result.variables, expected.variables)
+                    # A string may be held as a Rope or as a str
+                    self.assertEqual({var: kindOf(value) for var, value in
+                                      result.variables.items()},
+                                     {var: kindOf(value) for var, value in
+                                      expected.variables.items()})
+
+    def testBaseline(self):
+        # Without bindings every run prints what the original interpreter did
+        for name in ("loops", "countDown", "numeral", "basic"):
+            for result in runBindings(loadAs(name), [{}, {}, {}]):
+                with self.subTest(program=name):
+                    self.assertEqual(result.output, executionPart(expectedOutput(name)))
+
+    def testBindings(self):
+        self.assertSameRuns("loops", loopBindingM)
+        self.assertSameRuns("loops", loopBindingM, maxLines=None)
+        self.assertSameRuns("loops", loopBindingM, backend="jit", memoryLimit=100)
+        self.assertSameRuns("countDown", [{"n": str(n)} for n in range(0, 2000, 97)])
+        self.assertSameRuns("numeral", [{}, {"one": "2"}, {"one": 1}, {"zero": "1"}])
+
+    def testUndeclared(self):
+        with self.assertRaises(ValueError):
+            runBindings(loadAs("loops"), [{"nothere": 1}])
+
+if __name__ == "__main__":
+    unittest.main()